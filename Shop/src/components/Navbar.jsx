@@ -2,7 +2,7 @@ import React, { useState, useEffect, useRef } from "react";
 import { Link, useLocation, useNavigate } from "react-router-dom";
 import { useAuth } from "../context/AuthContext.jsx";
 import { useStore } from "../context/StoreContext";
-import { productAPI, categoryAPI } from "../services/api";
+import { productAPI } from "../services/api";
 import { getProductImage } from "../utils/imageUtils";
 import { scrollToTop } from "../utils/scrollUtils";
 import {
@@ -90,23 +90,12 @@ const Navbar = () => {
     setShowSuggestions(true);
 
     try {
-      // Search products
-      const productsResponse = await productAPI.list({
-        search: query,
-        limit: 5,
-      });
-
-      // Search categories
-      const categoriesResponse = await categoryAPI.list();
-      const filteredCategories = categoriesResponse.data
-        .filter((category) =>
-          category.name.toLowerCase().includes(query.toLowerCase())
-        )
-        .slice(0, 3);
+      // One autocomplete call returns matching products and categories
+      const response = await productAPI.suggest(query, 5);
 
       setSearchResults({
-        products: productsResponse.data?.results || productsResponse.data || [],
-        categories: filteredCategories,
+        products: response.data?.products || [],
+        categories: (response.data?.categories || []).slice(0, 3),
       });
     } catch (error) {
       console.error("Search error:", error);
@@ -125,7 +125,7 @@ const RecentlyViewed = () => {
         <div className="grid grid-cols-2 sm:grid-cols-3 lg:grid-cols-4 xl:grid-cols-6 gap-3 md:gap-4">
           {recentlyViewed.slice(0, 6).map((item) => (
             <div
-              key={item.id}
+              key={item.product.id}
               onClick={() => handleProductClick(item.product.id)}
               className="group bg-white rounded-lg md:rounded-xl border border-gray-200 overflow-hidden cursor-pointer hover:shadow-lg hover:border-indigo-200 transition-all duration-300 hover:-translate-y-1"
             >
@@ -356,8 +356,8 @@ const Subcategories = () => {
     try {
       setLoading(true);
       setError(null);
-      const res = await productAPI.list();
-      setProducts(res.data || []);
+      const res = await productAPI.list({ page_size: 100 });
+      setProducts(res.data?.results || []);
     } catch (err) {
       console.error("Failed to fetch products:", err);
       setError("Unable to load products. Please check your connection.");
@@ -32,11 +32,14 @@ const TrendingProducts = () => {
     const fetchProducts = async () => {
       try {
         setLoading(true);
-        const res = await productAPI.list();
+        let res = await productAPI.trending({ limit: 6 });
+        // Without recent sales there is no ranking yet; fall back to the
+        // products flagged as trending.
+        if (!res.data?.results?.length) {
+          res = await productAPI.list({ is_trending: true, page_size: 6 });
+        }
         if (mounted) {
-          const trendingProducts = (res.data || [])
-            .sort((a, b) => (b.rating || 0) - (a.rating || 0))
-            .slice(0, 6);
+          const trendingProducts = res.data?.results || [];
 
           // Debug: Log the first product's image data
           if (trendingProducts.length > 0) {
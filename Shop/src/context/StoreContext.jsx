@@ -1,4 +1,10 @@
-import React, { createContext, useContext, useState, useEffect } from "react";
+import React, {
+  createContext,
+  useContext,
+  useState,
+  useEffect,
+  useRef,
+} from "react";
 import {
   cartAPI,
   wishlistAPI,
@@ -10,6 +16,9 @@ import { useAuth } from "./AuthContext";
 
 const StoreContext = createContext();
 
+// Milliseconds to wait for more cart changes before sending them together
+const CART_OPS_DELAY = 250;
+
 export const useStore = () => {
   const context = useContext(StoreContext);
   if (!context) {
@@ -200,6 +209,55 @@ export const StoreProvider = ({ children }) => {
 
   // ========== CART OPERATIONS ==========
 
+  // Cart changes made within CART_OPS_DELAY of each other (e.g. quantity
+  // stepper clicks) go to the server as one atomic /cart/ops/ request,
+  // whose response is the new cart.
+  const pendingCartOps = useRef({ operations: [], waiters: [], timer: null });
+
+  const flushCartOps = async () => {
+    const { operations, waiters } = pendingCartOps.current;
+    pendingCartOps.current = { operations: [], waiters: [], timer: null };
+    try {
+      const response = await cartAPI.ops(operations);
+      setState((prev) => ({
+        ...prev,
+        cart: { ...response.data, loaded: true },
+      }));
+      updateCache("cart");
+      waiters.forEach(({ resolve }) => resolve(response.data));
+    } catch (error) {
+      // The batch is applied whole or not at all: show the server state
+      try {
+        const current = await cartAPI.get();
+        const cartData = Array.isArray(current.data)
+          ? current.data[0] || { items: [], total: 0 }
+          : current.data;
+        setState((prev) => ({
+          ...prev,
+          cart: { ...cartData, loaded: true },
+        }));
+      } catch (reloadError) {
+        console.error("Failed to reload cart:", reloadError);
+      }
+      waiters.forEach(({ reject }) => reject(error));
+    }
+  };
+
+  const queueCartOps = (operations) =>
+    new Promise((resolve, reject) => {
+      const pending = pendingCartOps.current;
+      pending.operations.push(...operations);
+      pending.waiters.push({ resolve, reject });
+      clearTimeout(pending.timer);
+      pending.timer = setTimeout(flushCartOps, CART_OPS_DELAY);
+    });
+
+  // Optimistic items have no server id yet: name their line by product
+  const cartLine = (itemId) => {
+    const item = (state.cart.items || []).find((i) => i.id === itemId);
+    return item?.temp ? { product_id: item.product.id } : { item_id: itemId };
+  };
+
   const addToCart = async (productId, quantity = 1) => {
     try {
       setLoading(true);
@@ -226,34 +284,10 @@ export const StoreProvider = ({ children }) => {
         },
       }));
 
-      await cartAPI.addItem({
-        product_id: productId,
-        quantity,
-      });
-
-      // Refresh cart data
-      const updatedCart = await cartAPI.get();
-      const cartData = Array.isArray(updatedCart.data)
-        ? updatedCart.data[0] || { items: [], total: 0 }
-        : updatedCart.data;
-
-      setState((prev) => ({
-        ...prev,
-        cart: { ...cartData, loaded: true },
-      }));
-
-      updateCache("cart");
+      await queueCartOps([{ op: "add", product_id: productId, quantity }]);
       return true;
     } catch (error) {
       console.error("Failed to add item to cart:", error);
-      // Revert optimistic update
-      setState((prev) => ({
-        ...prev,
-        cart: {
-          ...prev.cart,
-          items: prev.cart.items.filter((i) => !i.temp),
-        },
-      }));
       return false;
     } finally {
       setLoading(false);
@@ -264,48 +298,26 @@ export const StoreProvider = ({ children }) => {
     try {
       setLoading(true);
 
-      // Store previous state
-      const previousCart = { ...state.cart };
-
       // Convert quantity to integer and ensure it's valid
       const validQuantity = Math.max(1, parseInt(quantity) || 1);
 
       // Optimistic update
-      const updatedItems = (state.cart.items || []).map((item) =>
-        item.id === itemId ? { ...item, quantity: validQuantity } : item
-      );
-
       setState((prev) => ({
         ...prev,
         cart: {
           ...prev.cart,
-          items: updatedItems,
+          items: (prev.cart.items || []).map((item) =>
+            item.id === itemId ? { ...item, quantity: validQuantity } : item
+          ),
         },
       }));
 
-      // Send update to server
-      await cartAPI.updateItem(itemId, { quantity: validQuantity });
-
-      // Fetch fresh cart data
-      const updatedCart = await cartAPI.get();
-      const cartData = Array.isArray(updatedCart.data)
-        ? updatedCart.data[0] || { items: [], total: 0 }
-        : updatedCart.data;
-
-      setState((prev) => ({
-        ...prev,
-        cart: { ...cartData, loaded: true },
-      }));
-
-      updateCache("cart");
+      await queueCartOps([
+        { op: "set", ...cartLine(itemId), quantity: validQuantity },
+      ]);
       return true;
     } catch (error) {
       console.error("Failed to update cart item:", error);
-      // Revert to previous state
-      setState((prev) => ({
-        ...prev,
-        cart: previousCart,
-      }));
       return false;
     } finally {
       setLoading(false);
@@ -319,9 +331,6 @@ export const StoreProvider = ({ children }) => {
     try {
       setLoading(true);
 
-      // Store previous state
-      const previousCart = { ...state.cart };
-
       // Optimistic update
       setState((prev) => ({
         ...prev,
@@ -331,28 +340,10 @@ export const StoreProvider = ({ children }) => {
         },
       }));
 
-      await cartAPI.removeItem(itemId);
-
-      // Fetch updated cart
-      const updatedCart = await cartAPI.get();
-      const cartData = Array.isArray(updatedCart.data)
-        ? updatedCart.data[0] || { items: [], total: 0 }
-        : updatedCart.data;
-
-      setState((prev) => ({
-        ...prev,
-        cart: { ...cartData, loaded: true },
-      }));
-
-      updateCache("cart");
+      await queueCartOps([{ op: "remove", ...cartLine(itemId) }]);
       return true;
     } catch (error) {
       console.error("Failed to remove item from cart:", error);
-      // Revert to previous state
-      setState((prev) => ({
-        ...prev,
-        cart: previousCart,
-      }));
       return false;
     } finally {
       setLoading(false);
@@ -361,16 +352,12 @@ export const StoreProvider = ({ children }) => {
 
   const clearCart = async () => {
     try {
-      await Promise.all(
-        state.cart.items.map((item) => cartAPI.removeItem(item.id))
-      );
-
       setState((prev) => ({
         ...prev,
-        cart: { items: [], total: 0, loaded: true },
+        cart: { ...prev.cart, items: [], total: 0 },
       }));
 
-      updateCache("cart");
+      await queueCartOps([{ op: "clear" }]);
       return true;
     } catch (error) {
       console.error("Failed to clear cart:", error);
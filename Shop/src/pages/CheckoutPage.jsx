@@ -2,6 +2,7 @@ import React, { useState, useEffect } from "react";
 import { useStore } from "../context/StoreContext";
 import { useNavigate, Link } from "react-router-dom";
 import { getProductImage } from "../utils/imageUtils";
+import { cartAPI } from "../services/api";
 import {
   FiArrowLeft,
   FiPackage,
@@ -256,6 +257,21 @@ const CheckoutPage = () => {
     }
   }, [addresses.length, showAddressForm]);
 
+  // Hold the cart's stock while the order is being filled in; placing the
+  // order consumes the hold, leaving the page gives it back.
+  const cartLines = (cart?.items || [])
+    .map((item) => `${item.product?.id}:${item.variant || ""}:${item.quantity}`)
+    .join(",");
+  useEffect(() => {
+    if (cartLines) cartAPI.reserve().catch(() => {});
+  }, [cartLines]);
+  useEffect(
+    () => () => {
+      cartAPI.releaseReservation().catch(() => {});
+    },
+    []
+  );
+
   const calculateTotal = () => {
     if (!cart?.items) return 0;
     return cart.items.reduce((total, item) => {
@@ -45,36 +45,24 @@ const ProductDetail = () => {
         setLoading(true);
         setError(null);
 
-        const response = await productAPI.retrieve(productId);
+        const response = await productAPI.detail(productId);
 
-        if (!response.data) {
+        if (!response.data?.product) {
           throw new Error("No data received from the server");
         }
 
-        setProduct(response.data);
-
-        // Fetch related products (same category)
-        if (response.data.category) {
-          const relatedResponse = await productAPI.list();
-          if (relatedResponse?.data) {
-            const filtered = relatedResponse.data
-              .filter(
-                (p) =>
-                  p.category?.id === response.data.category.id &&
-                  p.id !== response.data.id
-              )
-              .sort(() => Math.random() - 0.5)
-              .slice(0, 4);
-            setRelatedProducts(filtered);
-          }
-        }
+        const { product: productData, related = [] } = response.data;
+        setProduct(productData);
+
+        // Related products (same category) come with the product
+        setRelatedProducts(
+          [...related].sort(() => Math.random() - 0.5).slice(0, 4)
+        );
 
         // Record recently viewed (if authenticated)
         try {
           if (user) {
-            await recentlyViewedAPI.create({ product_id: response.data.id });
-            const rv = await recentlyViewedAPI.list();
-            setRecentlyViewed(rv.data || []);
+            await recentlyViewedAPI.create({ product_id: productData.id });
           }
         } catch (rvErr) {
           console.debug(
@@ -818,7 +806,7 @@ const ProductDetail = () => {
             <div className="grid grid-cols-2 sm:grid-cols-3 lg:grid-cols-4 gap-4 sm:gap-6">
               {recentlyViewed.slice(0, 4).map((rv) => (
                 <div
-                  key={rv.id}
+                  key={rv.product.id}
                   onClick={() => navigate(`/products/${rv.product.id}`)}
                   className="bg-white rounded-lg sm:rounded-xl shadow-sm overflow-hidden cursor-pointer hover:shadow-lg transition-shadow"
                 >
@@ -267,9 +267,9 @@ const ListProductCard = ({
                 </h3>
 
                 {/* Description */}
-                {product.description && (
+                {product.short_description && (
                   <p className="text-gray-600 text-sm mb-4 line-clamp-2 leading-relaxed">
-                    {product.description}
+                    {product.short_description}
                   </p>
                 )}
 
@@ -402,10 +402,19 @@ const ListProductCard = ({
   );
 };
 
+// Maps the sort dropdown values onto the API's `sort` parameter.
+const SERVER_SORTS = {
+  name: "name",
+  price_asc: "price_asc",
+  price_desc: "price_desc",
+};
+
 const ProductList = () => {
   const [products, setProducts] = useState([]);
-  const [filteredProducts, setFilteredProducts] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [totalCount, setTotalCount] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const {
     addToCart,
@@ -436,12 +445,13 @@ const ProductList = () => {
 
   useEffect(() => {
     fetchCategories();
-    fetchProducts();
   }, []);
 
+  // Filtering, sorting and pagination happen on the server; refetch the
+  // first page whenever the filters change.
   useEffect(() => {
-    filterAndSortProducts();
-  }, [products, selectedCategory, sortBy, searchQuery]);
+    fetchProducts();
+  }, [selectedCategory, sortBy, searchQuery]);
 
   const fetchCategories = async () => {
     try {
@@ -452,62 +462,38 @@ const ProductList = () => {
     }
   };
 
-  const fetchProducts = async () => {
+  const buildParams = () => {
+    const params = {};
+    if (selectedCategory) params.category = selectedCategory;
+    if (searchQuery) params.search = searchQuery;
+    if (sortBy && SERVER_SORTS[sortBy]) params.sort = SERVER_SORTS[sortBy];
+    return params;
+  };
+
+  // Without a `pageUrl` this loads the first page; otherwise it follows the
+  // server's `next` link (a cursor for the default newest-first order).
+  const fetchProducts = async (pageUrl = null) => {
     try {
-      setLoading(true);
-      const response = await productAPI.list();
-      setProducts(response.data || []);
+      if (pageUrl) setLoadingMore(true);
+      else setLoading(true);
+      const response = pageUrl
+        ? await productAPI.page(pageUrl)
+        : await productAPI.list(buildParams());
+      const results = response.data?.results || [];
+      setProducts((prev) => (pageUrl ? [...prev, ...results] : results));
+      // Cursor-paginated responses skip the COUNT query, so there is no total.
+      setTotalCount(response.data?.count ?? null);
+      setNextUrl(response.data?.next || null);
       setError(null);
     } catch (err) {
       setError("Failed to load products");
       console.error("Error fetching products:", err);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
-  const filterAndSortProducts = () => {
-    let filtered = [...products];
-
-    // Filter by category
-    if (selectedCategory) {
-      filtered = filtered.filter((p) => {
-        if (!p.category) return false;
-        return (
-          String(p.category.id) === String(selectedCategory) ||
-          String(p.category.slug) === String(selectedCategory)
-        );
-      });
-    }
-
-    // Filter by search query
-    if (searchQuery) {
-      filtered = filtered.filter(
-        (p) =>
-          p.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-          (p.category?.name &&
-            p.category.name
-              .toLowerCase()
-              .includes(searchQuery.toLowerCase())) ||
-          (p.description &&
-            p.description.toLowerCase().includes(searchQuery.toLowerCase()))
-      );
-    }
-
-    // Sort products
-    if (sortBy === "price_asc") {
-      filtered.sort((a, b) => a.price - b.price);
-    } else if (sortBy === "price_desc") {
-      filtered.sort((a, b) => b.price - a.price);
-    } else if (sortBy === "rating") {
-      filtered.sort((a, b) => (b.rating || 0) - (a.rating || 0));
-    } else if (sortBy === "name") {
-      filtered.sort((a, b) => a.title.localeCompare(b.title));
-    }
-
-    setFilteredProducts(filtered);
-  };
-
   const handleAddToCart = async (productId) => {
     try {
       await addToCart(productId, 1);
@@ -618,9 +604,9 @@ const ProductList = () => {
         <div className="flex flex-col lg:items-center lg:justify-between gap-4 mb-8">
           <h1 className="text-2xl sm:text-3xl font-bold text-gray-900 mb-2 flex flex-col md:flex-row items-center">
             <span> All Products</span>
-            {filteredProducts.length > 0 && (
+            {totalCount > 0 && (
               <span className="text-gray-500 text-lg ml-2 self-center md:self-end">
-                ({filteredProducts.length} products)
+                ({totalCount} products)
               </span>
             )}
           </h1>
@@ -774,11 +760,11 @@ const ProductList = () => {
           <div className="flex-1">
             {loading ? (
               renderLoadingSkeletons()
-            ) : filteredProducts.length > 0 ? (
+            ) : products.length > 0 ? (
               viewMode === "grid" ? (
                 // Grid View
                 <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-2 xl:grid-cols-3 gap-6">
-                  {filteredProducts.map((product) => (
+                  {products.map((product) => (
                     <GridProductCard
                       key={product.id}
                       product={product}
@@ -792,7 +778,7 @@ const ProductList = () => {
               ) : (
                 // List View
                 <div className="space-y-6">
-                  {filteredProducts.map((product) => (
+                  {products.map((product) => (
                     <ListProductCard
                       key={product.id}
                       product={product}
@@ -828,6 +814,18 @@ const ProductList = () => {
                 )}
               </div>
             )}
+
+            {!loading && nextUrl && (
+              <div className="flex justify-center mt-8">
+                <button
+                  onClick={() => fetchProducts(nextUrl)}
+                  disabled={loadingMore}
+                  className="inline-flex items-center gap-2 bg-white border border-gray-300 text-gray-700 px-6 py-2 rounded-lg hover:bg-gray-50 transition-colors disabled:opacity-50"
+                >
+                  {loadingMore ? "Loading..." : "Load more"}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       </div>
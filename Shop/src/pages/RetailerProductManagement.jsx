@@ -113,12 +113,12 @@ const RetailerProductManagement = () => {
       }
 
       const [productsRes, categoriesRes, brandsRes] = await Promise.all([
-        productAPI.list({ retailer: user.id }),
+        productAPI.list({ retailer: user.id, page_size: 100 }),
         categoryAPI.list(),
         brandAPI.list(),
       ]);
 
-      setProducts(productsRes.data || []);
+      setProducts(productsRes.data?.results || []);
       setCategories(categoriesRes.data || []);
       setBrands(brandsRes.data || []);
     } catch (error) {
@@ -153,7 +153,15 @@ const RetailerProductManagement = () => {
       product?.sku?.toLowerCase().includes(searchTerm.toLowerCase())
   );
 
-  const handleProductSelect = async (product) => {
+  const handleProductSelect = async (listProduct) => {
+    // The listing only carries card fields; load the full product to edit.
+    let product = listProduct;
+    try {
+      const response = await productAPI.retrieve(listProduct.id);
+      product = response.data;
+    } catch (error) {
+      console.error("Error loading product details:", error);
+    }
     setSelectedProduct(product);
     setFormData({
       ...initialFormData,
@@ -7,8 +7,19 @@ const api = axios.create({
   headers: {
     "Content-Type": "application/json",
   },
+  // 304 answers to our own If-None-Match are resolved from etagCache below.
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
 });
 
+// Bodies of GET responses that carried an ETag, keyed by token + full URL.
+// Re-polls of the cart or a product page send If-None-Match and reuse the
+// stored body when the server answers 304 Not Modified.
+const ETAG_CACHE_LIMIT = 100;
+const etagCache = new Map();
+
+const etagCacheKey = (config) =>
+  `${config.headers?.Authorization || ""} ${api.getUri(config)}`;
+
 // Add token to requests
 api.interceptors.request.use(
   (config) => {
@@ -16,6 +27,12 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    if ((config.method || "get").toLowerCase() === "get") {
+      const cached = etagCache.get(etagCacheKey(config));
+      if (cached) {
+        config.headers["If-None-Match"] = cached.etag;
+      }
+    }
     return config;
   },
   (error) => {
@@ -25,7 +42,29 @@ api.interceptors.request.use(
 
 // Handle token refresh
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const { config } = response;
+    if ((config.method || "get").toLowerCase() !== "get") {
+      return response;
+    }
+    const key = etagCacheKey(config);
+    if (response.status === 304) {
+      const cached = etagCache.get(key);
+      if (cached) {
+        return { ...response, status: 200, data: cached.data };
+      }
+      return response;
+    }
+    const etag = response.headers?.etag;
+    if (etag) {
+      etagCache.delete(key);
+      etagCache.set(key, { etag, data: response.data });
+      if (etagCache.size > ETAG_CACHE_LIMIT) {
+        etagCache.delete(etagCache.keys().next().value);
+      }
+    }
+    return response;
+  },
   async (error) => {
     const originalRequest = error.config;
 
@@ -79,7 +118,32 @@ export const userAPI = {
 
 export const productAPI = {
   list: (params = {}) => api.get("products/", { params }),
+  // Follow a `next`/`previous` link from a paginated listing response
+  page: (url) => api.get(url),
+  search: (query, params = {}) =>
+    api.get("products/search/", { params: { q: query, ...params } }),
+  facets: (params = {}) => api.get("products/facets/", { params }),
+  suggest: (query, limit = 5) =>
+    api.get("products/suggest/", { params: { q: query, limit } }),
   retrieve: (id) => api.get(`products/${id}/`),
+  // Rankings from order history. Params: category, window (24h/7d/30d,
+  // bestsellers only), limit. Response: { results }
+  bestsellers: (params = {}) => api.get("products/bestsellers/", { params }),
+  trending: (params = {}) => api.get("products/trending/", { params }),
+  // Most similar products by content. Response: { results }
+  similar: (id, params = {}) => api.get(`products/${id}/similar/`, { params }),
+  // Frequently bought together. Response: { results }
+  boughtTogether: (id, params = {}) =>
+    api.get(`products/${id}/bought-together/`, { params }),
+  // Product page in one request, by id or slug. Response:
+  // { product, specification_groups, breadcrumbs, related }
+  detail: (idOrSlug) => api.get(`products/${idOrSlug}/detail/`),
+  // Several products in one round trip, in the order of `ids`; long lists
+  // go in a POST body. Response: { results, missing }
+  batch: (ids) =>
+    ids.length > 50
+      ? api.post("products/batch/", { ids })
+      : api.get("products/batch/", { params: { ids: ids.join(",") } }),
   create: (data) => api.post("products/", data),
   update: (id, data) => api.patch(`products/${id}/`, data),
   delete: (id) => api.delete(`products/${id}/`),
@@ -103,6 +167,7 @@ export const productAPI = {
 
 export const categoryAPI = {
   list: () => api.get("categories/"),
+  tree: () => api.get("categories/tree/"),
   retrieve: (id) => api.get(`categories/${id}/`),
   create: (data) => api.post("categories/", data),
   update: (id, data) => api.patch(`categories/${id}/`, data),
@@ -125,12 +190,16 @@ export const cartAPI = {
   addItem: (data) => api.post("cart-items/", data),
   updateItem: (id, data) => api.patch(`cart-items/${id}/`, data),
   removeItem: (id) => api.delete(`cart-items/${id}/`),
-  clear: () =>
-    api.get("cart/").then((cart) => {
-      // Clear all items from cart
-      const itemIds = cart.data.items?.map((item) => item.id) || [];
-      return Promise.all(itemIds.map((id) => api.delete(`cart-items/${id}/`)));
-    }),
+  // Products often bought with the cart's contents. Response: { results }
+  completeYourOrder: (params = {}) =>
+    api.get("cart/complete-your-order/", { params }),
+  // Apply add/set/remove/clear operations atomically, e.g.
+  // [{ op: "set", item_id: 7, quantity: 2 }]. Response: the new cart
+  ops: (operations) => api.post("cart/ops/", { operations }),
+  clear: () => api.post("cart/ops/", { operations: [{ op: "clear" }] }),
+  // Hold the cart's stock while checking out. Response: { expires_at }
+  reserve: () => api.post("cart/reserve/"),
+  releaseReservation: () => api.delete("cart/reserve/"),
 };
 
 export const wishlistAPI = {
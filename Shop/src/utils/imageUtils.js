@@ -53,12 +53,14 @@ export const getProductImage = (product) => {
     return null;
   }
 
-  // Try main_image first, then image, with proper object handling
+  // Try main_image first, then image, with proper object handling.
+  // Listing endpoints send a single resolved main_image_url instead.
   const mainImageUrl = getImageUrl(product.main_image);
   const imageUrl = getImageUrl(product.image);
+  const listImageUrl = getImageUrl(product.main_image_url);
 
   // If main_image and image are null, try to get the first image from images array
-  let finalUrl = mainImageUrl || imageUrl;
+  let finalUrl = mainImageUrl || imageUrl || listImageUrl;
 
   if (
     !finalUrl &&
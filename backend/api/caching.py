@@ -0,0 +1,163 @@
+"""Response cache for anonymous catalog reads.
+
+Catalog GETs are the same for every anonymous visitor, so their serialized
+`response.data` is kept in Django's cache (see CACHES in settings), keyed
+by host, path, sorted query parameters and a set of version numbers:
+
+* every cached model has a model version, bumped whenever any row of it
+  is saved or deleted (list responses are keyed on these);
+* every object has an object version, bumped when that row or one of its
+  child rows changes (detail responses are keyed on the object's version
+  plus the model versions of what it nests).
+
+Bumping a version never deletes anything: keys built from the old version
+are simply never asked for again and age out after CATALOG_CACHE_TIMEOUT.
+Signal handlers in api/signals.py do the bumping.
+
+The default local-memory cache is per process, so with several workers a
+change only invalidates the worker that made it until the timeout passes;
+point CACHES at a shared backend to invalidate everywhere at once.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+KEY_PREFIX = 'catalog'
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def _model_key(model):
+    return f'{KEY_PREFIX}:v:{_label(model)}'
+
+
+def _object_key(model, pk):
+    return f'{KEY_PREFIX}:v:{_label(model)}:{pk}'
+
+
+def _fresh_version():
+    # Starting from the clock rather than 1 keeps a version key that was
+    # evicted from colliding with responses cached under its old values.
+    return time.time_ns()
+
+
+def _versions(keys):
+    found = cache.get_many(keys)
+    missing = {key: _fresh_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def model_versions(models):
+    """Current model versions, e.g. to fold into other validators."""
+    return _versions([_model_key(model) for model in models])
+
+
+def object_version(model, pk):
+    """Current object version of one row, e.g. to key per-user caches."""
+    return _versions([_object_key(model, pk)])[0]
+
+
+def object_versions(model, pks):
+    """Current object versions of several rows, in the order of `pks`."""
+    return _versions([_object_key(model, pk) for pk in pks])
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
+
+
+def bump(model, pk=None):
+    """Invalidate cached lists of `model`, and the detail of `pk` if given."""
+    _bump(_model_key(model))
+    if pk is not None:
+        _bump(_object_key(model, pk))
+
+
+def response_key(request, versions):
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    raw = repr((request.get_host(), request.path, params, versions))
+    return f'{KEY_PREFIX}:r:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cache_response(method):
+    """Serve a view method from the response cache; see CatalogCacheMixin."""
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        return self.cached_response(request, method, *args, **kwargs)
+    return wrapper
+
+
+class CatalogCacheMixin:
+    """Cache anonymous list and retrieve responses of a catalog view.
+
+    `cache_models` lists the other models the view's list responses are
+    built from, and `cache_detail_models` (defaulting to `cache_models`)
+    those a single object's response depends on. Custom actions opt in
+    with the `cache_response` decorator.
+    """
+    cache_models = ()
+    cache_detail_models = None
+
+    def get_cache_model(self):
+        return self.get_serializer_class().Meta.model
+
+    def get_cache_pk(self, model, lookup):
+        # Signals bump the version under the pk, so "/products/05/" must
+        # read the version of 5.
+        try:
+            return model._meta.pk.to_python(lookup)
+        except ValidationError:
+            # Not a pk at all: the lookup answers 404, which is not cached.
+            return lookup
+
+    def get_cache_versions(self):
+        model = self.get_cache_model()
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        if getattr(self, 'detail', False) and lookup is not None:
+            related = self.cache_models if self.cache_detail_models is None else self.cache_detail_models
+            keys = [_object_key(model, self.get_cache_pk(model, lookup))]
+        else:
+            related = self.cache_models
+            keys = [_model_key(model)]
+        keys += [_model_key(m) for m in related if m is not model]
+        return _versions(keys)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return handler(self, request, *args, **kwargs)
+
+        key = response_key(request, self.get_cache_versions())
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+        return response
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
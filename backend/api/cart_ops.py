@@ -0,0 +1,128 @@
+"""Bulk cart operations behind POST /cart/ops/.
+
+A request carries a list of operations, applied in order:
+
+* `{"op": "add", "product_id": 3, "quantity": 2}` adds to the product's
+  line, creating it if needed (quantity defaults to 1);
+* `{"op": "set", "item_id": 7, "quantity": 4}` sets a line's quantity, the
+  line named by `item_id` or `product_id`; 0 removes it, and setting a
+  product the cart lacks adds it;
+* `{"op": "remove", "item_id": 7}` removes a line, if it is still there;
+* `{"op": "clear"}` empties the cart.
+
+Operations naming a `product_id` may add a `variant_id`: each variant of a
+product is a line of its own. A request carries at most
+CART_MAX_OPERATIONS operations, and an operation leaving a line above
+CART_MAX_LINE_QUANTITY units is invalid.
+
+The operations are folded over the cart's current lines in memory first,
+so an invalid one rejects the whole list before anything is written. The
+result is then written in one transaction: one DELETE, one bulk UPDATE and
+one bulk INSERT at most, with the cart row locked for its duration.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Cart, CartItem, Product, ProductVariant
+from .signals import batched_cart_items
+
+
+def _error(index, message):
+    return ValidationError({'operations': {index: [message]}})
+
+
+def lines(cart):
+    """The cart's quantities by (product_id, variant_id), repeated lines merged."""
+    rows = (
+        CartItem.objects.filter(cart=cart)
+        .values('product_id', 'variant_id').annotate(units=Sum('quantity'))
+        .order_by('product_id', 'variant_id').values_list('product_id', 'variant_id', 'units')
+    )
+    return {(product_id, variant_id): units for product_id, variant_id, units in rows}
+
+
+def apply(cart, operations):
+    """Apply validated `operations` to `cart`; returns whether it changed."""
+    with transaction.atomic():
+        cart = Cart.objects.select_for_update().get(pk=cart.pk)
+        items = {item.id: item for item in cart.items.all()}
+        # Lines are keyed by item id, or by ('new', (product id, variant id))
+        # until created.
+        quantities = {item_id: item.quantity for item_id, item in items.items()}
+        line_of = {}
+        for item_id, item in items.items():
+            line_of.setdefault((item.product_id, item.variant_id), item_id)
+
+        added = {
+            (operation['product_id'], operation.get('variant_id')) for operation in operations
+            if operation['op'] in ('add', 'set') and 'product_id' in operation
+        } - set(line_of)
+        products = set(
+            Product.objects.filter(pk__in={product_id for product_id, _ in added}, is_active=True)
+            .values_list('pk', flat=True)
+        )
+        variants = dict(
+            ProductVariant.objects.filter(pk__in={variant_id for _, variant_id in added if variant_id}, is_active=True)
+            .values_list('pk', 'product_id')
+        )
+        available = {
+            (product_id, variant_id) for product_id, variant_id in added
+            if product_id in products and (variant_id is None or variants.get(variant_id) == product_id)
+        }
+
+        for index, operation in enumerate(operations):
+            op = operation['op']
+            if op == 'clear':
+                quantities = dict.fromkeys(quantities, 0)
+                continue
+            if 'item_id' in operation:
+                line = operation['item_id'] if operation['item_id'] in items else None
+                if line is None and op != 'remove':
+                    raise _error(index, f'Item {operation["item_id"]} is not in the cart.')
+            else:
+                line = line_of.get((operation['product_id'], operation.get('variant_id')))
+
+            if op == 'remove':
+                if line is not None:
+                    quantities[line] = 0
+                continue
+            if line is None:
+                key = (operation['product_id'], operation.get('variant_id'))
+                if key not in available:
+                    raise _error(index, f'Product {key[0]} is not available.')
+                line = line_of[key] = ('new', key)
+                quantities[line] = 0
+            if op == 'add':
+                quantities[line] += operation.get('quantity', 1)
+            else:
+                quantities[line] = operation['quantity']
+            if quantities[line] > settings.CART_MAX_LINE_QUANTITY:
+                raise _error(index, f'A line holds at most {settings.CART_MAX_LINE_QUANTITY} units.')
+
+        removed = [line for line, quantity in quantities.items() if line in items and not quantity]
+        changed = [
+            items[line] for line, quantity in quantities.items()
+            if line in items and quantity and quantity != items[line].quantity
+        ]
+        created = [
+            CartItem(cart=cart, product_id=line[1][0], variant_id=line[1][1], quantity=quantity)
+            for line, quantity in quantities.items()
+            if line not in items and quantity
+        ]
+        if not (removed or changed or created):
+            return False
+
+        now = timezone.now()
+        # The cart is touched once below rather than per item.
+        with batched_cart_items():
+            CartItem.objects.filter(pk__in=removed).delete()
+        for item in changed:
+            item.quantity = quantities[item.id]
+            item.updated_at = now
+        CartItem.objects.bulk_update(changed, ['quantity', 'updated_at'])
+        CartItem.objects.bulk_create(created)
+        Cart.objects.filter(pk=cart.pk).update(updated_at=now)
+    return True
@@ -0,0 +1,63 @@
+"""Checkout: turn the user's cart into an order in one transaction.
+
+`place_order()` runs a bounded number of queries whatever the cart size,
+reserved or not, as stock rows are locked and written with one statement
+per table:
+
+1. lock the cart and read its lines, merged per product and variant;
+2. read those products and variants, the prices of which are snapshotted
+   into the order;
+3. make the user's stock reservations match the lines (api/inventory.py),
+   taking only what is not held yet, and consume them;
+4. insert the order and bulk-insert its items;
+5. delete the cart items and touch the cart.
+
+It all runs inside `transaction.atomic()`, so a failure at any step leaves
+neither an order nor a stock change behind. Only the stock rows of the
+cart's products are locked, in a fixed order, so checkouts only wait on
+each other over the same products, never deadlock, and never oversell.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import cart_ops, inventory
+from .models import Cart, CartItem, OrderItem
+from .signals import batched_cart_items
+
+
+def place_order(user, serializer):
+    """Save `serializer` as an order of everything in `user`'s cart and empty
+    the cart; returns the order. Raises ValidationError, writing nothing, if
+    the cart is empty or a line cannot be ordered in that quantity."""
+    with transaction.atomic():
+        cart = Cart.objects.select_for_update().filter(user=user).first()
+        lines = cart_ops.lines(cart) if cart is not None else {}
+        if not lines:
+            raise ValidationError({'cart': 'The cart is empty.'})
+
+        products, variants = inventory.load(lines)
+        inventory.hold(user, lines, products)
+        inventory.consume(user)
+
+        prices = {}
+        for product_id, variant_id in lines:
+            price = products[product_id].price
+            if variant_id:
+                price += variants[variant_id].price_modifier
+            prices[product_id, variant_id] = price
+        total = sum(prices[key] * quantity for key, quantity in lines.items())
+        order = serializer.save(user=user, total_amount=total)
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order, product_id=product_id, variant_id=variant_id,
+                quantity=quantity, price=prices[product_id, variant_id],
+            )
+            for (product_id, variant_id), quantity in lines.items()
+        ])
+
+        # The cart is touched once here rather than per item.
+        with batched_cart_items():
+            CartItem.objects.filter(cart=cart).delete()
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+    return order
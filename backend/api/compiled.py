@@ -0,0 +1,258 @@
+"""Compiled read-only serialization straight from `.values()` rows.
+
+For large read-only listings the cost of DRF is mostly per object: a model
+instance per row, `get_attribute` and bookkeeping per field. A compiled
+serializer resolves once, per serializer, how every output field is
+produced from a flat `.values()` row:
+
+* model columns go through the DRF field's own `to_representation`, so
+  decimals, datetimes and file URLs (absolute when there is a request) are
+  formatted exactly as before;
+* primary-key relations read the foreign key column;
+* nested forward relations are compiled recursively over `relation__`
+  prefixed columns and converted once per distinct related row;
+* properties and method fields run on a light row object carrying the
+  columns named in `Meta.field_dependencies` (the same declarations the
+  eager-loading planner in api/prefetch.py uses).
+
+The output is the same data the serializer would produce. Serializers the
+compiler does not understand (many-related fields, reverse relations,
+unresolved dependencies) return None from `compile_serializer` and keep the
+regular path.
+"""
+from rest_framework import serializers
+from rest_framework.fields import SkipField, empty
+from rest_framework.relations import PKOnlyObject
+from rest_framework.response import Response
+
+from .prefetch import build_plan
+
+
+class NotCompilable(Exception):
+    pass
+
+
+def _model_field(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except Exception:
+        return None
+    return field if field.concrete and not field.many_to_many else None
+
+
+def _wrap(model_field, value):
+    # File columns come back as names; the DRF field wants a FieldFile.
+    if value is not None and hasattr(model_field, 'attr_class'):
+        return model_field.attr_class(None, model_field, value)
+    return value
+
+
+def _missing(field):
+    """What DRF does for a source that cannot be reached (None on the way)."""
+    if field.default is not empty:
+        return field.get_default()
+    if field.allow_null:
+        return None
+    if not field.required:
+        raise SkipField()
+    raise NotCompilable(field.field_name)
+
+
+class CompiledSerializer:
+    def __init__(self, serializer, model, prefix=''):
+        self.model = model
+        self.prefix = prefix
+        self.steps = []
+        self.columns = {}           # attribute name -> model field, for row objects
+        self.row_class = None
+        self.nested = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            attrs = field.source.split('.') if field.source != '*' else []
+
+            if isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+                raise NotCompilable(name)
+
+            if isinstance(field, serializers.ModelSerializer):
+                relation = _model_field(model, attrs[0]) if len(attrs) == 1 else None
+                if relation is None or not relation.is_relation:
+                    raise NotCompilable(name)
+                nested = CompiledSerializer(field, relation.related_model, prefix + attrs[0] + '__')
+                self.nested.append(nested)
+                self.steps.append((name, self._nested_step(prefix + attrs[0], nested)))
+                continue
+
+            if isinstance(field, serializers.RelatedField):
+                relation = _model_field(model, attrs[0]) if len(attrs) == 1 else None
+                if relation is None or not relation.is_relation or not field.use_pk_only_optimization():
+                    raise NotCompilable(name)
+                self.steps.append((name, self._pk_step(field, prefix + attrs[0])))
+                continue
+
+            if len(attrs) == 1 and _model_field(model, attrs[0]) is not None:
+                model_field = _model_field(model, attrs[0])
+                self.steps.append((name, self._column_step(field, model_field, prefix + attrs[0])))
+                continue
+
+            if len(attrs) > 1:
+                self.steps.append((name, self._dotted_step(field, model, attrs)))
+                continue
+
+            # Property or method field: evaluated on a row object.
+            dependencies = self._dependencies(serializer, field)
+            for dependency in dependencies:
+                model_field = _model_field(model, dependency)
+                if model_field is None or model_field.is_relation:
+                    raise NotCompilable(name)
+                self.columns[dependency] = model_field
+            self.steps.append((name, self._object_step(field)))
+
+        # Row objects get every property of the model, since properties
+        # build on one another (stock_status reads low_stock).
+        properties = {
+            attr: value
+            for klass in reversed(model.__mro__)
+            for attr, value in vars(klass).items()
+            if isinstance(value, property)
+        }
+        self.row_class = type(f'{model.__name__}Row', (), properties)
+
+    @staticmethod
+    def _dependencies(serializer, field):
+        dependencies = getattr(serializer.Meta, 'field_dependencies', {})
+        if field.field_name in dependencies:
+            return dependencies[field.field_name]
+        if field.source in dependencies:
+            return dependencies[field.source]
+        raise NotCompilable(field.field_name)
+
+    # ----- per-field steps: (row, obj) -> value, or raise SkipField -----
+
+    def _column_step(self, field, model_field, key):
+        def step(row, obj):
+            value = _wrap(model_field, row[key])
+            if value is None:
+                return None
+            return field.to_representation(value)
+        return step
+
+    def _pk_step(self, field, key):
+        def step(row, obj):
+            value = row[key]
+            if value is None:
+                return None
+            return field.to_representation(PKOnlyObject(pk=value))
+        return step
+
+    def _dotted_step(self, field, model, attrs):
+        path = []
+        current = model
+        for attr in attrs[:-1]:
+            relation = _model_field(current, attr)
+            if relation is None or not relation.is_relation:
+                raise NotCompilable(field.field_name)
+            path.append(attr)
+            current = relation.related_model
+        model_field = _model_field(current, attrs[-1])
+        if model_field is None:
+            raise NotCompilable(field.field_name)
+        relation_keys = [self.prefix + '__'.join(path[:depth]) for depth in range(1, len(path) + 1)]
+        key = self.prefix + '__'.join(attrs)
+
+        def step(row, obj):
+            if any(row[relation_key] is None for relation_key in relation_keys):
+                return _missing(field)
+            value = _wrap(model_field, row[key])
+            if value is None:
+                return None
+            return field.to_representation(value)
+        return step
+
+    def _nested_step(self, key, nested):
+        converted = {}
+
+        def step(row, obj):
+            pk = row[key]
+            if pk is None:
+                return None
+            if pk not in converted:
+                converted[pk] = nested.convert(row)
+            return dict(converted[pk])
+        return step
+
+    def _object_step(self, field):
+        def step(row, obj):
+            value = field.get_attribute(obj)
+            if value is None:
+                return None
+            return field.to_representation(value)
+        return step
+
+    # ----- running -----
+
+    def make_object(self, row):
+        obj = self.row_class()
+        for name, model_field in self.columns.items():
+            obj.__dict__[name] = _wrap(model_field, row[self.prefix + name])
+        return obj
+
+    def convert(self, row):
+        obj = self.make_object(row) if self.columns else None
+        data = {}
+        for name, step in self.steps:
+            try:
+                data[name] = step(row, obj)
+            except SkipField:
+                pass
+        return data
+
+    def convert_many(self, rows):
+        return [self.convert(row) for row in rows]
+
+    def values(self, queryset):
+        """`queryset` as `.values()` rows carrying what `convert` and the
+        queryset's ordering (read by keyset pagination) need."""
+        ordering = [name.lstrip('-') for name in queryset.query.order_by or queryset.model._meta.ordering]
+        return queryset.values(*dict.fromkeys([*self.value_paths, *ordering]))
+
+
+def compile_serializer(serializer):
+    """A CompiledSerializer for `serializer`, or None if it cannot be compiled."""
+    model = serializer.Meta.model
+    plan = build_plan(serializer, model)
+    if plan.only is None or plan.prefetch or plan.annotations:
+        return None
+    try:
+        compiled = CompiledSerializer(serializer, model)
+    except NotCompilable:
+        return None
+    # The planner's projection is exactly the set of columns to read.
+    compiled.value_paths = sorted(plan.only)
+    return compiled
+
+
+class CompiledListMixin:
+    """Serve `list` through the compiled serializer when it applies.
+
+    Goes after the caching and conditional mixins and before
+    EagerLoadingMixin, whose planned queryset it narrows to `.values()`.
+    """
+
+    def get_compiled_serializer(self):
+        # Compiled per request: the serializer may be pruned by sparse
+        # fieldsets, and nested conversions are memoized per response.
+        return compile_serializer(self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = compiled.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.convert_many(page))
+        return Response(compiled.convert_many(rows))
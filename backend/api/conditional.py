@@ -0,0 +1,113 @@
+"""Conditional GET (ETag / If-None-Match) for API views.
+
+`ConditionalGetMixin` gives list and retrieve responses a strong ETag and
+answers a matching If-None-Match with a 304. Where the tag comes from
+depends on the view:
+
+* catalog views (CatalogCacheMixin) hash the response-cache versions of
+  api/caching.py, so a 304 or a cache hit costs no query at all. Stock
+  moved with update() bumps object versions but not model versions, so
+  like cached responses these tags also roll over every
+  CATALOG_CACHE_TIMEOUT seconds;
+* other views, which only show the user's own rows (an order, the orders,
+  the cart), hash one aggregate over those rows: how many there are and
+  the latest `updated_at`, plus for each of the `etag_fields` reaching
+  into related rows their latest value and how many there are, so removed
+  children change the tag too. The 304 goes out before anything is
+  serialized.
+
+The negotiated format is part of the tag, as JSON, NDJSON and MessagePack
+bodies of one URL differ; responses vary on Accept accordingly.
+
+Nested rows without timestamps of their own (categories and brands inside
+a product) are covered by listing their models in `etag_models`, whose
+versions are mixed into the tag.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from .caching import model_versions
+
+
+def parse_etags(header):
+    """The entity tags listed in an If-None-Match header, weak or strong."""
+    tags = set()
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag:
+            tags.add(tag)
+    return tags
+
+
+class ConditionalGetMixin:
+    etag_fields = ('updated_at',)
+    etag_models = ()
+
+    def get_etag_queryset(self, detail):
+        queryset = self.filter_queryset(self.get_queryset())
+        if detail:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            # A malformed lookup is a 404, as in get_object().
+            try:
+                queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            except (TypeError, ValueError, ValidationError):
+                raise Http404
+        return queryset
+
+    def get_etag_validators(self, detail):
+        """What the tag is built from, besides the request itself."""
+        if hasattr(self, 'get_cache_versions'):
+            return self.get_cache_versions(), time.time() // settings.CATALOG_CACHE_TIMEOUT
+        aggregates = {f'latest_{index}': Max(field) for index, field in enumerate(self.etag_fields)}
+        for index, field in enumerate(self.etag_fields):
+            if '__' in field:
+                # Counts the children a nested list is made of.
+                aggregates[f'children_{index}'] = Count(field.split('__')[0], distinct=True)
+        validators = self.get_etag_queryset(detail).order_by().aggregate(
+            rows=Count('pk', distinct=True), **aggregates,
+        )
+        return sorted(validators.items())
+
+    def make_etag(self, request, validators):
+        params = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values
+        )
+        renderer = getattr(request, 'accepted_renderer', None)
+        raw = repr((
+            request.path, params, request.user.pk, getattr(renderer, 'format', None),
+            validators, model_versions(self.etag_models),
+        ))
+        return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+    def conditional_response(self, request, handler, detail, *args, **kwargs):
+        etag = self.make_etag(request, self.get_etag_validators(detail))
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        # Tags are per user and format, and for the same URL a different
+        # token means a different body.
+        patch_vary_headers(response, ['Authorization', 'Accept'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, False, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, True, *args, **kwargs)
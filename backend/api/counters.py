@@ -0,0 +1,126 @@
+"""Stored active-product counters on Brand and Category.
+
+`Brand.active_product_count` counts the brand's active products.
+`Category.active_product_count` counts active products in the category and
+all of its descendants, so menus can show subtree totals without a query.
+
+Product saves and deletes adjust the counters of the affected brand and
+category chain with F() updates inside the save's transaction (see the
+Product signals in api/signals.py), from the stored state read under a
+row lock. Category moves and deletes are rare,
+so they recompute the category counters wholesale. `manage.py
+rebuild_catalog_counters` repairs drift after bulk updates that bypass
+save().
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from .models import Brand, Category, Product, path_ids
+
+
+def category_chain(category_id):
+    """Ids of the category and all its ancestors, nearest first."""
+    path = Category.objects.filter(pk=category_id).values_list('path', flat=True).first()
+    return path_ids(path)[::-1] if path else [category_id]
+
+
+def _bump(queryset, delta):
+    queryset.update(active_product_count=Greatest(F('active_product_count') + Value(delta), Value(0)))
+
+
+def counted(state):
+    """The (brand_id, category_id) a product state contributes to, if any."""
+    if state is None or not state['is_active']:
+        return None
+    return state['brand_id'], state['category_id']
+
+
+def apply_product_change(before, after):
+    """Move a product's contribution from its `before` to its `after` state.
+
+    Each state is None (no row) or a dict with is_active, brand_id and
+    category_id. Returns whether any counter changed.
+    """
+    old, new = counted(before), counted(after)
+    if old == new:
+        return False
+    old_brand, old_category = old or (None, None)
+    new_brand, new_category = new or (None, None)
+
+    if old_brand != new_brand:
+        if old_brand is not None:
+            _bump(Brand.objects.filter(pk=old_brand), -1)
+        if new_brand is not None:
+            _bump(Brand.objects.filter(pk=new_brand), 1)
+
+    if old_category != new_category:
+        old_chain = category_chain(old_category) if old_category is not None else []
+        new_chain = category_chain(new_category) if new_category is not None else []
+        # Shared ancestors keep their count; only the diverging parts move.
+        shared = set(old_chain) & set(new_chain)
+        removed = [pk for pk in old_chain if pk not in shared]
+        added = [pk for pk in new_chain if pk not in shared]
+        if removed:
+            _bump(Category.objects.filter(pk__in=removed), -1)
+        if added:
+            _bump(Category.objects.filter(pk__in=added), 1)
+    return True
+
+
+def product_state(product):
+    return {
+        'is_active': product.is_active,
+        'brand_id': product.brand_id,
+        'category_id': product.category_id,
+    }
+
+
+def stored_product_state(pk):
+    """The product's state as stored, with its row locked until the end of
+    the current transaction: concurrent saves of it then apply their
+    changes one after the other, each from the state the previous one left."""
+    if pk is None:
+        return None
+    return (
+        Product.objects.select_for_update().filter(pk=pk)
+        .values('is_active', 'brand_id', 'category_id').first()
+    )
+
+
+def rebuild_brand_counts():
+    counts = dict(
+        Product.objects.filter(is_active=True, brand__isnull=False)
+        .order_by().values_list('brand_id').annotate(n=Count('id'))
+    )
+    brands = list(Brand.objects.only('id', 'active_product_count'))
+    for brand in brands:
+        brand.active_product_count = counts.get(brand.id, 0)
+    Brand.objects.bulk_update(brands, ['active_product_count'], batch_size=500)
+
+
+def rebuild_category_counts():
+    own = dict(
+        Product.objects.filter(is_active=True, category__isnull=False)
+        .order_by().values_list('category_id').annotate(n=Count('id'))
+    )
+    # Walks parent ids rather than paths: this also runs from the post_save
+    # of a moved category, before its descendants' paths are rewritten.
+    categories = list(Category.objects.only('id', 'parent_id', 'active_product_count'))
+    parents = {c.id: c.parent_id for c in categories}
+    totals = defaultdict(int)
+    for category_id, count in own.items():
+        current, seen = category_id, set()
+        while current is not None and current not in seen:
+            seen.add(current)
+            totals[current] += count
+            current = parents.get(current)
+    for category in categories:
+        category.active_product_count = totals.get(category.id, 0)
+    Category.objects.bulk_update(categories, ['active_product_count'], batch_size=500)
+
+
+def rebuild_all():
+    rebuild_brand_counts()
+    rebuild_category_counts()
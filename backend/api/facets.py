@@ -0,0 +1,120 @@
+"""Facet counts for product listings.
+
+`product_facets` returns, for any filtered product queryset, the number of
+matching products per brand, per category (rolled up to ancestors), per
+sale price range, per stock status and per merchandising flag.
+
+Everything comes out of one GROUP BY over the combination of those
+attributes; folding the grouped rows into the individual facets happens in
+Python. Two small lookups fetch brand and category names.
+"""
+from collections import defaultdict
+
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from .filters import FLAG_PARAMS, STOCK_STATUSES
+from .models import Brand, Category, path_ids
+
+
+# (min, max) pairs; max is exclusive and None means unbounded.
+PRICE_RANGES = (
+    (0, 25),
+    (25, 50),
+    (50, 100),
+    (100, 250),
+    (250, 500),
+    (500, 1000),
+    (1000, None),
+)
+
+
+def price_range_expression():
+    whens = [
+        When(sale_price__lt=upper, then=Value(index))
+        for index, (_, upper) in enumerate(PRICE_RANGES) if upper is not None
+    ]
+    return Case(*whens, default=Value(len(PRICE_RANGES) - 1), output_field=IntegerField())
+
+
+def stock_status_expression():
+    """Database equivalent of `Product.stock_status`, as an index into STOCK_STATUSES."""
+    in_stock, low_stock, out_of_stock = range(len(STOCK_STATUSES))
+    return Case(
+        When(manage_stock=False, then=Value(in_stock)),
+        When(stock=0, then=Value(out_of_stock)),
+        When(stock__lte=F('low_stock_threshold'), then=Value(low_stock)),
+        default=Value(in_stock),
+        output_field=IntegerField(),
+    )
+
+
+def ancestor_map(categories):
+    """Map each category id to the ids of itself and all its ancestors."""
+    return {c.id: path_ids(c.path) or [c.id] for c in categories}
+
+
+def product_facets(queryset):
+    rows = (
+        queryset
+        .order_by()
+        .annotate(price_range=price_range_expression(), stock_state=stock_status_expression())
+        .values('brand_id', 'category_id', 'price_range', 'stock_state', *FLAG_PARAMS)
+        .annotate(count=Count('id'))
+    )
+
+    total = 0
+    brand_counts = defaultdict(int)
+    category_counts = defaultdict(int)
+    price_counts = [0] * len(PRICE_RANGES)
+    stock_counts = [0] * len(STOCK_STATUSES)
+    flag_counts = dict.fromkeys(FLAG_PARAMS, 0)
+
+    for row in rows:
+        count = row['count']
+        total += count
+        if row['brand_id'] is not None:
+            brand_counts[row['brand_id']] += count
+        if row['category_id'] is not None:
+            category_counts[row['category_id']] += count
+        price_counts[row['price_range']] += count
+        stock_counts[row['stock_state']] += count
+        for flag in FLAG_PARAMS:
+            if row[flag]:
+                flag_counts[flag] += count
+
+    brands = Brand.objects.filter(id__in=brand_counts).only('id', 'name', 'slug')
+
+    # Categories count their own products plus those of every descendant.
+    categories = list(Category.objects.only('id', 'name', 'slug', 'parent_id', 'path'))
+    chains = ancestor_map(categories)
+    subtree_counts = defaultdict(int)
+    for category_id, count in category_counts.items():
+        for ancestor_id in chains.get(category_id, [category_id]):
+            subtree_counts[ancestor_id] += count
+
+    return {
+        'total': total,
+        'brands': sorted(
+            [
+                {'id': b.id, 'name': b.name, 'slug': b.slug, 'count': brand_counts[b.id]}
+                for b in brands
+            ],
+            key=lambda item: (-item['count'], item['name']),
+        ),
+        'categories': sorted(
+            [
+                {
+                    'id': c.id, 'name': c.name, 'slug': c.slug, 'parent': c.parent_id,
+                    'count': subtree_counts[c.id],
+                }
+                for c in categories if subtree_counts.get(c.id)
+            ],
+            key=lambda item: (-item['count'], item['name']),
+        ),
+        'price_ranges': [
+            {'min': lower, 'max': upper, 'count': price_counts[index]}
+            for index, (lower, upper) in enumerate(PRICE_RANGES)
+        ],
+        'stock_status': dict(zip(STOCK_STATUSES, stock_counts)),
+        'flags': flag_counts,
+    }
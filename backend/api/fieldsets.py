@@ -0,0 +1,85 @@
+"""Sparse fieldsets: `?fields=` and `?exclude=` on read requests.
+
+Both take a comma separated list of field names; dots reach into nested
+serializers:
+
+    /api/products/?fields=id,title,price,category.name
+    /api/orders/?exclude=items.product.description
+
+`fields` keeps only the listed fields (naming a nested field without a
+sub-list keeps all of it), `exclude` drops the listed leaves. Unknown names
+are ignored. Serializers opt in with `SparseFieldsetsMixin`; nested
+serializers are pruned by their path from the root. The eager-loading
+planner (api/prefetch.py) plans the pruned tree, so the SQL projection
+shrinks with it.
+"""
+from rest_framework.permissions import SAFE_METHODS
+
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+
+
+def parse_fieldset(value):
+    """'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}"""
+    tree = {}
+    for item in value.split(','):
+        node = tree
+        for name in item.strip().split('.'):
+            if not name:
+                break
+            node = node.setdefault(name, {})
+    return tree
+
+
+def has_sparse_fieldsets(request):
+    if request is None or request.method not in SAFE_METHODS:
+        return False
+    params = request.query_params
+    return bool(params.get(FIELDS_PARAM) or params.get(EXCLUDE_PARAM))
+
+
+def _subtree(tree, path):
+    """The part of `tree` below `path`; None if the path is not in it, {}
+    if the path is a leaf (the whole field was named)."""
+    node = tree
+    for name in path:
+        if not node:
+            return {}
+        if name not in node:
+            return None
+        node = node[name]
+    return node
+
+
+class SparseFieldsetsMixin:
+    """Prune a serializer's fields from the request's sparse fieldsets."""
+
+    def _field_path(self):
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.insert(0, node.field_name)
+            node = node.parent
+        return path
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if not has_sparse_fieldsets(request):
+            return fields
+        params = request.query_params
+        path = self._field_path()
+
+        if params.get(FIELDS_PARAM):
+            include = _subtree(parse_fieldset(params[FIELDS_PARAM]), path)
+            if include:
+                fields = {name: field for name, field in fields.items() if name in include}
+
+        if params.get(EXCLUDE_PARAM):
+            exclude = _subtree(parse_fieldset(params[EXCLUDE_PARAM]), path)
+            for name, below in (exclude or {}).items():
+                if not below:
+                    fields.pop(name, None)
+        return fields
@@ -0,0 +1,174 @@
+"""Query-parameter driven filtering and sorting for product listings.
+
+`ProductFilter` turns the query string of a product listing request into
+queryset filters and an ordering, so filtering, sorting and pagination all
+happen in the database instead of in the browser.
+
+Supported parameters:
+
+    category      id or slug (comma separated for several); includes subcategories
+    brand         id or slug (comma separated for several)
+    min_price     lower bound on sale price (inclusive)
+    max_price     upper bound on sale price (inclusive)
+    stock_status  in_stock, low_stock or out_of_stock
+    in_stock      true/false
+    is_trending, is_featured, is_bestseller, is_new_arrival   true/false
+    search        free text matched through the full-text index
+    sort          one of SORT_OPTIONS (defaults to newest first)
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError
+
+from .models import Category, subtree_q
+from .search import search_product_ids
+
+
+FLAG_PARAMS = ('is_trending', 'is_featured', 'is_bestseller', 'is_new_arrival')
+
+STOCK_STATUSES = ('in_stock', 'low_stock', 'out_of_stock')
+
+# Every ordering ends with a unique column so pages are stable.
+SORT_OPTIONS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'price_asc': ('sale_price', 'id'),
+    'price_desc': ('-sale_price', '-id'),
+    'name': ('title', 'id'),
+    'name_desc': ('-title', '-id'),
+}
+DEFAULT_SORT = 'newest'
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+
+def parse_bool(value, param):
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError({param: f'Expected a boolean, got "{value}".'})
+
+
+def parse_decimal(value, param):
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({param: f'Expected a number, got "{value}".'})
+    if not number.is_finite() or number < 0:
+        raise ValidationError({param: 'Expected a non-negative number.'})
+    return number
+
+
+def split_values(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def id_or_slug_q(field, values):
+    """Match a related object by primary key or slug."""
+    ids = [v for v in values if v.isdigit()]
+    slugs = [v for v in values if not v.isdigit()]
+    q = Q()
+    if ids:
+        q |= Q(**{f'{field}_id__in': ids})
+    if slugs:
+        q |= Q(**{f'{field}__slug__in': slugs})
+    return q
+
+
+def category_subtree_q(values):
+    """Match products in the given categories or anywhere below them."""
+    ids = [v for v in values if v.isdigit()]
+    slugs = [v for v in values if not v.isdigit()]
+    paths = Category.objects.filter(Q(id__in=ids) | Q(slug__in=slugs)).values_list('path', flat=True)
+    return subtree_q(paths, 'category__path')
+
+
+def stock_status_q(status):
+    """Database equivalent of `Product.stock_status`."""
+    unmanaged = Q(manage_stock=False)
+    if status == 'in_stock':
+        return unmanaged | Q(stock__gt=F('low_stock_threshold'))
+    if status == 'low_stock':
+        return Q(manage_stock=True, stock__gt=0, stock__lte=F('low_stock_threshold'))
+    return Q(manage_stock=True, stock=0)
+
+
+class ProductFilter:
+    """Apply listing query parameters to a product queryset."""
+
+    def __init__(self, params):
+        self.params = params
+
+    def get(self, name):
+        value = self.params.get(name)
+        if value is None or not value.strip():
+            return None
+        return value.strip()
+
+    def filter_queryset(self, queryset):
+        queryset = queryset.filter(self.build_q())
+        queryset = self.filter_search(queryset)
+        return queryset
+
+    def build_q(self):
+        q = Q()
+
+        category = self.get('category')
+        if category:
+            q &= category_subtree_q(split_values(category))
+
+        brand = self.get('brand')
+        if brand:
+            q &= id_or_slug_q('brand', split_values(brand))
+
+        min_price = self.get('min_price')
+        if min_price:
+            q &= Q(sale_price__gte=parse_decimal(min_price, 'min_price'))
+
+        max_price = self.get('max_price')
+        if max_price:
+            q &= Q(sale_price__lte=parse_decimal(max_price, 'max_price'))
+
+        stock_status = self.get('stock_status')
+        if stock_status:
+            if stock_status not in STOCK_STATUSES:
+                raise ValidationError({
+                    'stock_status': f'Expected one of {", ".join(STOCK_STATUSES)}.'
+                })
+            q &= stock_status_q(stock_status)
+
+        in_stock = self.get('in_stock')
+        if in_stock:
+            available = Q(manage_stock=False) | Q(stock__gt=0)
+            q &= available if parse_bool(in_stock, 'in_stock') else ~available
+
+        for flag in FLAG_PARAMS:
+            value = self.get(flag)
+            if value:
+                q &= Q(**{flag: parse_bool(value, flag)})
+
+        return q
+
+    def filter_search(self, queryset):
+        search = self.get('search')
+        if not search:
+            return queryset
+        # Matching goes through the full-text index; ranking is only used by
+        # the dedicated search endpoint, listings keep their sort order.
+        return queryset.filter(id__in=search_product_ids(search))
+
+    def get_sort(self):
+        sort = self.get('sort') or DEFAULT_SORT
+        if sort not in SORT_OPTIONS:
+            raise ValidationError({'sort': f'Expected one of {", ".join(SORT_OPTIONS)}.'})
+        return sort
+
+    def get_ordering(self):
+        return SORT_OPTIONS[self.get_sort()]
+
+    def apply(self, queryset):
+        return self.filter_queryset(queryset).order_by(*self.get_ordering())
@@ -0,0 +1,264 @@
+"""Oversell-proof stock reservations.
+
+When a cart enters checkout (POST /cart/reserve/) its lines are taken off
+stock and held as StockReservation rows for STOCK_RESERVATION_TTL seconds.
+Placing the order consumes them (api/checkout.py). `manage.py
+release_expired_reservations`, run e.g. every minute from cron, gives
+expired holds back in bulk.
+
+A line's stock lives on its variant if it names one, on the product
+otherwise. Before any stock moves, `_lock` locks every row the
+transaction will write with SELECT ... FOR UPDATE: the products of all
+lines, including the parents of variants whose `updated_at` is touched,
+in id order, then the variants in id order. Every hold and release takes
+its locks in that one order, so two of them never wait on each other
+crosswise, and checkouts of different products never wait at all. The
+stock and `backordered` count read under the lock then decide each take:
+units beyond stock become backorders if the product allows them, up to
+`backorder_limit` (0 meaning no limit). Products that do not manage stock
+are not reserved.
+
+`backordered` counts units sold beyond stock until whoever receives new
+stock fulfils them. Stock is changed with update(), which skips save():
+the products' `updated_at` is touched for ETags and their object versions
+are bumped for cached details, while cached list pages catch up within
+CATALOG_CACHE_TIMEOUT.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, When
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import caching
+from .models import Product, ProductVariant, StockReservation
+
+
+BATCH_SIZE = 500
+
+
+def line_label(key):
+    """How errors name a line: "<product_id>", or "<product_id>:<variant_id>"."""
+    product_id, variant_id = key
+    return f'{product_id}:{variant_id}' if variant_id else str(product_id)
+
+
+def load(lines):
+    """Products and variants of `lines` ({(product_id, variant_id): quantity}),
+    by id. Raises ValidationError for lines that cannot be ordered."""
+    products = Product.objects.filter(pk__in={product_id for product_id, _ in lines}).only(
+        'id', 'title', 'price', 'is_active', 'manage_stock', 'allow_backorders', 'backorder_limit',
+    ).in_bulk()
+    variants = ProductVariant.objects.filter(pk__in={variant_id for _, variant_id in lines if variant_id}).only(
+        'id', 'product_id', 'price_modifier', 'is_active',
+    ).in_bulk()
+    errors = {}
+    for key in lines:
+        product_id, variant_id = key
+        product = products.get(product_id)
+        variant = variants.get(variant_id)
+        if (
+            product is None or not product.is_active
+            or variant_id and (variant is None or not variant.is_active or variant.product_id != product_id)
+        ):
+            errors[line_label(key)] = 'This product is no longer available.'
+    if errors:
+        raise ValidationError({'items': errors})
+    return products, variants
+
+
+def _stock_row(product_id, variant_id):
+    return (ProductVariant, variant_id) if variant_id else (Product, product_id)
+
+
+def _touch(model, now):
+    # Variants have no updated_at of their own; their product's is touched
+    # once per batch in _changed().
+    return {'updated_at': now} if model is Product else {}
+
+
+def _lock(keys):
+    """Lock the stock rows of `keys` ((product_id, variant_id) pairs) and
+    the products of their variants, products first, each in id order.
+    Returns {(model, pk): [stock, backordered]} as read under the lock."""
+    product_ids = {product_id for product_id, _ in keys}
+    variant_ids = {variant_id for _, variant_id in keys if variant_id}
+    locked = {}
+    for model, pks in ((Product, product_ids), (ProductVariant, variant_ids)):
+        if pks:
+            rows = model.objects.select_for_update().filter(pk__in=pks).order_by('pk')
+            for pk, stock, backordered in rows.values_list('pk', 'stock', 'backordered'):
+                locked[model, pk] = [stock, backordered]
+    return locked
+
+
+def _take(locked, model, pk, quantity, product):
+    """Take `quantity` units off one stock row locked by _lock(), in
+    `locked` only; returns (from_stock, backordered), or None when it
+    cannot supply them. _write_takes() stores the result."""
+    if (model, pk) not in locked:
+        return None
+    stock, backordered = locked[model, pk]
+    from_stock = min(stock, quantity)
+    short = quantity - from_stock
+    if short and (
+        not product.allow_backorders
+        or product.backorder_limit and backordered + short > product.backorder_limit
+    ):
+        return None
+    locked[model, pk] = [stock - from_stock, backordered + short]
+    return from_stock, short
+
+
+def _write_takes(reservations, now):
+    """Take the units of new `reservations` off stock, one UPDATE per table."""
+    amounts = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for reservation in reservations:
+        model, pk = _stock_row(reservation.product_id, reservation.variant_id)
+        amounts[model][pk][0] += reservation.from_stock
+        amounts[model][pk][1] += reservation.backordered
+    for model, rows in amounts.items():
+        model.objects.filter(pk__in=rows).update(
+            stock=Case(
+                *(When(pk=pk, then=F('stock') - units) for pk, (units, _) in rows.items()),
+                output_field=PositiveIntegerField(),
+            ),
+            backordered=Case(
+                *(When(pk=pk, then=F('backordered') + short) for pk, (_, short) in rows.items()),
+                output_field=PositiveIntegerField(),
+            ),
+            **_touch(model, now),
+        )
+
+
+def _give_back(reservations, now, locked=None):
+    """Return the units of `reservations` to stock, one UPDATE per table,
+    keeping `locked` (see _lock()) in step if given."""
+    amounts = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for reservation in reservations:
+        model, pk = _stock_row(reservation.product_id, reservation.variant_id)
+        amounts[model][pk][0] += reservation.from_stock
+        amounts[model][pk][1] += reservation.backordered
+    for model, rows in amounts.items():
+        stock, backordered = [], []
+        for pk, (units, short) in rows.items():
+            stock.append(When(pk=pk, then=F('stock') + units))
+            # Fulfilled backorders may already have been taken off.
+            backordered.append(When(pk=pk, backordered__gte=short, then=F('backordered') - short))
+            backordered.append(When(pk=pk, then=0))
+            if locked is not None and (model, pk) in locked:
+                current = locked[model, pk]
+                locked[model, pk] = [current[0] + units, current[1] - short if current[1] >= short else 0]
+        model.objects.filter(pk__in=rows).update(
+            stock=Case(*stock, output_field=PositiveIntegerField()),
+            backordered=Case(*backordered, output_field=PositiveIntegerField()),
+            **_touch(model, now),
+        )
+
+
+def _keys(reservations):
+    return [(reservation.product_id, reservation.variant_id) for reservation in reservations]
+
+
+def _changed(reservations, now):
+    """Touch and invalidate the products whose stock `reservations` moved."""
+    product_ids = {reservation.product_id for reservation in reservations}
+    through_variants = {reservation.product_id for reservation in reservations if reservation.variant_id}
+    if through_variants:
+        Product.objects.filter(pk__in=through_variants).update(updated_at=now)
+
+    def bump():
+        for product_id in product_ids:
+            caching.bump(Product, product_id)
+    if product_ids:
+        transaction.on_commit(bump)
+
+
+def hold(user, lines, products):
+    """Make `user`'s reservations hold exactly `lines` ({(product_id,
+    variant_id): quantity} of the loaded `products`) and renew them;
+    returns when they expire. Raises ValidationError, changing nothing, if
+    any line cannot be supplied."""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+    wanted = {key: quantity for key, quantity in lines.items() if products[key[0]].manage_stock}
+    with transaction.atomic():
+        held = defaultdict(list)
+        for reservation in StockReservation.objects.select_for_update().filter(user=user).order_by('pk'):
+            held[reservation.product_id, reservation.variant_id].append(reservation)
+        kept, released = [], []
+        for key, reservations in held.items():
+            if sum(reservation.quantity for reservation in reservations) == wanted.get(key):
+                kept.extend(reservations)
+            else:
+                released.extend(reservations)
+        kept_keys = set(_keys(kept))
+        missing = [key for key in wanted if key not in kept_keys]
+        locked = _lock(_keys(released) + missing)
+        if released:
+            _give_back(released, now, locked)
+            StockReservation.objects.filter(pk__in=[reservation.pk for reservation in released]).delete()
+
+        taken, errors = [], {}
+        for key in missing:
+            product_id, variant_id = key
+            model, pk = _stock_row(product_id, variant_id)
+            result = _take(locked, model, pk, wanted[key], products[product_id])
+            if result is None:
+                errors[line_label(key)] = 'Not enough stock.'
+                continue
+            from_stock, backordered = result
+            taken.append(StockReservation(
+                user=user, product_id=product_id, variant_id=variant_id, quantity=wanted[key],
+                from_stock=from_stock, backordered=backordered, expires_at=expires_at,
+            ))
+        if errors:
+            raise ValidationError({'items': errors})
+
+        _write_takes(taken, now)
+        StockReservation.objects.bulk_create(taken)
+        StockReservation.objects.filter(pk__in=[reservation.pk for reservation in kept]).update(expires_at=expires_at)
+        _changed(released + taken, now)
+    return expires_at
+
+
+def consume(user):
+    """Turn `user`'s reservations into sold stock, i.e. forget them."""
+    StockReservation.objects.filter(user=user).delete()
+
+
+def release(user):
+    """Give back everything `user` holds."""
+    now = timezone.now()
+    with transaction.atomic():
+        reservations = list(StockReservation.objects.select_for_update().filter(user=user))
+        if reservations:
+            _lock(_keys(reservations))
+            _give_back(reservations, now)
+            StockReservation.objects.filter(pk__in=[reservation.pk for reservation in reservations]).delete()
+            _changed(reservations, now)
+    return len(reservations)
+
+
+def release_expired(now=None, batch_size=BATCH_SIZE):
+    """Give back every reservation past its expiry; returns how many."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            # Holds being checked out are locked by their checkout: skip them.
+            batch = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=now).order_by('expires_at', 'pk')[:batch_size]
+            )
+            if batch:
+                _lock(_keys(batch))
+                _give_back(batch, now)
+                StockReservation.objects.filter(pk__in=[reservation.pk for reservation in batch]).delete()
+                _changed(batch, now)
+        released += len(batch)
+        if len(batch) < batch_size:
+            return released
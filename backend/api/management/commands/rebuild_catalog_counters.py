@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored active product counts on brands and categories'
+
+    def handle(self, *args, **options):
+        counters.rebuild_all()
+        self.stdout.write(self.style.SUCCESS('Catalog counters rebuilt.'))
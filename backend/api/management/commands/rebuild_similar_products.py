@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api import similarity
+
+
+class Command(BaseCommand):
+    help = 'Recompute the similar products of products changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recompute the similar products of every product',
+        )
+
+    def handle(self, *args, **options):
+        rewritten = similarity.rebuild(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Similar products recomputed for {rewritten} products.'))
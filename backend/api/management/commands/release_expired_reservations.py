@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api import inventory
+
+
+class Command(BaseCommand):
+    help = 'Give the stock of expired checkout reservations back, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=inventory.BATCH_SIZE,
+            help='Reservations released per transaction',
+        )
+
+    def handle(self, *args, **options):
+        released = inventory.release_expired(batch_size=max(options['batch_size'], 1))
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired reservations.'))
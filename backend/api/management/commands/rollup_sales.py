@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api import sales
+
+
+class Command(BaseCommand):
+    help = 'Fold new order items into the sales rollups behind the bestseller and trending rankings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--flag-top', type=int, default=0, metavar='N',
+            help='Also set is_bestseller and is_trending on the N top ranked products and clear them elsewhere',
+        )
+
+    def handle(self, *args, **options):
+        folded = sales.rollup()
+        self.stdout.write(self.style.SUCCESS(f'Sales rolled up ({folded} new product-hours).'))
+        if options['flag_top'] > 0:
+            changed = sales.update_flags(options['flag_top'])
+            self.stdout.write(self.style.SUCCESS(f'Bestseller and trending flags updated on {changed} products.'))
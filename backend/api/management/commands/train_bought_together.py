@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Count product pairs of new orders and refresh the frequently-bought-together neighbours'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Discard the stored counts and retrain from the whole order history',
+        )
+
+    def handle(self, *args, **options):
+        orders = recommendations.train(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Bought-together pairs updated from {orders} orders.'))
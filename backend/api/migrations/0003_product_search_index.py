@@ -0,0 +1,77 @@
+from django.db import migrations
+
+
+SQLITE_CREATE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_product_fts USING fts5(
+        title, short_description, description, search_keywords, brand, category,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+"""
+
+SQLITE_POPULATE = """
+    INSERT INTO api_product_fts (rowid, title, short_description, description,
+                                 search_keywords, brand, category)
+    SELECT p.id, p.title, p.short_description, p.description, p.search_keywords,
+           COALESCE(b.name, ''), COALESCE(c.name, '')
+    FROM api_product p
+    LEFT JOIN api_brand b ON b.id = p.brand_id
+    LEFT JOIN api_category c ON c.id = p.category_id
+"""
+
+PG_CREATE = [
+    """
+    CREATE TABLE IF NOT EXISTS api_product_search (
+        product_id bigint PRIMARY KEY
+            REFERENCES api_product (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS api_product_search_document_idx
+        ON api_product_search USING GIN (document)
+    """,
+]
+
+PG_POPULATE = """
+    INSERT INTO api_product_search (product_id, document)
+    SELECT p.id,
+        setweight(to_tsvector('english', COALESCE(p.title, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(p.search_keywords, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(b.name, '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(c.name, '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(p.short_description, '')), 'C') ||
+        setweight(to_tsvector('english', COALESCE(p.description, '')), 'D')
+    FROM api_product p
+    LEFT JOIN api_brand b ON b.id = p.brand_id
+    LEFT JOIN api_category c ON c.id = p.category_id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+        schema_editor.execute(SQLITE_POPULATE)
+    elif vendor == 'postgresql':
+        for statement in PG_CREATE:
+            schema_editor.execute(statement)
+        schema_editor.execute(PG_POPULATE)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS api_product_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS api_product_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:45
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Brand = apps.get_model('api', 'Brand')
+    Category = apps.get_model('api', 'Category')
+    Product = apps.get_model('api', 'Product')
+    active = Product.objects.filter(is_active=True).order_by()
+
+    brand_counts = dict(active.filter(brand__isnull=False).values_list('brand_id').annotate(n=Count('id')))
+    for brand_id, count in brand_counts.items():
+        Brand.objects.filter(pk=brand_id).update(active_product_count=count)
+
+    own = dict(active.filter(category__isnull=False).values_list('category_id').annotate(n=Count('id')))
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    totals = defaultdict(int)
+    for category_id, count in own.items():
+        current, seen = category_id, set()
+        while current is not None and current not in seen:
+            seen.add(current)
+            totals[current] += count
+            current = parents.get(current)
+    for category_id, count in totals.items():
+        Category.objects.filter(pk=category_id).update(active_product_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brand',
+            name='active_product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='active_product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
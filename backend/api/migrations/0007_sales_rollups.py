@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_product_sale_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_order_item_id', models.PositiveBigIntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductSalesStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_stats', serialize=False, to='api.product')),
+                ('quantity_24h', models.PositiveIntegerField(default=0)),
+                ('quantity_7d', models.PositiveIntegerField(default=0)),
+                ('quantity_30d', models.PositiveIntegerField(default=0)),
+                ('revenue_24h', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue_7d', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue_30d', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('trending_score', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-quantity_30d'], name='api_product_quantit_6ffbf1_idx'), models.Index(fields=['-trending_score'], name='api_product_trendin_75375f_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSalesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_buckets', to='api.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='api_product_hour_04db8e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'hour'), name='unique_product_sales_hour')],
+            },
+        ),
+    ]
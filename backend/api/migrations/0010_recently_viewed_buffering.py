@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:07
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+# Same cap as api.recently_viewed.HISTORY_LIMIT when this was written.
+HISTORY_LIMIT = 50
+
+
+def trim_histories(apps, schema_editor):
+    RecentlyViewed = apps.get_model('api', 'RecentlyViewed')
+    long_histories = (
+        RecentlyViewed.objects.order_by().values_list('user_id')
+        .annotate(n=Count('id')).filter(n__gt=HISTORY_LIMIT).values_list('user_id', flat=True)
+    )
+    for user_id in long_histories:
+        stale = list(
+            RecentlyViewed.objects.filter(user_id=user_id)
+            .order_by('-viewed_at', '-id').values_list('id', flat=True)[HISTORY_LIMIT:]
+        )
+        RecentlyViewed.objects.filter(pk__in=stale).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_similar_products'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recentlyviewed',
+            name='viewed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='recentlyviewed',
+            index=models.Index(fields=['user', '-viewed_at'], name='api_recentl_user_id_15a4ae_idx'),
+        ),
+        migrations.RunPython(trim_histories, migrations.RunPython.noop),
+    ]
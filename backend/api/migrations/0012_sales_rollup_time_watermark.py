@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:28
+
+from django.db import migrations, models
+
+
+def carry_watermark(apps, schema_editor):
+    # Continue from the creation time of the last item already rolled up.
+    SalesRollupState = apps.get_model('api', 'SalesRollupState')
+    OrderItem = apps.get_model('api', 'OrderItem')
+    for state in SalesRollupState.objects.filter(last_order_item_id__gt=0):
+        state.last_order_item_at = (
+            OrderItem.objects.filter(pk__lte=state.last_order_item_id)
+            .order_by('-pk').values_list('created_at', flat=True).first()
+        )
+        state.save(update_fields=['last_order_item_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesrollupstate',
+            name='last_order_item_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(carry_watermark, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='salesrollupstate',
+            name='last_order_item_id',
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['created_at'], name='api_orderit_created_705128_idx'),
+        ),
+    ]
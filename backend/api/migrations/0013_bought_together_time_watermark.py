@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+def carry_watermark(apps, schema_editor):
+    # Continue from the creation time of the last item already counted.
+    BoughtTogetherState = apps.get_model('api', 'BoughtTogetherState')
+    OrderItem = apps.get_model('api', 'OrderItem')
+    for state in BoughtTogetherState.objects.filter(last_order_item_id__gt=0):
+        state.last_order_item_at = (
+            OrderItem.objects.filter(pk__lte=state.last_order_item_id)
+            .order_by('-pk').values_list('created_at', flat=True).first()
+        )
+        state.save(update_fields=['last_order_item_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_sales_rollup_time_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boughttogetherstate',
+            name='last_order_item_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(carry_watermark, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='boughttogetherstate',
+            name='last_order_item_id',
+        ),
+    ]
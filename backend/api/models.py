@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Concat, Round, Substr
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from django.utils.text import slugify
 from decimal import Decimal
 
@@ -14,6 +16,39 @@ class UserProfile(models.Model):
 		return self.user.username
 
 
+# Each category stores the ids of its ancestors and itself as a materialized
+# path of fixed-width segments, e.g. "00000001/00000007/". A subtree is then
+# every path starting with the category's own, which is a plain range scan
+# on the indexed column.
+PATH_DIGITS = 8
+PATH_SEPARATOR = '/'
+
+
+def path_segment(pk):
+    return str(pk).zfill(PATH_DIGITS) + PATH_SEPARATOR
+
+
+def path_ids(path):
+    """Category ids along a path, root first."""
+    return [int(segment) for segment in path.split(PATH_SEPARATOR) if segment]
+
+
+def path_range(path):
+    """(lower, upper) bounds matching `path` and every path below it."""
+    # Every descendant path continues with a digit after the trailing
+    # separator, and the separator sorts right before '0'.
+    return path, path[:-1] + chr(ord(PATH_SEPARATOR) + 1)
+
+
+def subtree_q(paths, field='path'):
+    """Q matching rows whose `field` lies under any of the given paths."""
+    q = models.Q(pk__in=[])
+    for path in paths:
+        lower, upper = path_range(path)
+        q |= models.Q(**{f'{field}__gte': lower, f'{field}__lt': upper})
+    return q
+
+
 class Category(models.Model):
     name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True)
@@ -22,6 +57,12 @@ class Category(models.Model):
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)  
+    # Active products in this category and all its descendants; maintained
+    # by api/counters.py.
+    active_product_count = models.PositiveIntegerField(default=0, editable=False)
+    # Materialized path and depth (0 for roots), maintained by save().
+    path = models.CharField(max_length=255, blank=True, default='', editable=False, db_index=True)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
@@ -29,6 +70,42 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            parent_path = ''
+            if self.parent_id is not None:
+                parent_path = Category.objects.values_list('path', flat=True).get(pk=self.parent_id)
+
+            if self.pk is None:
+                super().save(*args, **kwargs)
+                self.path = parent_path + path_segment(self.pk)
+                self.depth = len(path_ids(self.path)) - 1
+                Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+                return
+
+            old_path = Category.objects.filter(pk=self.pk).values_list('path', flat=True).first()
+            new_path = parent_path + path_segment(self.pk)
+            if old_path and new_path != old_path and new_path.startswith(old_path):
+                raise ValueError('A category cannot be moved below itself.')
+            self.path = new_path
+            self.depth = len(path_ids(new_path)) - 1
+            super().save(*args, **kwargs)
+
+            if old_path and old_path != new_path:
+                # Re-root every descendant in one statement.
+                lower, upper = path_range(old_path)
+                Category.objects.filter(path__gt=lower, path__lt=upper).update(
+                    path=Concat(models.Value(new_path), Substr('path', len(old_path) + 1)),
+                    depth=models.F('depth') + (len(path_ids(new_path)) - len(path_ids(old_path))),
+                )
+
+    def get_ancestor_ids(self):
+        """Ids from the root down to and including this category."""
+        return path_ids(self.path)
+
+    def subtree_q(self, field='path'):
+        return subtree_q([self.path], field)
+
 class Brand(models.Model):
     name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True)
@@ -36,6 +113,8 @@ class Brand(models.Model):
     logo = models.ImageField(upload_to='brands/', blank=True, null=True)
     website = models.URLField(blank=True)
     is_active = models.BooleanField(default=True)
+    # Maintained by api/counters.py.
+    active_product_count = models.PositiveIntegerField(default=0, editable=False)
     
     def __str__(self):
         return self.name
@@ -59,12 +138,23 @@ class Product(models.Model):
     compare_at_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, validators=[MinValueValidator(0)])
     cost_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, validators=[MinValueValidator(0)])
     discount_percentage = models.IntegerField(default=0, validators=[MinValueValidator(0), MaxValueValidator(100)])
+    # Price after discount, computed and stored by the database so listings
+    # can filter and sort on it through an index. Being a generated column
+    # it stays right through save(), queryset.update() and bulk_create().
+    sale_price = models.GeneratedField(
+        expression=Round(models.F('price') * (100 - models.F('discount_percentage')) / 100, 2),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     
     stock = models.PositiveIntegerField(default=0)
     low_stock_threshold = models.PositiveIntegerField(default=10)
     manage_stock = models.BooleanField(default=True)
     allow_backorders = models.BooleanField(default=False)
     backorder_limit = models.PositiveIntegerField(default=0)
+    # Units reserved or sold beyond stock, counted against backorder_limit
+    # (0 meaning no limit); see api/inventory.py.
+    backordered = models.PositiveIntegerField(default=0)
     
     # ===== PHYSICAL SPECIFICATIONS =====
     weight = models.DecimalField(max_digits=8, decimal_places=3, blank=True, null=True, validators=[MinValueValidator(0)])  # in kg
@@ -126,6 +216,10 @@ class Product(models.Model):
             models.Index(fields=['brand']),
             models.Index(fields=['is_active']),
             models.Index(fields=['price']),
+            # Price filters and sorts on what customers pay.
+            models.Index(fields=['sale_price', 'id']),
+            # Keyset pagination walks (created_at, id) newest first.
+            models.Index(fields=['-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -152,22 +246,18 @@ class Product(models.Model):
         elif not self.compare_at_price:
             self.compare_at_price = self.price
         
-        super().save(*args, **kwargs)
-    
-    @property
-    def sale_price(self):
-        """Calculate the final sale price after discount"""
-        if self.discount_percentage > 0:
-            discount_amount = (self.price * Decimal(self.discount_percentage / 100))
-            return self.price - discount_amount
-        return self.price
+        # Keep the row and the derived data updated by post_save handlers
+        # (counters, search index) in one transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        # The database recomputed sale_price; drop the stale value so the
+        # next access reloads it.
+        self.__dict__.pop('sale_price', None)
     
     @property
     def discount_amount(self):
         """Calculate the discount amount in currency"""
-        if self.discount_percentage > 0:
-            return self.price * Decimal(self.discount_percentage / 100)
-        return Decimal('0.00')
+        return self.price - self.sale_price
     
     @property
     def in_stock(self):
@@ -237,6 +327,8 @@ class ProductVariant(models.Model):
     # Variant-specific attributes
     price_modifier = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     stock = models.PositiveIntegerField(default=0)
+    # As Product.backordered, under the product's backorder settings.
+    backordered = models.PositiveIntegerField(default=0)
     weight_modifier = models.DecimalField(max_digits=8, decimal_places=3, default=0.000)
     
     # Visual identifiers
@@ -279,6 +371,27 @@ class Banner(models.Model):
 		return self.title
 
 
+# Cart money as SQL. The cart serializers annotate these onto their
+# querysets (Meta.annotations, see api/prefetch.py); the properties below
+# read the annotated values when present and aggregate in the database
+# otherwise.
+CART_MONEY = models.DecimalField(max_digits=12, decimal_places=2)
+
+
+def cart_line_subtotal(prefix=''):
+	"""price * quantity of a cart item, `prefix` leading to it."""
+	price = models.F(f'{prefix}product__price') + Coalesce(models.F(f'{prefix}variant__price_modifier'), Decimal('0'))
+	return models.ExpressionWrapper(price * models.F(f'{prefix}quantity'), output_field=CART_MONEY)
+
+
+def cart_totals(prefix=''):
+	"""Total and item count over the cart items `prefix` leads to."""
+	return {
+		'items_total': Coalesce(models.Sum(cart_line_subtotal(prefix)), Decimal('0'), output_field=CART_MONEY),
+		'items_count': Coalesce(models.Sum(f'{prefix}quantity'), 0),
+	}
+
+
 class Cart(models.Model):
 	user = models.OneToOneField(User, on_delete=models.CASCADE)
 	created_at = models.DateTimeField(auto_now_add=True)
@@ -287,21 +400,34 @@ class Cart(models.Model):
 	def __str__(self):
 		return f"Cart - {self.user.username}"
 
+	def _totals(self):
+		if not hasattr(self, 'items_total'):
+			return self.items.aggregate(**cart_totals())
+		return {'items_total': self.items_total, 'items_count': self.items_count}
+
 	@property
 	def total(self):
-		return sum(item.subtotal for item in self.items.all())
+		return self._totals()['items_total']
+
+	@property
+	def item_count(self):
+		return self._totals()['items_count']
 
 
 class CartItem(models.Model):
 	cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
 	product = models.ForeignKey(Product, on_delete=models.CASCADE)
+	variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, blank=True, null=True)
 	quantity = models.PositiveIntegerField(default=1)
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
 	@property
 	def subtotal(self):
-		return self.product.price * self.quantity
+		if hasattr(self, 'line_subtotal'):
+			return self.line_subtotal
+		price = self.variant.final_price if self.variant_id else self.product.price
+		return price * self.quantity
 
 	def __str__(self):
 		return f"{self.quantity} x {self.product.title}"
@@ -333,6 +459,12 @@ class Order(models.Model):
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
+	class Meta:
+		indexes = [
+			# Serves keyset pagination of a user's orders, newest first.
+			models.Index(fields=['user', '-created_at', '-id']),
+		]
+
 	def __str__(self):
 		return f"Order #{self.id} - {self.user.username}"
 
@@ -340,10 +472,15 @@ class Order(models.Model):
 class OrderItem(models.Model):
 	order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
 	product = models.ForeignKey(Product, on_delete=models.CASCADE)
+	variant = models.ForeignKey(ProductVariant, on_delete=models.SET_NULL, blank=True, null=True)
 	quantity = models.PositiveIntegerField()
 	price = models.DecimalField(max_digits=10, decimal_places=2)  # Price at time of purchase
 	created_at = models.DateTimeField(auto_now_add=True)
 
+	class Meta:
+		# The sales and bought-together jobs read new items by creation time.
+		indexes = [models.Index(fields=['created_at'])]
+
 	@property
 	def subtotal(self):
 		return self.price * self.quantity
@@ -352,6 +489,192 @@ class OrderItem(models.Model):
 		return f"{self.quantity} x {self.product.title} in Order #{self.order.id}"
 
 
+# ===== JOB STATE =====
+# Periodic jobs keep how far they have got in a table of one row.
+
+class SingletonState(models.Model):
+	"""Base of the one-row (pk=1) tables periodic jobs keep their progress in."""
+
+	class Meta:
+		abstract = True
+
+	@classmethod
+	def load(cls):
+		state, _ = cls.objects.get_or_create(pk=1)
+		return state
+
+	@classmethod
+	def lock(cls):
+		"""The row, locked until the end of the current transaction.
+
+		A job reads its progress through this, so a second run started
+		meanwhile waits for the first to commit and then resumes from where
+		it stopped, rather than redoing the same work.
+		"""
+		cls.load()
+		return cls.objects.select_for_update().get(pk=1)
+
+
+# ===== SALES ROLLUPS =====
+# Order items are folded into hourly per-product buckets by `manage.py
+# rollup_sales` (see api/sales.py); the sliding-window totals and the
+# ranking scores served by /products/bestsellers/ and /products/trending/
+# are recomputed from those buckets.
+
+class ProductSalesBucket(models.Model):
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_buckets')
+	hour = models.DateTimeField()
+	quantity = models.PositiveIntegerField(default=0)
+	revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['product', 'hour'], name='unique_product_sales_hour'),
+		]
+		indexes = [
+			models.Index(fields=['hour']),
+		]
+
+	def __str__(self):
+		return f"{self.product_id} @ {self.hour:%Y-%m-%d %H:00}: {self.quantity}"
+
+
+class ProductSalesStats(models.Model):
+	product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='sales_stats')
+	quantity_24h = models.PositiveIntegerField(default=0)
+	quantity_7d = models.PositiveIntegerField(default=0)
+	quantity_30d = models.PositiveIntegerField(default=0)
+	revenue_24h = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+	revenue_7d = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+	revenue_30d = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+	# Units sold in the last 24 hours above the daily average of the last 7 days.
+	trending_score = models.FloatField(default=0)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['-quantity_30d']),
+			models.Index(fields=['-trending_score']),
+		]
+
+	def __str__(self):
+		return f"Sales of {self.product_id}: {self.quantity_30d} in 30 days"
+
+
+class SalesRollupState(SingletonState):
+	"""Single row recording how far `rollup_sales` has read order items."""
+	# Items created up to this time have been folded in.
+	last_order_item_at = models.DateTimeField(blank=True, null=True)
+	last_run_at = models.DateTimeField(blank=True, null=True)
+
+	def __str__(self):
+		return f"Sales rolled up to {self.last_order_item_at}"
+
+
+# ===== FREQUENTLY BOUGHT TOGETHER =====
+# `manage.py train_bought_together` (see api/recommendations.py) counts, for
+# every pair of products, the orders containing both, and keeps the top
+# neighbours of each product in BoughtTogether for the recommendation
+# endpoints.
+
+class ProductPairCount(models.Model):
+	"""Orders containing both products, stored in both directions; the
+	product == other row counts the orders containing the product."""
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+	other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+	orders = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['product', 'other'], name='unique_product_pair'),
+		]
+
+	def __str__(self):
+		return f"{self.product_id} + {self.other_id}: {self.orders}"
+
+
+class BoughtTogether(models.Model):
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='bought_together')
+	recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommended_with')
+	orders = models.PositiveIntegerField()
+	# Share of the product's orders that also contained `recommended`.
+	score = models.FloatField()
+	rank = models.PositiveSmallIntegerField()
+
+	class Meta:
+		ordering = ['product', 'rank']
+		constraints = [
+			models.UniqueConstraint(fields=['product', 'rank'], name='unique_bought_together_rank'),
+		]
+
+	def __str__(self):
+		return f"{self.recommended_id} with {self.product_id} (#{self.rank})"
+
+
+class BoughtTogetherState(SingletonState):
+	"""Single row recording how far `train_bought_together` has read order items."""
+	# Items created up to this time have been counted.
+	last_order_item_at = models.DateTimeField(blank=True, null=True)
+	last_run_at = models.DateTimeField(blank=True, null=True)
+
+	def __str__(self):
+		return f"Pairs counted up to {self.last_order_item_at}"
+
+
+# ===== SIMILAR PRODUCTS =====
+# `manage.py rebuild_similar_products` (see api/similarity.py) stores the
+# nearest neighbours of every product by content.
+
+class SimilarProduct(models.Model):
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_products')
+	similar = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_to')
+	# Cosine similarity of the two products' TF-IDF vectors.
+	score = models.FloatField()
+	rank = models.PositiveSmallIntegerField()
+
+	class Meta:
+		ordering = ['product', 'rank']
+		constraints = [
+			models.UniqueConstraint(fields=['product', 'rank'], name='unique_similar_product_rank'),
+		]
+
+	def __str__(self):
+		return f"{self.similar_id} like {self.product_id} (#{self.rank})"
+
+
+class SimilarityIndexState(SingletonState):
+	"""Single row recording the latest product change `rebuild_similar_products` has seen."""
+	last_product_update = models.DateTimeField(blank=True, null=True)
+	last_run_at = models.DateTimeField(blank=True, null=True)
+
+	def __str__(self):
+		return f"Similar products current to {self.last_product_update}"
+
+
+# ===== STOCK RESERVATIONS =====
+# A cart entering checkout takes its units off stock; they are held here
+# until the order is placed or the hold expires (see api/inventory.py).
+
+class StockReservation(models.Model):
+	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+	variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+	quantity = models.PositiveIntegerField()
+	# How the units were taken: off stock, or beyond it as backorders.
+	from_stock = models.PositiveIntegerField(default=0)
+	backordered = models.PositiveIntegerField(default=0)
+	created_at = models.DateTimeField(auto_now_add=True)
+	expires_at = models.DateTimeField()
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['expires_at']),
+		]
+
+	def __str__(self):
+		return f"{self.quantity} x {self.product_id} held for {self.user_id} until {self.expires_at:%Y-%m-%d %H:%M}"
+
+
 class Address(models.Model):
 	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='addresses')
 	label = models.CharField(max_length=60, blank=True)  # e.g., Home, Work
@@ -388,15 +711,20 @@ class RecentlyViewed(models.Model):
 	"""Tracks recently viewed products per user.
 
 	We keep one record per (user, product) and update viewed_at each time the
-	product is viewed so clients can fetch the most recent items.
+	product is viewed so clients can fetch the most recent items. Views are
+	buffered and written in batches, and histories are capped; see
+	api/recently_viewed.py.
 	"""
 	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recently_viewed')
 	product = models.ForeignKey(Product, on_delete=models.CASCADE)
-	viewed_at = models.DateTimeField(auto_now=True)
+	viewed_at = models.DateTimeField(default=timezone.now)
 
 	class Meta:
 		ordering = ['-viewed_at']
 		unique_together = ('user', 'product')
+		indexes = [
+			models.Index(fields=['user', '-viewed_at']),
+		]
 
 	def __str__(self):
 		return f"{self.user.username} viewed {self.product.title} @ {self.viewed_at.isoformat()}"
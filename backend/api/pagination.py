@@ -0,0 +1,162 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ProductPageNumberPagination(PageNumberPagination):
+    """Page-number pagination for product listings.
+
+    Clients can ask for a smaller or larger page with ?page_size=, capped at
+    max_page_size so a single request can never pull the whole catalog.
+    """
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a composite key, `(created_at, id)` by default.
+
+    Each page is fetched with a range predicate on the key instead of an
+    OFFSET, and no COUNT(*) is issued, so page N costs the same as page 1.
+    The cursor is an opaque token holding the key of the last (or first)
+    row of the current page plus the direction to read in.
+
+    All ordering fields must share the same direction, and the last one
+    must be unique.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor['reverse']
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_q(cursor['key'], reverse))
+
+        ordering = self.ordering if not reverse else self.reversed_ordering()
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Going forwards there is a previous page whenever we started from a
+        # cursor; going backwards there is always a next page.
+        if reverse:
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is not None:
+            try:
+                size = int(value)
+            except ValueError:
+                size = 0
+            if size > 0:
+                return min(size, self.max_page_size)
+        return self.page_size
+
+    def reversed_ordering(self):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+
+    def keyset_q(self, key, reverse):
+        """Rows strictly after `key` in the requested direction.
+
+        For (a, b) descending this is `a < x OR (a = x AND b < y)`.
+        """
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        q = Q()
+        for index, field in enumerate(self.fields):
+            clause = Q(**{f'{field}__{lookup}': key[index]})
+            for previous, value in zip(self.fields[:index], key[:index]):
+                clause &= Q(**{previous: value})
+            q |= clause
+        return q
+
+    def get_key(self, row):
+        if isinstance(row, dict):
+            return [row[field] for field in self.fields]
+        return [getattr(row, field) for field in self.fields]
+
+    def encode_cursor(self, row, reverse):
+        # isoformat keeps full microsecond precision, which the range
+        # predicate needs to avoid skipping or repeating rows.
+        key = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in self.get_key(row)
+        ]
+        payload = json.dumps({'k': key, 'r': int(reverse)}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            raw_key = payload['k']
+            if len(raw_key) != len(self.fields):
+                raise ValueError
+            key = [
+                self.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, raw_key)
+            ]
+            return {'key': key, 'reverse': bool(payload.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
@@ -0,0 +1,260 @@
+"""Derive select_related / prefetch_related / annotations from a serializer.
+
+`plan_queryset(queryset, serializer)` walks the serializer's field tree
+and loads everything the serializer will touch up front:
+
+* nested serializers and dotted sources over forward foreign keys become
+  `select_related` joins;
+* nested `many=True` serializers and many-related fields become
+  `prefetch_related`, with the child queryset planned recursively;
+* serializers can declare per-row aggregates in `Meta.annotations`
+  (name -> expression). They are annotated onto the queryset when the
+  serializer is the root, and onto a `Prefetch` queryset when it is nested
+  under a foreign key;
+* the columns the serializer reads become an `.only()` projection, at every
+  level of the tree. Properties and method fields name the columns they
+  read in `Meta.field_dependencies` (field name -> list of model fields,
+  or `relation__field` paths through relations the serializer joins); a
+  level with a field the planner cannot resolve is loaded in full.
+
+The result is a fixed number of queries per page no matter how many rows
+are serialized. `EagerLoadingMixin` applies the plan to a view's queryset,
+following the sparse fieldset (api/fieldsets.py) of the request.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from .fieldsets import has_sparse_fieldsets
+
+
+class Plan:
+    def __init__(self):
+        self.select = []
+        self.prefetch = []     # (lookup, model, child Plan)
+        self.annotations = {}
+        # Field paths for .only(), or None to load every column.
+        self.only = set()
+
+
+def _relation(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+
+def _is_single(field):
+    return field.many_to_one or field.one_to_one
+
+
+def _serializer_annotations(serializer):
+    meta = getattr(serializer, 'Meta', None)
+    return dict(getattr(meta, 'annotations', {}) or {})
+
+
+def _field_dependencies(serializer, field):
+    meta = getattr(serializer, 'Meta', None)
+    dependencies = getattr(meta, 'field_dependencies', {}) or {}
+    if field.field_name in dependencies:
+        return dependencies[field.field_name]
+    return dependencies.get(field.source)
+
+
+def _add_dependencies(model, dependencies, only, through):
+    for dependency in dependencies:
+        if '__' in dependency:
+            through.append(dependency)
+        elif _column(model, dependency) is not None:
+            only.add(dependency)
+
+
+def _column(model, name):
+    """The model field called `name` if it is stored on the model's own table."""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if field.concrete and not field.many_to_many:
+        return field
+    return None
+
+
+def build_plan(serializer, model, prefix=''):
+    """Collect the plan for `serializer` rooted at `model`.
+
+    `prefix` is the select_related path from the queryset's model down to
+    `model`, so joins along a chain of single relations stay one query.
+    """
+    plan = Plan()
+    only = {model._meta.pk.name}
+    complete = True
+    # Relations loaded through select_related whose own columns must all
+    # be fetched, because a nested level could not be projected.
+    full = set()
+    # Dependencies reaching through a relation, kept if it is joined.
+    through = []
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            dependencies = _field_dependencies(serializer, field)
+            if dependencies is None:
+                complete = False
+            else:
+                _add_dependencies(model, dependencies, only, through)
+            continue
+        attrs = field.source.split('.')
+
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            relation = _relation(model, attrs[0])
+            if relation is not None and isinstance(child, serializers.ModelSerializer):
+                child_model = relation.related_model
+                child_plan = build_plan(child, child_model)
+                if child_plan.only is not None and relation.one_to_many:
+                    # Prefetching matches children to parents on this key.
+                    child_plan.only.add(relation.field.name)
+                plan.prefetch.append((prefix + attrs[0], child_model, child_plan))
+            continue
+
+        if isinstance(field, serializers.ManyRelatedField):
+            if _relation(model, attrs[0]) is not None:
+                plan.prefetch.append((prefix + attrs[0], None, None))
+            continue
+
+        if isinstance(field, serializers.ModelSerializer):
+            relation = _relation(model, attrs[0])
+            if relation is None or not _is_single(relation):
+                continue
+            child_model = relation.related_model
+            if relation.concrete:
+                only.add(attrs[0])
+            if _serializer_annotations(field):
+                # Joined rows cannot carry aggregates, so fetch the related
+                # objects separately with the annotations applied.
+                plan.prefetch.append((prefix + attrs[0], child_model, build_plan(field, child_model)))
+            else:
+                plan.select.append(prefix + attrs[0])
+                nested = build_plan(field, child_model, prefix + attrs[0] + '__')
+                plan.select.extend(nested.select)
+                plan.prefetch.extend(nested.prefetch)
+                if nested.only is None:
+                    full.add(attrs[0])
+                else:
+                    only.update(f'{attrs[0]}__{name}' for name in nested.only)
+            continue
+
+        # Dotted sources such as 'parent.name' walk forward relations.
+        current_model, path = model, []
+        for attr in attrs[:-1]:
+            relation = _relation(current_model, attr)
+            if relation is None or not _is_single(relation):
+                break
+            path.append(attr)
+            current_model = relation.related_model
+        if path:
+            plan.select.append(prefix + '__'.join(path))
+            if len(path) == len(attrs) - 1 and _column(current_model, attrs[-1]) is not None:
+                only.update('__'.join(attrs[:depth]) for depth in range(1, len(attrs) + 1))
+            else:
+                full.add(path[0])
+                only.add(path[0])
+            continue
+
+        if _column(model, attrs[0]) is not None:
+            only.add(attrs[0])
+            continue
+        dependencies = _field_dependencies(serializer, field)
+        if dependencies is None:
+            complete = False
+        else:
+            _add_dependencies(model, dependencies, only, through)
+
+    for dependency in through:
+        relation = dependency.split('__', 1)[0]
+        if prefix + relation in plan.select:
+            only.update((relation, dependency))
+    if complete:
+        plan.only = {
+            name for name in only
+            if not any(name.startswith(relation + '__') for relation in full)
+        }
+    else:
+        plan.only = None
+    if not prefix:
+        plan.annotations.update(_serializer_annotations(serializer))
+    return plan
+
+
+def _ordering_columns(queryset):
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    names = []
+    for item in ordering:
+        name = item.lstrip('-') if isinstance(item, str) else None
+        # Annotations are selected anyway and cannot go into only().
+        if name and '__' not in name and name != '?' and name not in queryset.query.annotations:
+            names.append(name)
+    return names
+
+
+def apply_plan(queryset, plan, project=True):
+    if plan.select:
+        queryset = queryset.select_related(*dict.fromkeys(plan.select))
+    if project and plan.only is not None:
+        # Paginators read the ordering columns off each row.
+        queryset = queryset.only(*plan.only, *_ordering_columns(queryset))
+    if plan.annotations:
+        queryset = queryset.annotate(**plan.annotations)
+    lookups = []
+    for lookup, model, child_plan in plan.prefetch:
+        if child_plan is None:
+            lookups.append(lookup)
+        else:
+            child_queryset = apply_plan(model._default_manager.all(), child_plan, project)
+            lookups.append(Prefetch(lookup, queryset=child_queryset))
+    if lookups:
+        queryset = queryset.prefetch_related(*lookups)
+    return queryset
+
+
+@lru_cache(maxsize=None)
+def _class_plan(serializer_class):
+    serializer = serializer_class()
+    return build_plan(serializer, serializer.Meta.model)
+
+
+def plan_queryset(queryset, serializer, project=True):
+    """Apply the eager-loading plan for a serializer class or instance.
+
+    With `project` false every column is loaded, as writes need.
+    """
+    if isinstance(serializer, type):
+        plan = _class_plan(serializer)
+    else:
+        plan = build_plan(serializer, queryset.model)
+    return apply_plan(queryset, plan, project)
+
+
+class EagerLoadingMixin:
+    """Plan the view's queryset from the serializer chosen for the action.
+
+    Hooks filter_queryset rather than get_queryset so views that override
+    get_queryset are covered too.
+    """
+
+    def plan_queryset(self, queryset):
+        if has_sparse_fieldsets(self.request):
+            # The pruned tree depends on the request, so plan the instance.
+            serializer = self.get_serializer()
+        else:
+            serializer = self.get_serializer_class()
+        return plan_queryset(queryset, serializer, project=self.request.method in SAFE_METHODS)
+
+    def filter_queryset(self, queryset):
+        return self.plan_queryset(super().filter_queryset(queryset))
@@ -0,0 +1,105 @@
+"""Cached /users/me payload.
+
+The profile is read in a fixed number of queries: the user joined to the
+profile, then one prefetch each for addresses, cards and the latest
+RECENTLY_VIEWED views, the last one joined to just the product columns the
+summaries show. The serialized payload is cached per user under a key
+holding the user's object version (api/caching.py), together with the
+object versions of the products it embeds; a cached payload is only
+served while those are unchanged, so editing one product invalidates just
+the profiles showing it. Signal handlers bump the user's version whenever
+the profile, user, an address, a card or a view changes; flushed view
+batches bump it in api/recently_viewed.py, as bulk writes send no signals.
+Views still buffered in this process are merged into the served copy
+only, in front of the cached history, costing one query for the products
+not already in it.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from . import caching, recently_viewed
+from .models import Product, RecentlyViewed, UserProfile
+from .prefetch import build_plan, plan_queryset
+from .serializers import ProductSummarySerializer, UserProfileSerializer
+
+
+RECENTLY_VIEWED = 10
+
+
+def _recent_views():
+    columns = build_plan(ProductSummarySerializer(), Product).only
+    product_columns = ['product'] if columns is None else [f'product__{name}' for name in columns]
+    return (
+        RecentlyViewed.objects
+        .select_related('product')
+        .only('user', 'viewed_at', 'product', *product_columns)
+        .order_by('-viewed_at', '-id')[:RECENTLY_VIEWED]
+    )
+
+
+def profile_queryset():
+    return (
+        UserProfile.objects
+        .select_related('user')
+        .prefetch_related(
+            'user__addresses',
+            'user__cards',
+            Prefetch('user__recently_viewed', queryset=_recent_views(), to_attr='recent_views'),
+        )
+    )
+
+
+def invalidate(user_id):
+    # After commit, or a concurrent read could cache the old rows under the
+    # new version.
+    transaction.on_commit(partial(caching.bump, User, user_id))
+
+
+def _key(user_id):
+    version = caching.object_version(User, user_id)
+    return f'{caching.KEY_PREFIX}:me:{user_id}:{version}'
+
+
+def _product_versions(data):
+    return caching.object_versions(Product, [product['id'] for product in data['recently_viewed']])
+
+
+def _with_pending(data, user_id, context):
+    pending = recently_viewed.buffer.pending(user_id)
+    if not pending:
+        return data
+    summaries = {product['id']: product for product in data['recently_viewed']}
+    missing = [product_id for product_id in pending if product_id not in summaries]
+    if missing:
+        products = plan_queryset(Product.objects.filter(pk__in=missing), ProductSummarySerializer)
+        for product in ProductSummarySerializer(products, many=True, context=context).data:
+            summaries[product['id']] = product
+    newest = sorted(pending, key=pending.get, reverse=True)
+    history = [summaries[product_id] for product_id in newest if product_id in summaries]
+    history += [product for product in data['recently_viewed'] if product['id'] not in pending]
+    return {**data, 'recently_viewed': history[:RECENTLY_VIEWED]}
+
+
+def profile_data(user, context=None):
+    """The serialized profile of `user`, created on first use."""
+    key = _key(user.pk)
+    cached = cache.get(key)
+    if cached is not None:
+        data, product_versions = cached
+        if _product_versions(data) == product_versions:
+            return _with_pending(data, user.pk, context)
+
+    profile = profile_queryset().filter(user=user).first()
+    if profile is None:
+        UserProfile.objects.get_or_create(user=user)
+        # Creating the profile bumped the version.
+        key = _key(user.pk)
+        profile = profile_queryset().get(user=user)
+    data = UserProfileSerializer(profile, context=context).data
+    cache.set(key, (data, _product_versions(data)), settings.PROFILE_CACHE_TIMEOUT)
+    return _with_pending(data, user.pk, context)
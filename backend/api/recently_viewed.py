@@ -0,0 +1,171 @@
+"""Buffered, capped recently-viewed tracking.
+
+Product views are frequent and each one matters little, so instead of
+writing per view the API records them in a per-process buffer, where
+repeated views of a product by the same user collapse into one entry with
+the latest time. A background thread writes the buffer with one batched
+upsert (INSERT ... ON CONFLICT DO UPDATE) every FLUSH_INTERVAL seconds, or
+as soon as it holds FLUSH_SIZE entries, and at process exit; requests
+never wait for it, not even to read: a user's history and profile are
+built from the database with that user's still-buffered views merged in
+memory (`merge`). Each write then trims the histories it touched to the
+latest HISTORY_LIMIT products with a single DELETE, and invalidates those
+users' cached profiles (api/profile.py).
+
+A write that fails is logged and its views go back into the buffer for
+the next attempt. With several worker processes, a view buffered by one
+worker reaches the database with that worker's next flush, so a history
+listed through another worker can miss the last few seconds of views.
+Views still buffered when a process is killed, at most FLUSH_INTERVAL
+seconds' worth, are lost.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from . import caching
+from .models import Product, RecentlyViewed
+
+
+HISTORY_LIMIT = 50
+FLUSH_SIZE = 200
+FLUSH_INTERVAL = 5  # seconds
+BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def trim(user_ids, limit=HISTORY_LIMIT):
+    """Delete all but the latest `limit` entries of each user's history."""
+    stale = list(
+        RecentlyViewed.objects
+        .filter(user_id__in=user_ids)
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=F('user_id'),
+            order_by=[F('viewed_at').desc(), F('id').desc()],
+        ))
+        .filter(position__gt=limit)
+        .values_list('id', flat=True)
+    )
+    if stale:
+        RecentlyViewed.objects.filter(pk__in=stale).delete()
+    return len(stale)
+
+
+def write_views(views):
+    """Upsert {(user_id, product_id): viewed_at} and trim those histories."""
+    # Products deleted since the view was recorded would fail the batch.
+    existing = set(
+        Product.objects.filter(pk__in={product_id for _, product_id in views}).values_list('pk', flat=True)
+    )
+    rows = [
+        RecentlyViewed(user_id=user_id, product_id=product_id, viewed_at=viewed_at)
+        for (user_id, product_id), viewed_at in views.items()
+        if product_id in existing
+    ]
+    with transaction.atomic():
+        RecentlyViewed.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user', 'product'],
+            update_fields=['viewed_at'],
+            batch_size=BATCH_SIZE,
+        )
+        user_ids = {row.user_id for row in rows}
+        trim(user_ids)
+    # Bulk writes send no signals: invalidate the cached profiles here.
+    for user_id in user_ids:
+        caching.bump(User, user_id)
+
+
+def merge(views, pending, products, limit=HISTORY_LIMIT):
+    """Merge buffered views into a history read from the database.
+
+    `views` are RecentlyViewed rows, `pending` is {product_id: viewed_at}
+    from ViewBuffer.pending and `products` maps those ids to loaded
+    products; a buffered view replaces the stored one of its product and
+    becomes an unsaved row. Returns the latest `limit` views, newest first.
+    """
+    merged = [view for view in views if view.product_id not in pending]
+    merged += [
+        RecentlyViewed(product=products[product_id], viewed_at=viewed_at)
+        for product_id, viewed_at in pending.items()
+        if product_id in products
+    ]
+    merged.sort(key=lambda view: view.viewed_at, reverse=True)
+    return merged[:limit]
+
+
+class ViewBuffer:
+    def __init__(self, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._views = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._views)
+
+    def record(self, user_id, product_id, viewed_at=None):
+        """Buffer a view; returns its time."""
+        viewed_at = viewed_at or timezone.now()
+        with self._lock:
+            self._views[user_id, product_id] = viewed_at
+            full = len(self._views) >= self.flush_size
+            # Also restarts the thread in a forked worker.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='recently-viewed-flush', daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+        return viewed_at
+
+    def pending(self, user_id):
+        """This user's buffered views, {product_id: viewed_at}."""
+        with self._lock:
+            return {
+                product_id: viewed_at
+                for (owner, product_id), viewed_at in self._views.items()
+                if owner == user_id
+            }
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                # This thread's connection would otherwise stay open.
+                connection.close()
+
+    def flush(self):
+        """Write out the buffered views; returns how many were written."""
+        with self._lock:
+            views, self._views = self._views, {}
+        if not views:
+            return 0
+        try:
+            write_views(views)
+        except Exception:
+            logger.exception('Could not write %d recently viewed entries; keeping them buffered.', len(views))
+            with self._lock:
+                for key, viewed_at in views.items():
+                    if key not in self._views or self._views[key] < viewed_at:
+                        self._views[key] = viewed_at
+            return 0
+        return len(views)
+
+
+buffer = ViewBuffer()
+atexit.register(buffer.flush)
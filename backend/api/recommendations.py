@@ -0,0 +1,217 @@
+"""Frequently-bought-together recommendations from order history.
+
+`train()` (run by `manage.py train_bought_together`) keeps a sparse
+co-occurrence matrix in ProductPairCount: for every pair of products, the
+number of orders containing both (the diagonal holds the number of orders
+containing each product). Training is incremental. BoughtTogetherState
+keeps the creation time up to which order items were counted, and a run
+only reads the orders that gained items since then. For each such order it
+adds the pairs that were not already counted. Like the sales rollup
+(api/sales.py), the watermark stays ORDER_COMMIT_LAG seconds behind the
+clock so late-committing items are counted by a later run. The top TOP_K
+neighbours of every product
+whose counts changed are then rewritten in BoughtTogether, which is all the
+endpoints read.
+
+Pairs are counted vectorized with numpy when it is installed: every basket
+is expanded into its product pairs with array arithmetic and the pairs are
+tallied with `np.unique`. Without numpy the same counts come from plain
+Python loops.
+
+A product's neighbours are ranked by how many of its orders also had the
+other product, so its list only changes when its own counts change.
+Cancelled orders are skipped when read; a later cancellation is not
+subtracted until a `--full` retrain.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Min, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from . import caching
+from .models import BoughtTogether, BoughtTogetherState, OrderItem, ProductPairCount
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+TOP_K = 10
+ORDER_CHUNK = 10000
+PRODUCT_CHUNK = 500
+BATCH_SIZE = 1000
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _basket_rows(order_ids, after, upto):
+    """(order_id, product_id, new) per distinct product of each order, `new`
+    telling whether the product's first item was created after `after`."""
+    rows = (
+        OrderItem.objects
+        .filter(order_id__in=order_ids, created_at__lte=upto)
+        .values('order_id', 'product_id')
+        .annotate(first=Min('created_at'))
+        .order_by('order_id', 'product_id')
+        .values_list('order_id', 'product_id', 'first')
+    )
+    return [(order_id, product_id, after is None or first > after) for order_id, product_id, first in rows]
+
+
+def _count_pairs_numpy(rows):
+    orders, products, new = zip(*rows)
+    orders = np.array(orders, dtype=np.int64)
+    products = np.array(products, dtype=np.int64)
+    new = np.array(new, dtype=bool)
+    count = len(orders)
+
+    # Expand every basket of k products into its k * k (left, right) pairs.
+    starts = np.flatnonzero(np.r_[True, orders[1:] != orders[:-1]])
+    sizes = np.diff(np.r_[starts, count])
+    size_of = np.repeat(sizes, sizes)
+    start_of = np.repeat(starts, sizes)
+    left = np.repeat(np.arange(count), size_of)
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(size_of) - size_of, size_of)
+    right = np.repeat(start_of, size_of) + offsets
+
+    # Pairs of products both already in the order were counted before.
+    keep = new[left] | new[right]
+    width = int(products.max()) + 1
+    keys, counts = np.unique(products[left[keep]] * width + products[right[keep]], return_counts=True)
+    return Counter(dict(zip(zip((keys // width).tolist(), (keys % width).tolist()), counts.tolist())))
+
+
+def _count_pairs_python(rows):
+    baskets = {}
+    for order_id, product_id, new in rows:
+        baskets.setdefault(order_id, []).append((product_id, new))
+    counts = Counter()
+    for basket in baskets.values():
+        for a, a_new in basket:
+            for b, b_new in basket:
+                if a_new or b_new:
+                    counts[a, b] += 1
+    return counts
+
+
+def count_pairs(rows):
+    """Pair counts added by the products flagged new in `rows`."""
+    if not rows:
+        return Counter()
+    if np is not None:
+        return _count_pairs_numpy(rows)
+    return _count_pairs_python(rows)
+
+
+def _apply(increments):
+    """Add `increments` to ProductPairCount; returns the products touched."""
+    increments = dict(increments)
+    touched = sorted({product_id for product_id, _ in increments})
+    for chunk in _chunks(touched, PRODUCT_CHUNK):
+        in_chunk = set(chunk)
+        others = {other_id for product_id, other_id in increments if product_id in in_chunk}
+        changed = []
+        for pair in ProductPairCount.objects.filter(product_id__in=chunk, other_id__in=others):
+            added = increments.pop((pair.product_id, pair.other_id), 0)
+            if added:
+                pair.orders += added
+                changed.append(pair)
+        ProductPairCount.objects.bulk_update(changed, ['orders'], batch_size=BATCH_SIZE)
+    ProductPairCount.objects.bulk_create(
+        [
+            ProductPairCount(product_id=product_id, other_id=other_id, orders=added)
+            for (product_id, other_id), added in increments.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return touched
+
+
+def _refresh_neighbours(product_ids):
+    """Rewrite the top TOP_K neighbours of `product_ids` from the pair counts."""
+    for chunk in _chunks(product_ids, PRODUCT_CHUNK):
+        pairs = ProductPairCount.objects.filter(product_id__in=chunk)
+        totals = dict(pairs.filter(other_id=F('product_id')).values_list('product_id', 'orders'))
+        ranked = (
+            pairs.exclude(other_id=F('product_id'))
+            .annotate(rank=Window(
+                RowNumber(),
+                partition_by=F('product_id'),
+                order_by=[F('orders').desc(), F('other_id').asc()],
+            ))
+            .filter(rank__lte=TOP_K)
+            .values_list('product_id', 'other_id', 'orders', 'rank')
+        )
+        neighbours = [
+            BoughtTogether(
+                product_id=product_id, recommended_id=other_id, orders=orders,
+                score=orders / totals[product_id], rank=rank,
+            )
+            for product_id, other_id, orders, rank in ranked
+        ]
+        BoughtTogether.objects.filter(product_id__in=chunk).delete()
+        BoughtTogether.objects.bulk_create(neighbours, batch_size=BATCH_SIZE)
+
+
+def train(full=False):
+    """Count the pairs of orders that gained items since the last run and
+    refresh the affected neighbour lists; returns the number of orders read.
+    `full` starts over from the whole order history."""
+    with transaction.atomic():
+        state = BoughtTogetherState.lock()
+        if full:
+            ProductPairCount.objects.all().delete()
+            BoughtTogether.objects.all().delete()
+            state.last_order_item_at = None
+
+        after = state.last_order_item_at
+        upto = timezone.now() - timedelta(seconds=settings.ORDER_COMMIT_LAG)
+        if after is not None and upto < after:
+            upto = after
+        items = OrderItem.objects.filter(created_at__lte=upto)
+        if after is not None:
+            items = items.filter(created_at__gt=after)
+        order_ids = list(
+            items
+            .exclude(order__status='cancelled')
+            .values_list('order_id', flat=True)
+            .distinct()
+            .order_by('order_id')
+        )
+        increments = Counter()
+        for chunk in _chunks(order_ids, ORDER_CHUNK):
+            increments.update(count_pairs(_basket_rows(chunk, after, upto)))
+        _refresh_neighbours(_apply(increments))
+
+        state.last_order_item_at = upto
+        state.last_run_at = timezone.now()
+        state.save()
+    caching.bump(BoughtTogether)
+    return len(order_ids)
+
+
+# ===== SERVING =====
+
+def bought_together(queryset, product_id):
+    """`queryset` products most often ordered with `product_id`, best first."""
+    return queryset.filter(recommended_with__product_id=product_id).order_by('recommended_with__rank')
+
+
+def complete_order(queryset, product_ids):
+    """`queryset` products most often ordered with any of `product_ids`,
+    leaving those out, best first."""
+    return (
+        queryset
+        .filter(recommended_with__product_id__in=product_ids)
+        .exclude(pk__in=product_ids)
+        .annotate(together_score=Sum('recommended_with__score'))
+        .order_by('-together_score', 'id')
+    )
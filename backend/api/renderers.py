@@ -0,0 +1,89 @@
+"""Extra DRF renderers: faster JSON, NDJSON and MessagePack.
+
+`FastJSONRenderer` renders with orjson when it is installed and produces
+the same bytes as DRF's JSONRenderer: values orjson has no native form for
+(decimals, datetimes, lazy strings, ...) go through DRF's own encoder. It
+falls back to JSONRenderer without orjson, or when the client asks for
+indented output.
+
+`NDJSONRenderer` (application/x-ndjson) writes one JSON document per line
+and is what list views stream when asked for it (see api/streaming.py).
+
+`MessagePackRenderer` (application/msgpack) needs the optional msgpack
+package; settings only offer it when that is importable.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+_drf_encoder = encoders.JSONEncoder()
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    return _drf_encoder.default(obj)
+
+
+def dumps(data):
+    """Compact JSON bytes for `data`, as DRF's JSONRenderer would write them."""
+    if orjson is not None:
+        content = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+    else:
+        content = JSONRenderer().render(data)
+    # Same escaping as JSONRenderer: these are valid JSON but not valid
+    # JavaScript string contents.
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Non-streamed responses (a detail, an error) become a single line;
+        # a plain list becomes one line per item.
+        items = data if isinstance(data, list) else [data]
+        return b''.join(dumps(item) + b'\n' for item in items)
+
+
+def pack(data):
+    return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if msgpack is None:
+            raise RuntimeError('MessagePackRenderer needs the msgpack package.')
+        return pack(data)
@@ -0,0 +1,183 @@
+"""Sales rollups behind the bestseller and trending rankings.
+
+`rollup()` (run by `manage.py rollup_sales`, e.g. hourly from cron) only
+reads the order items added since its previous run: SalesRollupState keeps
+the creation time up to which items were folded in as a watermark. The
+watermark stays ORDER_COMMIT_LAG seconds behind the clock, so an item
+whose checkout was still uncommitted when a run read the table is folded
+in by a later run instead of being skipped for good. New items are summed per
+product and hour into ProductSalesBucket rows, buckets that fell out of the
+longest window are dropped, and ProductSalesStats is recomputed from the
+remaining buckets in one grouped query. The cost of a run therefore follows
+the last 30 days of sales, not the whole order history.
+
+Items are counted as they are when the rollup reads them: items of orders
+already cancelled are skipped, a later cancellation is not subtracted.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, Exists, F, OuterRef, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+from . import caching
+from .models import OrderItem, Product, ProductSalesBucket, ProductSalesStats, SalesRollupState
+
+
+WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+}
+DEFAULT_WINDOW = '30d'
+RETENTION = max(WINDOWS.values())
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+BATCH_SIZE = 1000
+
+
+def trending_score(quantity_24h, quantity_7d):
+    """Units sold in the last day above the daily average of the last week."""
+    return quantity_24h - quantity_7d / 7
+
+
+def _fold_items(after, upto, since):
+    """Add order items created after `after` (if set) and up to `upto` to
+    the hourly buckets."""
+    items = OrderItem.objects.filter(created_at__lte=upto, created_at__gte=since)
+    if after is not None:
+        items = items.filter(created_at__gt=after)
+    rows = (
+        items
+        .exclude(order__status='cancelled')
+        .annotate(hour=TruncHour('created_at'))
+        .values('product_id', 'hour')
+        .annotate(
+            units=Sum('quantity'),
+            revenue=Sum(F('price') * F('quantity'), output_field=MONEY),
+        )
+        .order_by()
+    )
+    new = {(row['product_id'], row['hour']): row for row in rows}
+    if not new:
+        return 0
+    folded = len(new)
+
+    existing = ProductSalesBucket.objects.filter(
+        product_id__in={product_id for product_id, _ in new},
+        hour__in={hour for _, hour in new},
+    )
+    changed = []
+    for bucket in existing:
+        row = new.pop((bucket.product_id, bucket.hour), None)
+        if row is not None:
+            bucket.quantity += row['units']
+            bucket.revenue += row['revenue']
+            changed.append(bucket)
+    ProductSalesBucket.objects.bulk_update(changed, ['quantity', 'revenue'], batch_size=BATCH_SIZE)
+    ProductSalesBucket.objects.bulk_create(
+        [
+            ProductSalesBucket(product_id=product_id, hour=hour, quantity=row['units'], revenue=row['revenue'])
+            for (product_id, hour), row in new.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return folded
+
+
+def refresh_stats(now):
+    """Recompute every product's window totals and scores from the buckets."""
+    sums = {}
+    for name, span in WINDOWS.items():
+        recent = Q(hour__gte=now - span)
+        sums[f'quantity_{name}'] = Coalesce(Sum('quantity', filter=recent), 0)
+        sums[f'revenue_{name}'] = Coalesce(Sum('revenue', filter=recent), Value(Decimal('0')), output_field=MONEY)
+    rows = ProductSalesBucket.objects.values('product_id').annotate(**sums).order_by()
+
+    stats = [
+        ProductSalesStats(
+            trending_score=trending_score(row['quantity_24h'], row['quantity_7d']),
+            **row,
+        )
+        for row in rows
+    ]
+    ProductSalesStats.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=[*sums, 'trending_score', 'updated_at'],
+        batch_size=BATCH_SIZE,
+    )
+    ProductSalesStats.objects.filter(
+        ~Exists(ProductSalesBucket.objects.filter(product_id=OuterRef('pk')))
+    ).delete()
+
+
+def rollup(now=None):
+    """Fold new order items in and refresh the stats; returns the number of
+    (product, hour) sums folded into the buckets."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        state = SalesRollupState.lock()
+        upto = now - timedelta(seconds=settings.ORDER_COMMIT_LAG)
+        folded = 0
+        if state.last_order_item_at is None or upto > state.last_order_item_at:
+            folded = _fold_items(state.last_order_item_at, upto, now - RETENTION)
+            state.last_order_item_at = upto
+        ProductSalesBucket.objects.filter(hour__lt=now - RETENTION).delete()
+        refresh_stats(now)
+        state.last_run_at = now
+        state.save()
+    caching.bump(ProductSalesStats)
+    return folded
+
+
+# ===== RANKINGS =====
+
+def bestsellers(queryset, window=DEFAULT_WINDOW):
+    """`queryset` products that sold in `window`, most units first."""
+    return (
+        queryset
+        .filter(**{f'sales_stats__quantity_{window}__gt': 0})
+        .order_by(f'-sales_stats__quantity_{window}', f'-sales_stats__revenue_{window}', '-id')
+    )
+
+
+def trending(queryset):
+    """`queryset` products selling above their weekly pace, fastest first."""
+    return (
+        queryset
+        .filter(sales_stats__trending_score__gt=0)
+        .order_by('-sales_stats__trending_score', '-sales_stats__quantity_24h', '-id')
+    )
+
+
+def update_flags(top):
+    """Set is_bestseller and is_trending on the `top` ranked products and
+    clear them everywhere else; returns the number of products changed."""
+    now = timezone.now()
+    active = Product.objects.filter(is_active=True)
+    rankings = {
+        'is_bestseller': bestsellers(active),
+        'is_trending': trending(active),
+    }
+    changed = set()
+    with transaction.atomic():
+        for flag, ranked in rankings.items():
+            ids = list(ranked.values_list('id', flat=True)[:top])
+            for value, queryset in (
+                (False, Product.objects.filter(**{flag: True}).exclude(pk__in=ids)),
+                (True, Product.objects.filter(**{flag: False}, pk__in=ids)),
+            ):
+                pks = list(queryset.values_list('pk', flat=True))
+                # update() skips save(): touch updated_at for the ETags.
+                Product.objects.filter(pk__in=pks).update(**{flag: value}, updated_at=now)
+                changed.update(pks)
+    for pk in changed:
+        caching.bump(Product, pk)
+    if changed:
+        caching.bump(Product)
+    return len(changed)
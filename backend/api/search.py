@@ -0,0 +1,165 @@
+"""Full-text product search.
+
+Products are indexed over title, short description, description, search
+keywords and the brand and category names:
+
+* SQLite uses an FTS5 virtual table (`api_product_fts`) ranked with bm25.
+* PostgreSQL uses a weighted tsvector table (`api_product_search`) with a
+  GIN index, ranked with ts_rank_cd.
+* Any other backend falls back to icontains matching without ranking.
+
+The tables are created by migration 0003 and kept current incrementally
+from the Product, Brand and Category signals in api/signals.py. Run
+`manage.py rebuild_search_index` after bulk imports that bypass save().
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product
+
+
+FTS_TABLE = 'api_product_fts'
+PG_TABLE = 'api_product_search'
+
+# Upper bound on ranked hits considered for a single query.
+MAX_RESULTS = 1000
+MAX_TERMS = 10
+
+# bm25 column weights, in FTS table column order.
+FTS_WEIGHTS = (10.0, 4.0, 1.0, 6.0, 5.0, 3.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_INDEX_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, title, short_description, description,
+                             search_keywords, brand, category)
+    SELECT p.id, p.title, p.short_description, p.description, p.search_keywords,
+           COALESCE(b.name, ''), COALESCE(c.name, '')
+    FROM api_product p
+    LEFT JOIN api_brand b ON b.id = p.brand_id
+    LEFT JOIN api_category c ON c.id = p.category_id
+"""
+
+PG_DOCUMENT_SQL = """
+    setweight(to_tsvector('english', COALESCE(p.title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(p.search_keywords, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(b.name, '')), 'B') ||
+    setweight(to_tsvector('english', COALESCE(c.name, '')), 'B') ||
+    setweight(to_tsvector('english', COALESCE(p.short_description, '')), 'C') ||
+    setweight(to_tsvector('english', COALESCE(p.description, '')), 'D')
+"""
+
+PG_INDEX_SQL = f"""
+    INSERT INTO {PG_TABLE} (product_id, document)
+    SELECT p.id, {PG_DOCUMENT_SQL}
+    FROM api_product p
+    LEFT JOIN api_brand b ON b.id = p.brand_id
+    LEFT JOIN api_category c ON c.id = p.category_id
+"""
+
+
+def backend():
+    """Return 'sqlite', 'postgresql' or None when there is no index."""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        return connection.vendor
+    return None
+
+
+def tokenize(query):
+    return [t.lower() for t in TOKEN_RE.findall(query or '')][:MAX_TERMS]
+
+
+def _id_params(product_ids):
+    ids = [int(pk) for pk in product_ids]
+    return ids, ', '.join(['%s'] * len(ids))
+
+
+def index_products(product_ids):
+    """(Re)index the given products. Missing ids are simply dropped."""
+    ids, placeholders = _id_params(product_ids)
+    if not ids or backend() is None:
+        return
+    with connection.cursor() as cursor:
+        if backend() == 'sqlite':
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', ids)
+            cursor.execute(f'{SQLITE_INDEX_SQL} WHERE p.id IN ({placeholders})', ids)
+        else:
+            cursor.execute(
+                f'{PG_INDEX_SQL} WHERE p.id IN ({placeholders}) '
+                f'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                ids,
+            )
+
+
+def remove_products(product_ids):
+    ids, placeholders = _id_params(product_ids)
+    if not ids or backend() is None:
+        return
+    table, column = (FTS_TABLE, 'rowid') if backend() == 'sqlite' else (PG_TABLE, 'product_id')
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', ids)
+
+
+def rebuild_index():
+    """Drop and repopulate the whole index in one statement."""
+    if backend() is None:
+        return
+    with connection.cursor() as cursor:
+        if backend() == 'sqlite':
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(SQLITE_INDEX_SQL)
+        else:
+            cursor.execute(f'DELETE FROM {PG_TABLE}')
+            cursor.execute(PG_INDEX_SQL)
+
+
+def search_product_ids(query, limit=MAX_RESULTS):
+    """Return ids of active products matching `query`, best match first.
+
+    Every term must match; the last term also matches as a prefix so
+    partially typed words still find results.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+
+    if backend() == 'sqlite':
+        match = ' '.join(f'"{t}"' for t in terms[:-1])
+        match = f'{match} "{terms[-1]}"*'.strip()
+        weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+        sql = f"""
+            SELECT f.rowid FROM {FTS_TABLE} f
+            JOIN api_product p ON p.id = f.rowid
+            WHERE {FTS_TABLE} MATCH %s AND p.is_active
+            ORDER BY bm25({FTS_TABLE}, {weights}), f.rowid
+            LIMIT %s
+        """
+        params = [match, limit]
+    elif backend() == 'postgresql':
+        # Terms are \w+ only, so they are safe inside a tsquery.
+        tsquery = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+        sql = f"""
+            SELECT s.product_id FROM {PG_TABLE} s
+            JOIN api_product p ON p.id = s.product_id
+            WHERE s.document @@ to_tsquery('english', %s) AND p.is_active
+            ORDER BY ts_rank_cd(s.document, to_tsquery('english', %s)) DESC, s.product_id
+            LIMIT %s
+        """
+        params = [tsquery, tsquery, limit]
+    else:
+        queryset = Product.objects.filter(is_active=True)
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term) |
+                Q(short_description__icontains=term) |
+                Q(search_keywords__icontains=term) |
+                Q(brand__name__icontains=term) |
+                Q(category__name__icontains=term)
+            )
+        return list(queryset.values_list('id', flat=True)[:limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
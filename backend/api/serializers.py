@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.conf import settings
 from .models import (
     UserProfile, Category, Product, Cart, CartItem,
     WishList, Order, OrderItem, Banner
 )
-from .models import Address, Card, RecentlyViewed
+from .models import Address, Card, RecentlyViewed, cart_line_subtotal, cart_totals
+from .fieldsets import SparseFieldsetsMixin
 
 class UserSerializer(serializers.ModelSerializer):
     # include write-only password to support registration
@@ -37,6 +39,11 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    """The /users/me payload; api/profile.py loads and caches it.
+
+    Addresses, cards and recent views come from the queryset's prefetches,
+    recent products as slim summaries.
+    """
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.EmailField(source='user.email', read_only=True)
     addresses = serializers.SerializerMethodField()
@@ -54,11 +61,11 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return CardSerializer(obj.user.cards.all(), many=True).data
 
     def get_recently_viewed(self, obj):
-        # Return product details for recently viewed items
-        items = obj.user.recently_viewed.select_related('product')[:10]
-        products = [rv.product for rv in items]
-        # ProductSerializer is defined in this module below; use it to serialize
-        return ProductSerializer(products, many=True).data
+        items = getattr(obj.user, 'recent_views', None)
+        if items is None:
+            items = obj.user.recently_viewed.select_related('product')[:10]
+        # ProductSummarySerializer is defined in this module below
+        return ProductSummarySerializer([rv.product for rv in items], many=True, context=self.context).data
 
 
 from rest_framework import serializers
@@ -66,22 +73,35 @@ from .models import Category, Brand, Product, ProductImage, ProductSpecification
 from rest_framework import serializers
 from .models import Category, Brand, Product, ProductImage, ProductSpecification, ProductVariant
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
    
     parent_name = serializers.CharField(source='parent.name', read_only=True)
+    # Stored counter covering the whole subtree, see api/counters.py
+    product_count = serializers.IntegerField(source='active_product_count', read_only=True)
     
     class Meta:
         model = Category
         fields = [
             'id', 'name', 'slug', 'description', 'image', 'parent', 'parent_name',
-            'is_active', 'is_featured'
+            'is_active', 'is_featured', 'product_count'
         ]
-    
-    def get_product_count(self, obj):
-        return obj.products.filter(is_active=True).count()
 
-class BrandSerializer(serializers.ModelSerializer):
-    product_count = serializers.SerializerMethodField()
+    def validate_parent(self, parent):
+        if parent is not None and self.instance is not None and self.instance.path:
+            if parent.path.startswith(self.instance.path):
+                raise serializers.ValidationError('A category cannot be moved below itself.')
+        return parent
+
+class CategoryTreeSerializer(serializers.ModelSerializer):
+    """One node of /categories/tree/; `children` is filled in by the view."""
+    product_count = serializers.IntegerField(source='active_product_count', read_only=True)
+
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'slug', 'image', 'parent', 'depth', 'is_featured', 'product_count']
+
+class BrandSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    product_count = serializers.IntegerField(source='active_product_count', read_only=True)
     
     class Meta:
         model = Brand
@@ -89,21 +109,18 @@ class BrandSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'description', 'logo', 'website', 
             'is_active', 'product_count'
         ]
-    
-    def get_product_count(self, obj):
-        return obj.products.filter(is_active=True).count()
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductImage
         fields = ['id', 'image', 'alt_text', 'is_primary', 'order']
 
-class ProductSpecificationSerializer(serializers.ModelSerializer):
+class ProductSpecificationSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductSpecification
         fields = ['id', 'name', 'value', 'group', 'order']
 
-class ProductVariantSerializer(serializers.ModelSerializer):
+class ProductVariantSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     final_price = serializers.ReadOnlyField()
     final_weight = serializers.ReadOnlyField()
     stock_status = serializers.SerializerMethodField()
@@ -115,6 +132,12 @@ class ProductVariantSerializer(serializers.ModelSerializer):
             'stock', 'weight_modifier', 'final_weight', 'color', 'size',
             'image', 'is_active', 'created_at', 'stock_status'
         ]
+        # Columns read by properties and method fields, for api.prefetch.
+        field_dependencies = {
+            'final_price': ['price_modifier', 'product'],
+            'final_weight': ['weight_modifier', 'product'],
+            'stock_status': ['stock'],
+        }
     
     def get_stock_status(self, obj):
         if obj.stock == 0:
@@ -123,7 +146,7 @@ class ProductVariantSerializer(serializers.ModelSerializer):
             return "Low Stock"
         return "In Stock"
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), 
@@ -201,8 +224,15 @@ class ProductSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'published_at'
         ]
         read_only_fields = ['created_at', 'updated_at', 'published_at']
+        field_dependencies = {
+            'discount_amount': ['price', 'sale_price'],
+            'in_stock': ['manage_stock', 'stock'],
+            'low_stock': ['manage_stock', 'stock', 'low_stock_threshold'],
+            'stock_status': ['manage_stock', 'stock', 'low_stock_threshold'],
+            'dimensions': ['length', 'width', 'height', 'dimensions_unit'],
+        }
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """Lightweight serializer for product listings"""
     category = CategorySerializer(read_only=True)
     brand = BrandSerializer(read_only=True)
@@ -218,10 +248,15 @@ class ProductListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'slug', 'sku', 'short_description', 'price', 
             'sale_price', 'compare_at_price', 'discount_percentage',
-            'main_image_url', 'brand', 'category', 'stock_status', 'in_stock',
-            'is_trending', 'is_featured', 'is_bestseller', 'is_new_arrival',
+            'main_image_url', 'brand', 'category', 'stock', 'stock_status', 'in_stock',
+            'is_active', 'is_trending', 'is_featured', 'is_bestseller', 'is_new_arrival',
             'created_at'
         ]
+        field_dependencies = {
+            'in_stock': ['manage_stock', 'stock'],
+            'stock_status': ['manage_stock', 'stock', 'low_stock_threshold'],
+            'main_image_url': ['main_image', 'image'],
+        }
     
     def get_main_image_url(self, obj):
         if obj.main_image:
@@ -230,6 +265,17 @@ class ProductListSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+class ProductSummarySerializer(ProductListSerializer):
+    """Just enough to show a product card, e.g. in the profile payload"""
+    category = None
+    brand = None
+
+    class Meta(ProductListSerializer.Meta):
+        fields = [
+            'id', 'title', 'slug', 'price', 'sale_price', 'discount_percentage',
+            'main_image_url', 'in_stock'
+        ]
+
 class ProductCreateSerializer(serializers.ModelSerializer):
     """Serializer specifically for creating products"""
     category_id = serializers.PrimaryKeyRelatedField(
@@ -369,25 +415,74 @@ class ProductUpdateSerializer(serializers.ModelSerializer):
         
         return data
     
-class CartItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+class CartItemSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    product = ProductSummarySerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), write_only=True, source='product')
+    variant_id = serializers.PrimaryKeyRelatedField(
+        queryset=ProductVariant.objects.filter(is_active=True),
+        source='variant',
+        write_only=True,
+        required=False,
+        allow_null=True
+    )
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = CartItem
-        fields = ['id', 'cart', 'product', 'product_id', 'quantity', 'subtotal', 'created_at', 'updated_at']
-        read_only_fields = ['cart']
+        fields = ['id', 'cart', 'product', 'product_id', 'variant', 'variant_id', 'quantity', 'subtotal', 'created_at', 'updated_at']
+        read_only_fields = ['cart', 'variant']
+        annotations = {'line_subtotal': cart_line_subtotal()}
+        field_dependencies = {'subtotal': []}
+
+    def validate(self, attrs):
+        product = attrs.get('product', getattr(self.instance, 'product', None))
+        # A new product must also suit the variant the line already has.
+        variant = attrs['variant'] if 'variant' in attrs else getattr(self.instance, 'variant', None)
+        if variant is not None and variant.product_id != getattr(product, 'pk', None):
+            raise serializers.ValidationError({'variant_id': 'This variant belongs to another product.'})
+        return attrs
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Cart
-        fields = ['id', 'user', 'items', 'total', 'created_at', 'updated_at']
+        fields = ['id', 'user', 'items', 'total', 'item_count', 'created_at', 'updated_at']
         read_only_fields = ['user']
+        annotations = cart_totals('items__')
+        field_dependencies = {'total': [], 'item_count': []}
+
+
+class CartOperationSerializer(serializers.Serializer):
+    """One operation of a POST /cart/ops/ request, see api/cart_ops.py"""
+    op = serializers.ChoiceField(choices=['add', 'set', 'remove', 'clear'])
+    product_id = serializers.IntegerField(required=False)
+    variant_id = serializers.IntegerField(required=False, allow_null=True)
+    item_id = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(required=False, min_value=0, max_value=settings.CART_MAX_LINE_QUANTITY)
+
+    def validate(self, attrs):
+        op = attrs['op']
+        if attrs.get('variant_id') is not None and 'product_id' not in attrs:
+            raise serializers.ValidationError({'product_id': 'Required with variant_id.'})
+        if op == 'add':
+            if 'product_id' not in attrs:
+                raise serializers.ValidationError({'product_id': 'This field is required.'})
+            if attrs.get('quantity', 1) < 1:
+                raise serializers.ValidationError({'quantity': 'Ensure this value is greater than or equal to 1.'})
+        elif op in ('set', 'remove'):
+            if 'product_id' not in attrs and 'item_id' not in attrs:
+                raise serializers.ValidationError('Either item_id or product_id is required.')
+            if op == 'set' and 'quantity' not in attrs:
+                raise serializers.ValidationError({'quantity': 'This field is required.'})
+        return attrs
+
+
+class CartOperationsSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=settings.CART_MAX_OPERATIONS)
 
 
 class WishListSerializer(serializers.ModelSerializer):
@@ -426,17 +521,18 @@ class RecentlyViewedSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'product_id', 'viewed_at']
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'product', 'quantity', 'price', 'subtotal', 'created_at']
-        read_only_fields = ['price']
+        fields = ['id', 'product', 'variant', 'quantity', 'price', 'subtotal', 'created_at']
+        read_only_fields = ['variant', 'price']
+        field_dependencies = {'subtotal': ['price', 'quantity']}
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
 
@@ -444,6 +540,7 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ['id', 'user', 'items', 'total_amount', 'shipping_address', 'status', 'status_display', 'created_at', 'updated_at']
         read_only_fields = ['user', 'total_amount']
+        field_dependencies = {'status_display': ['status']}
 
 
 class BannerSerializer(serializers.ModelSerializer):
@@ -0,0 +1,233 @@
+"""Model signal handlers that keep derived data in sync with the catalog.
+
+Connected from ApiConfig.ready().
+"""
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, counters, profile, search, suggest
+from .models import (
+    Address, Banner, Brand, Card, Cart, CartItem, Category, Product, ProductImage,
+    ProductSpecification, ProductVariant, RecentlyViewed, UserProfile, WishList,
+)
+
+
+# ===== FULL-TEXT SEARCH INDEX =====
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def reindex_renamed_products(sender, instance, created=False, raw=False, **kwargs):
+    # Brand and category names are part of each product's document.
+    if not created and not raw:
+        search.index_products(instance.products.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Brand)
+@receiver(pre_delete, sender=Category)
+def remember_products_before_delete(sender, instance, **kwargs):
+    instance._search_product_ids = list(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def reindex_orphaned_products(sender, instance, **kwargs):
+    search.index_products(getattr(instance, '_search_product_ids', []))
+
+
+# ===== AUTOCOMPLETE INDEX =====
+# The in-memory index and the caches below are shared with other requests,
+# so they only learn of a change once it is committed; a rolled back write
+# leaves them alone. Callbacks get the pk now, as a delete clears it.
+
+@receiver(post_save, sender=Product)
+def patch_suggest_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(partial(suggest.product_changed, instance))
+
+
+@receiver(post_save, sender=Brand)
+def patch_suggest_brand(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(partial(suggest.brand_changed, instance))
+
+
+@receiver(post_save, sender=Category)
+def patch_suggest_category(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(partial(suggest.category_changed, instance))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def unpatch_suggest_entry(sender, instance, **kwargs):
+    transaction.on_commit(partial(suggest.index.remove, sender._meta.model_name, instance.pk))
+
+
+# ===== ACTIVE PRODUCT COUNTERS =====
+
+# Product.save() and deletes run these inside one transaction, so the
+# stored state read (and locked) before the write is what it replaces.
+
+@receiver(pre_save, sender=Product)
+def remember_counted_state(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._counted_state = counters.stored_product_state(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def update_counters_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        before = getattr(instance, '_counted_state', None)
+        if counters.apply_product_change(before, counters.product_state(instance)):
+            invalidate_counted_responses()
+        instance._counted_state = counters.product_state(instance)
+
+
+@receiver(pre_delete, sender=Product)
+def remember_deleted_state(sender, instance, **kwargs):
+    instance._counted_state = counters.stored_product_state(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def update_counters_on_delete(sender, instance, **kwargs):
+    if counters.apply_product_change(getattr(instance, '_counted_state', None), None):
+        invalidate_counted_responses()
+
+
+def invalidate_counted_responses():
+    # Counters are written with update(), which sends no signals of its own.
+    transaction.on_commit(partial(caching.bump, Brand))
+    transaction.on_commit(partial(caching.bump, Category))
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_parent(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is not None:
+        instance._stored_parent_id = (
+            Category.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Category)
+def recount_moved_category(sender, instance, created=False, raw=False, **kwargs):
+    # A move shifts a whole subtree's products between ancestor chains.
+    if not raw and not created and getattr(instance, '_stored_parent_id', None) != instance.parent_id:
+        counters.rebuild_category_counts()
+
+
+@receiver(post_delete, sender=Category)
+def recount_after_category_delete(sender, instance, **kwargs):
+    counters.rebuild_category_counts()
+
+
+# ===== CATALOG RESPONSE CACHE =====
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def invalidate_cached_catalog(sender, instance, **kwargs):
+    transaction.on_commit(partial(caching.bump, sender, instance.pk))
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductSpecification)
+@receiver(post_delete, sender=ProductSpecification)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def invalidate_cached_product_parts(sender, instance, **kwargs):
+    # Product responses nest these rows, so the parent product changes too.
+    transaction.on_commit(partial(caching.bump, sender, instance.pk))
+    transaction.on_commit(partial(caching.bump, Product, instance.product_id))
+
+
+# ===== CACHED PROFILES =====
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_profile_of_user(sender, instance, **kwargs):
+    profile.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=Address)
+@receiver(post_delete, sender=Address)
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+@receiver(post_save, sender=RecentlyViewed)
+@receiver(post_delete, sender=RecentlyViewed)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    profile.invalidate(instance.user_id)
+
+
+# ===== UPDATED_AT OF PARENT ROWS =====
+# ETags (api/conditional.py) come from updated_at, so changes to child rows
+# touch their parent. update() keeps the other save signals out of it.
+
+_batched_cart_items = threading.local()
+
+
+@contextmanager
+def batched_cart_items():
+    """Skip touch_cart for the cart items saved or deleted in the block;
+    the caller touches each cart once instead."""
+    _batched_cart_items.active = True
+    try:
+        yield
+    finally:
+        _batched_cart_items.active = False
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def touch_cart(sender, instance, **kwargs):
+    if not getattr(_batched_cart_items, 'active', False):
+        Cart.objects.filter(pk=instance.cart_id).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=WishList.products.through)
+def touch_wishlist(sender, instance, action, reverse, pk_set=None, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Changed from the product side; `instance` is a product.
+        wishlists = WishList.objects.filter(pk__in=pk_set) if pk_set else WishList.objects.none()
+    else:
+        wishlists = WishList.objects.filter(pk=instance.pk)
+    wishlists.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductSpecification)
+@receiver(post_delete, sender=ProductSpecification)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def touch_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
@@ -0,0 +1,229 @@
+"""Precomputed "similar products" from product content.
+
+Every active product gets a TF-IDF vector over the words of its title
+(counted twice), short description, specification names and values and
+`specification_1..5`, plus whole-value features for its brand, every
+category up its tree and each specification name/value pair. Cosine
+similarity between those vectors ranks neighbours. The TOP_K best for each
+product are stored in SimilarProduct, which is all /products/<id>/similar/
+reads.
+
+`rebuild()` (run by `manage.py rebuild_similar_products`) only recomputes
+what can have changed since its previous run. That covers the products
+whose `updated_at` moved (specification changes touch it too), plus the
+products whose stored list holds one of them or whose weakest neighbour one
+of them now beats. Document frequencies drift slowly, so unchanged lists
+are not rescored for them. `--full` recomputes everything, e.g. after
+renaming brands or categories.
+
+Vectors are sparse, and similarities come from an inverted index: a
+row's scores add up, feature by feature, the weights of the products
+listing that feature, so only products sharing a feature with it are
+touched and memory follows the number of non-zero weights rather than
+products x features. With numpy each feature's posting list is an array,
+and a row's scores are summed with one `bincount`; without it plain dicts
+give the same scores. The whole catalog is still read on every run, as
+any product may become a neighbour of a changed one and document
+frequencies span all of them, but it is streamed in chunks.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Prefetch
+from django.utils import timezone
+
+from . import caching
+from .models import Category, Product, ProductSpecification, SimilarProduct, SimilarityIndexState, path_ids
+from .search import TOKEN_RE
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+TOP_K = 10
+# Terms in a single product cannot make two products similar; of the rest,
+# the most widespread MAX_FEATURES are kept.
+MAX_FEATURES = 4096
+BATCH_SIZE = 1000
+
+
+def _words(text):
+    return [word.lower() for word in TOKEN_RE.findall(text or '') if len(word) > 1]
+
+
+def product_terms(product, categories):
+    """Term counts describing `product`; `categories` maps id -> path."""
+    terms = Counter(_words(product.title) * 2)
+    terms.update(_words(product.short_description))
+    for number in range(1, 6):
+        terms.update(_words(getattr(product, f'specification_{number}')))
+    for specification in product.specifications.all():
+        terms.update(_words(specification.name))
+        terms.update(_words(specification.value))
+        terms[f'spec:{specification.name.lower()}={specification.value.lower()}'] += 1
+    if product.brand_id:
+        terms[f'brand:{product.brand_id}'] += 1
+    if product.category_id in categories:
+        for category_id in path_ids(categories[product.category_id]):
+            terms[f'category:{category_id}'] += 1
+    return terms
+
+
+def build_vectors():
+    """(product ids, sparse vectors) for every active product: each vector
+    maps a feature index to its L2-normalized TF-IDF weight."""
+    categories = dict(Category.objects.values_list('id', 'path'))
+    products = (
+        Product.objects.filter(is_active=True)
+        .only(
+            'id', 'title', 'short_description', 'brand_id', 'category_id',
+            *(f'specification_{number}' for number in range(1, 6)),
+        )
+        .prefetch_related(Prefetch(
+            'specifications', queryset=ProductSpecification.objects.only('product_id', 'name', 'value'),
+        ))
+        .order_by('id')
+    )
+    ids, documents = [], []
+    for product in products.iterator(chunk_size=BATCH_SIZE):
+        ids.append(product.id)
+        documents.append(product_terms(product, categories))
+
+    frequency = Counter(term for terms in documents for term in terms)
+    kept = [term for term, count in frequency.most_common(MAX_FEATURES) if count > 1]
+    features = {term: index for index, term in enumerate(kept)}
+    total = len(documents)
+
+    vectors = []
+    for terms in documents:
+        weights = {
+            features[term]: (1 + math.log(count)) * (math.log((1 + total) / (1 + frequency[term])) + 1)
+            for term, count in terms.items() if term in features
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        vectors.append({feature: weight / norm for feature, weight in weights.items()})
+    return ids, vectors
+
+
+# ===== SIMILARITY BACKENDS =====
+# Both yield (row, [(column, score), ...]) for the requested rows, scores
+# above zero only and never the row itself.
+
+def _postings(vectors):
+    postings = defaultdict(list)
+    for row, vector in enumerate(vectors):
+        for feature, weight in vector.items():
+            postings[feature].append((row, weight))
+    return postings
+
+
+def _scored_rows_numpy(vectors, rows):
+    postings = {
+        feature: (np.array([row for row, _ in posting], dtype=np.int64), np.array([w for _, w in posting]))
+        for feature, posting in _postings(vectors).items()
+    }
+    for row in rows:
+        vector = vectors[row]
+        if not vector:
+            yield row, []
+            continue
+        columns = np.concatenate([postings[feature][0] for feature in vector])
+        weights = np.concatenate([postings[feature][1] * weight for feature, weight in vector.items()])
+        columns, inverse = np.unique(columns, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        keep = (scores > 0) & (columns != row)
+        yield row, list(zip(columns[keep].tolist(), scores[keep].tolist()))
+
+
+def _scored_rows_python(vectors, rows):
+    postings = _postings(vectors)
+    for row in rows:
+        scores = defaultdict(float)
+        for feature, weight in vectors[row].items():
+            for other, other_weight in postings[feature]:
+                scores[other] += weight * other_weight
+        scores.pop(row, None)
+        yield row, [(column, score) for column, score in scores.items() if score > 0]
+
+
+def scored_rows(vectors, rows):
+    if np is not None:
+        return _scored_rows_numpy(vectors, rows)
+    return _scored_rows_python(vectors, rows)
+
+
+def _top(scored):
+    return heapq.nlargest(TOP_K, scored, key=lambda item: (item[1], -item[0]))
+
+
+# ===== REBUILD =====
+
+def _affected(ids, vectors, changed_rows):
+    """Products whose stored list a changed product may now enter."""
+    weakest = {
+        product_id: (count, score)
+        for product_id, count, score in SimilarProduct.objects.values('product_id')
+        .annotate(count=Count('id'), score=Min('score')).values_list('product_id', 'count', 'score')
+    }
+    affected = set()
+    for _, scored in scored_rows(vectors, changed_rows):
+        for column, score in scored:
+            count, floor = weakest.get(ids[column], (0, 0.0))
+            if count < TOP_K or score >= floor:
+                affected.add(ids[column])
+    return affected
+
+
+def rebuild(full=False):
+    """Recompute the similar products of what changed since the last run;
+    returns the number of neighbour lists rewritten."""
+    with transaction.atomic():
+        state = SimilarityIndexState.lock()
+        watermark = Product.objects.aggregate(latest=Max('updated_at'))['latest']
+        if full or state.last_product_update is None:
+            changed = None
+        else:
+            changed = set(
+                Product.objects.filter(updated_at__gt=state.last_product_update).values_list('id', flat=True)
+            )
+
+        rewritten = 0
+        if changed is None or changed:
+            ids, vectors = build_vectors()
+            row_of = {product_id: row for row, product_id in enumerate(ids)}
+            if changed is None:
+                stale = set(ids)
+                SimilarProduct.objects.all().delete()
+            else:
+                changed_rows = [row_of[pk] for pk in sorted(changed) if pk in row_of]
+                stale = (
+                    changed
+                    | set(SimilarProduct.objects.filter(similar_id__in=changed).values_list('product_id', flat=True))
+                    | _affected(ids, vectors, changed_rows)
+                )
+                SimilarProduct.objects.filter(product_id__in=stale).delete()
+
+            rows = sorted(row_of[pk] for pk in stale if pk in row_of)
+            neighbours = [
+                SimilarProduct(product_id=ids[row], similar_id=ids[column], score=score, rank=rank)
+                for row, scored in scored_rows(vectors, rows)
+                for rank, (column, score) in enumerate(_top(scored), start=1)
+            ]
+            SimilarProduct.objects.bulk_create(neighbours, batch_size=BATCH_SIZE)
+            rewritten = len(rows)
+
+        state.last_product_update = watermark
+        state.last_run_at = timezone.now()
+        state.save()
+    if rewritten:
+        caching.bump(SimilarProduct)
+    return rewritten
+
+
+def similar_products(queryset, product_id):
+    """`queryset` products most like `product_id`, best first."""
+    return queryset.filter(similar_to__product_id=product_id).order_by('similar_to__rank')
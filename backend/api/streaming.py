@@ -0,0 +1,106 @@
+"""Stream whole list responses instead of building them in memory.
+
+A list view with `StreamingListMixin` streams every matching row, without
+pagination, when the client asks for it:
+
+* NDJSON, one object per line: `Accept: application/x-ndjson` or
+  `?format=ndjson`;
+* a JSON array: `?stream=true` with a JSON response.
+
+Streams bypass the page size cap, the response cache and ETags, so they
+are only served to users passing the view's `stream_permission_classes`
+(signed-in users by default, staff for the public catalog lists) and stop
+after STREAM_MAX_ROWS rows. Others get the permission error.
+
+Rows are read with `QuerySet.iterator()`, through the compiled serializer
+(api/compiled.py) when the serializer compiles and the regular one
+otherwise, and encoded one at a time, so worker memory stays flat however
+long the list is.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import permissions
+
+from .compiled import compile_serializer
+from .renderers import NDJSONRenderer, dumps
+
+
+STREAM_PARAM = 'stream'
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+class StreamingListMixin:
+    """Goes first in the bases: streams skip caching and ETags."""
+    stream_chunk_size = 500
+    stream_permission_classes = [permissions.IsAuthenticated]
+
+    def check_stream_permissions(self, request):
+        for permission in (permission_class() for permission_class in self.stream_permission_classes):
+            if not permission.has_permission(request, self):
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, 'message', None),
+                    code=getattr(permission, 'code', None),
+                )
+
+    def get_stream_format(self, request):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if renderer is None:
+            return None
+        if renderer.format == NDJSONRenderer.format:
+            return 'ndjson'
+        if renderer.format == 'json' and request.query_params.get(STREAM_PARAM, '').lower() in TRUE_VALUES:
+            return 'json'
+        return None
+
+    def stream_rows(self, queryset, limit):
+        serializer = self.get_serializer()
+        compiled = compile_serializer(serializer)
+        if compiled is not None:
+            rows = compiled.values(queryset)[:limit]
+            for row in rows.iterator(chunk_size=self.stream_chunk_size):
+                yield compiled.convert(row)
+        else:
+            for instance in queryset[:limit].iterator(chunk_size=self.stream_chunk_size):
+                yield serializer.to_representation(instance)
+
+    def list(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format(request)
+        if stream_format is None:
+            return super().list(request, *args, **kwargs)
+
+        self.check_stream_permissions(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.stream_rows(queryset, settings.STREAM_MAX_ROWS)
+        if stream_format == 'ndjson':
+            content = buffered(dumps(row) + b'\n' for row in rows)
+            content_type = NDJSONRenderer.media_type
+        else:
+            content = buffered(json_array(rows))
+            content_type = 'application/json'
+        return StreamingHttpResponse(content, content_type=content_type)
+
+
+def json_array(rows):
+    yield b'['
+    first = True
+    for row in rows:
+        if not first:
+            yield b','
+        first = False
+        yield dumps(row)
+    yield b']'
+
+
+def buffered(parts, size=64 * 1024):
+    """Join small byte strings into writes of about `size` bytes."""
+    buffer = []
+    length = 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
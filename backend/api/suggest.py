@@ -0,0 +1,350 @@
+"""In-process search-as-you-type index for product, brand and category names.
+
+The index lives in memory in each worker, so a suggestion request never
+touches the database. It is built on first use, the first requests of a
+process waiting for that one build, and patched from the model signals in
+api/signals.py when something changes in this process. Once it is
+SUGGEST_INDEX_MAX_AGE seconds old, so that changes made by other workers
+show up too, the next request starts a rebuild in a background thread and
+requests keep being served from the current index meanwhile. Patches
+arriving while a build runs are replayed onto its result.
+
+Matching works in two passes:
+
+1. Prefix: every word start of every name is kept in one sorted list, so
+   "iph" or "pro max" are a bisect away.
+2. Typos: if the prefix pass comes up short, names sharing trigrams with
+   the query are checked with a bounded edit distance (one typo for short
+   queries, two for longer ones).
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Brand, Category, Product
+
+
+KINDS = ('product', 'brand', 'category')
+RESULT_KEYS = {'product': 'products', 'brand': 'brands', 'category': 'categories'}
+
+# Names of brands and categories are fewer and broader than product titles,
+# so they rank a little higher for the same match quality.
+BASE_WEIGHTS = {'category': 3.0, 'brand': 2.0, 'product': 1.0}
+
+MAX_PREFIX_CANDIDATES = 200
+MAX_FUZZY_CANDIDATES = 50
+
+CENTS = Decimal('0.01')
+
+Entry = namedtuple('Entry', ['kind', 'id', 'label', 'slug', 'norm', 'weight', 'extra'])
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse punctuation to single spaces."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+def word_starts(norm):
+    """Every suffix of `norm` that begins at a word boundary."""
+    starts = [norm]
+    for index, ch in enumerate(norm):
+        if ch == ' ':
+            starts.append(norm[index + 1:])
+    return starts
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_distance(a, b, limit):
+    """Edit distance between a and b counting adjacent swaps as one edit.
+
+    Returns limit + 1 as soon as the distance is known to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                value = min(value, before[j - 2] + 1)
+            current.append(value)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def allowed_typos(query):
+    if len(query) < 4:
+        return 0
+    return 1 if len(query) <= 6 else 2
+
+
+def product_entry(product):
+    weight = BASE_WEIGHTS['product']
+    weight += 1.0 if product.is_bestseller else 0.0
+    weight += 0.5 if product.is_trending else 0.0
+    weight += 0.5 if product.is_featured else 0.0
+    image = product.main_image or product.image
+    extra = {
+        'price': str(Decimal(product.price).quantize(CENTS)),
+        'main_image': image.url if image else None,
+    }
+    return Entry('product', product.pk, product.title, product.slug,
+                 normalize(product.title), weight, extra)
+
+
+def brand_entry(brand):
+    return Entry('brand', brand.pk, brand.name, brand.slug,
+                 normalize(brand.name), BASE_WEIGHTS['brand'], {})
+
+
+def category_entry(category):
+    return Entry('category', category.pk, category.name, category.slug,
+                 normalize(category.name), BASE_WEIGHTS['category'], {})
+
+
+class SuggestIndex:
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self.lock = threading.RLock()
+        # Held for the duration of a build, so only one runs at a time.
+        self.build_lock = threading.Lock()
+        self.built_at = None
+        self._patches = None
+        self.entries = {}
+        self.prefixes = []
+        self.grams = {}
+
+    # ----- building and patching -----
+
+    def build(self):
+        with self.lock:
+            self._patches = []
+        try:
+            self._build()
+        finally:
+            with self.lock:
+                self._patches = None
+
+    def _build(self):
+        entries = []
+        products = Product.objects.filter(is_active=True).only(
+            'id', 'title', 'slug', 'price', 'main_image', 'image',
+            'is_bestseller', 'is_trending', 'is_featured',
+        )
+        entries.extend(product_entry(p) for p in products)
+        entries.extend(brand_entry(b) for b in Brand.objects.filter(is_active=True))
+        entries.extend(category_entry(c) for c in Category.objects.filter(is_active=True))
+
+        prefixes = []
+        grams = {}
+        by_key = {}
+        for entry in entries:
+            key = (entry.kind, entry.id)
+            by_key[key] = entry
+            prefixes.extend((start, key) for start in word_starts(entry.norm))
+            for gram in self._entry_grams(entry):
+                grams.setdefault(gram, set()).add(key)
+        prefixes.sort()
+
+        with self.lock:
+            self.entries = by_key
+            self.prefixes = prefixes
+            self.grams = grams
+            self.built_at = time.monotonic()
+            # Changes signalled after the rows above were read.
+            for patch, args in self._patches:
+                patch(*args)
+
+    def _entry_grams(self, entry):
+        grams = set()
+        for word in entry.norm.split():
+            grams |= trigrams(word)
+        return grams
+
+    def ensure_built(self):
+        if self.built_at is None:
+            with self.build_lock:
+                if self.built_at is None:
+                    self.build()
+        elif self.max_age is not None and time.monotonic() - self.built_at > self.max_age:
+            self.rebuild_in_background()
+
+    def rebuild_in_background(self):
+        """Start a rebuild thread unless a build is already running."""
+        if not self.build_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.build()
+            except Exception:
+                logger.exception('Could not rebuild the suggest index; serving the previous one.')
+            finally:
+                self.build_lock.release()
+                connection.close()
+
+        threading.Thread(target=run, name='suggest-rebuild', daemon=True).start()
+
+    def upsert(self, entry):
+        """Add or replace one entry; a no-op until the index has been built."""
+        with self.lock:
+            if self._patches is not None:
+                self._patches.append((self._upsert, (entry,)))
+            if self.built_at is not None:
+                self._upsert(entry)
+
+    def _upsert(self, entry):
+        self._remove(entry.kind, entry.id)
+        key = (entry.kind, entry.id)
+        self.entries[key] = entry
+        for start in word_starts(entry.norm):
+            bisect.insort(self.prefixes, (start, key))
+        for gram in self._entry_grams(entry):
+            self.grams.setdefault(gram, set()).add(key)
+
+    def remove(self, kind, pk):
+        with self.lock:
+            if self._patches is not None:
+                self._patches.append((self._remove, (kind, pk)))
+            if self.built_at is not None:
+                self._remove(kind, pk)
+
+    def _remove(self, kind, pk):
+        key = (kind, pk)
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for start in word_starts(entry.norm):
+            index = bisect.bisect_left(self.prefixes, (start, key))
+            if index < len(self.prefixes) and self.prefixes[index] == (start, key):
+                del self.prefixes[index]
+        for gram in self._entry_grams(entry):
+            keys = self.grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+
+    # ----- querying -----
+
+    def suggest(self, query, limit=8):
+        """Return up to `limit` matches per kind, best first."""
+        self.ensure_built()
+        query = normalize(query)
+        results = {RESULT_KEYS[kind]: [] for kind in KINDS}
+        if not query:
+            return results
+
+        with self.lock:
+            scored = self._prefix_matches(query)
+            if len(scored) < limit * len(KINDS):
+                for key, score in self._fuzzy_matches(query).items():
+                    if key not in scored:
+                        scored[key] = score
+            entries = self.entries
+            ranked = sorted(
+                (score, key) for key, score in scored.items() if key in entries
+            )
+
+        for _, key in ranked:
+            entry = entries[key]
+            bucket = results[RESULT_KEYS[entry.kind]]
+            if len(bucket) < limit:
+                bucket.append(self._serialize(entry))
+        return results
+
+    def _prefix_matches(self, query):
+        scored = {}
+        index = bisect.bisect_left(self.prefixes, (query,))
+        while index < len(self.prefixes) and len(scored) < MAX_PREFIX_CANDIDATES:
+            start, key = self.prefixes[index]
+            if not start.startswith(query):
+                break
+            entry = self.entries[key]
+            # Names that start with the query beat mid-name word matches.
+            quality = 0 if entry.norm.startswith(query) else 1
+            score = (quality, -entry.weight, len(entry.norm))
+            if key not in scored or score < scored[key]:
+                scored[key] = score
+            index += 1
+        return scored
+
+    def _fuzzy_matches(self, query):
+        limit = allowed_typos(query)
+        if not limit:
+            return {}
+        counts = Counter()
+        for word in query.split():
+            for gram in trigrams(word):
+                counts.update(self.grams.get(gram, ()))
+        scored = {}
+        for key, _ in counts.most_common(MAX_FUZZY_CANDIDATES):
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            # Compare against name prefixes one character shorter or longer
+            # too, so a dropped or doubled letter still counts as one typo.
+            size = len(query)
+            best = min(
+                bounded_distance(query, start[:length], limit)
+                for start in word_starts(entry.norm)
+                for length in (size - 1, size, size + 1)
+            )
+            if best <= limit:
+                scored[key] = (2 + best, -entry.weight, len(entry.norm))
+        return scored
+
+    def _serialize(self, entry):
+        data = {'id': entry.id, 'slug': entry.slug}
+        if entry.kind == 'product':
+            data['title'] = entry.label
+        else:
+            data['name'] = entry.label
+        data.update(entry.extra)
+        return data
+
+
+index = SuggestIndex(max_age=getattr(settings, 'SUGGEST_INDEX_MAX_AGE', 300))
+
+
+# ----- signal hooks -----
+
+def product_changed(product):
+    if product.is_active:
+        index.upsert(product_entry(product))
+    else:
+        index.remove('product', product.pk)
+
+
+def brand_changed(brand):
+    if brand.is_active:
+        index.upsert(brand_entry(brand))
+    else:
+        index.remove('brand', brand.pk)
+
+
+def category_changed(category):
+    if category.is_active:
+        index.upsert(category_entry(category))
+    else:
+        index.remove('category', category.pk)
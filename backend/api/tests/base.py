@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from ..models import Cart, CartItem, Product
+
+
+def make_product(title, **fields):
+    fields.setdefault('price', Decimal('10.00'))
+    fields.setdefault('stock', 10)
+    return Product.objects.create(title=title, sku=title.upper().replace(' ', '-'), **fields)
+
+
+# Production settings redirect plain HTTP to HTTPS.
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ApiTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shopper', password='secret')
+        self.client.force_authenticate(self.user)
+
+    def fill_cart(self, *lines, user=None):
+        cart, _ = Cart.objects.get_or_create(user=user or self.user)
+        for product, quantity, *variant in lines:
+            CartItem.objects.create(cart=cart, product=product, quantity=quantity, variant=variant[0] if variant else None)
+        return cart
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock
+
+    def ids(self, response):
+        return [row['id'] for row in response.data['results']]
@@ -0,0 +1,33 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..views import MAX_BATCH_IDS
+from .base import ApiTestCase, make_product
+
+
+class BatchFetchTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = [make_product(title) for title in ('Desk Lamp', 'Coffee Mug', 'Sofa')]
+
+    def test_results_follow_the_requested_order(self):
+        lamp, mug, sofa = self.products
+        response = self.client.get(f'/api/products/batch/?ids={sofa.pk},999,{lamp.pk},{sofa.pk}')
+        self.assertEqual(self.ids(response), [sofa.pk, lamp.pk])
+        self.assertEqual(response.data['missing'], [999])
+
+    def test_post_takes_a_list(self):
+        ids = [product.pk for product in self.products]
+        response = self.client.post('/api/products/batch/', {'ids': ids}, format='json')
+        self.assertEqual(self.ids(response), ids)
+
+    def test_queries_do_not_grow_with_the_ids(self):
+        with CaptureQueriesContext(connection) as one:
+            self.client.get(f'/api/products/batch/?ids={self.products[0].pk}')
+        with CaptureQueriesContext(connection) as three:
+            self.client.get('/api/products/batch/?ids=' + ','.join(str(product.pk) for product in self.products))
+        self.assertEqual(len(three), len(one))
+
+    def test_invalid_id_lists_are_rejected(self):
+        for query in ('', 'ids=', 'ids=1,x', 'ids=' + ','.join(map(str, range(1, MAX_BATCH_IDS + 2)))):
+            self.assertEqual(self.client.get(f'/api/products/batch/?{query}').status_code, 400, query)
@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Brand
+from .base import ApiTestCase, make_product
+
+
+class CatalogCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+        self.brand = Brand.objects.create(name='Acme', slug='acme')
+        self.lamp = make_product('Desk Lamp', brand=self.brand)
+
+    def detail(self, lookup=None):
+        return self.client.get(f'/api/products/{lookup or self.lamp.pk}/')
+
+    def test_repeated_reads_come_from_the_cache(self):
+        self.detail()
+        with self.assertNumQueries(0):
+            response = self.detail()
+        self.assertEqual(response.data['title'], 'Desk Lamp')
+
+    def test_saves_invalidate_once_committed(self):
+        self.detail()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.lamp.title = 'Floor Lamp'
+            self.lamp.save()
+        # Not committed yet: the cached copy still stands.
+        self.assertEqual(self.detail().data['title'], 'Desk Lamp')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.detail().data['title'], 'Floor Lamp')
+
+    def test_padded_lookups_share_the_version(self):
+        self.detail(f'0{self.lamp.pk}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.title = 'Floor Lamp'
+            self.lamp.save()
+        self.assertEqual(self.detail(f'0{self.lamp.pk}').data['title'], 'Floor Lamp')
+
+    def test_lists_follow_nested_models(self):
+        self.client.get('/api/products/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.name = 'Globex'
+            self.brand.save()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.data['results'][0]['brand']['name'], 'Globex')
+
+    def test_signed_in_users_bypass_the_cache(self):
+        self.detail()
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.detail()
+        self.assertTrue(queries)
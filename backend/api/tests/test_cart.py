@@ -0,0 +1,60 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Cart
+from .base import ApiTestCase, make_product
+
+
+class CartTotalsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lamp = make_product('Lamp', price=Decimal('12.50'))
+        self.shade = make_product('Shade', price=Decimal('4.00'))
+
+    def queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/user/cart/')
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_totals_are_computed_in_the_database(self):
+        self.fill_cart((self.lamp, 2), (self.shade, 3))
+        data = self.client.get('/api/user/cart/').data
+        self.assertEqual(Decimal(data['total']), Decimal('37.00'))
+        self.assertEqual(data['item_count'], 5)
+        subtotals = {item['product']['id']: Decimal(item['subtotal']) for item in data['items']}
+        self.assertEqual(subtotals, {self.lamp.pk: Decimal('25.00'), self.shade.pk: Decimal('12.00')})
+
+    def test_unannotated_cart_aggregates(self):
+        cart = self.fill_cart((self.lamp, 2), (self.shade, 1))
+        cart = Cart.objects.get(pk=cart.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(cart.total, Decimal('29.00'))
+        self.assertEqual(cart.item_count, 3)
+        empty = Cart.objects.create(user=User.objects.create_user('other'))
+        self.assertEqual((empty.total, empty.item_count), (0, 0))
+
+    def test_items_embed_product_summaries(self):
+        self.fill_cart((self.lamp, 1))
+        product = self.client.get('/api/user/cart/').data['items'][0]['product']
+        self.assertEqual(
+            set(product),
+            {'id', 'title', 'slug', 'price', 'sale_price', 'discount_percentage', 'main_image_url', 'in_stock'},
+        )
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        self.fill_cart((self.lamp, 1), (self.shade, 1))
+        few = self.queries()
+        self.fill_cart(*((make_product(f'Extra {number}'), 1) for number in range(10)))
+        self.assertEqual(self.queries(), few)
+
+    def test_subtotal_follows_an_update(self):
+        cart = self.fill_cart((self.lamp, 1))
+        item = cart.items.get()
+        response = self.client.patch(f'/api/cart-items/{item.pk}/', {'quantity': 4}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data['subtotal']), Decimal('50.00'))
+        self.assertEqual(Decimal(self.client.get('/api/user/cart/').data['total']), Decimal('50.00'))
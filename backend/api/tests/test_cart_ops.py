@@ -0,0 +1,70 @@
+from django.conf import settings
+
+from .. import cart_ops
+from ..models import CartItem
+from .base import ApiTestCase, make_product
+
+
+class CartOpsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lamp = make_product('Desk Lamp')
+        self.mug = make_product('Coffee Mug')
+
+    def ops(self, *operations):
+        return self.client.post('/api/cart/ops/', {'operations': list(operations)}, format='json')
+
+    def test_operations_fold_into_one_result(self):
+        cart = self.fill_cart((self.mug, 1))
+        mug_line = cart.items.get()
+
+        response = self.ops(
+            {'op': 'add', 'product_id': self.lamp.pk, 'quantity': 2},
+            {'op': 'add', 'product_id': self.lamp.pk},
+            {'op': 'set', 'item_id': mug_line.pk, 'quantity': 4},
+            {'op': 'set', 'product_id': self.mug.pk, 'quantity': 5},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cart_ops.lines(cart), {(self.lamp.pk, None): 3, (self.mug.pk, None): 5})
+        self.assertEqual(response.data['item_count'], 8)
+        # The mug line was updated in place rather than replaced.
+        self.assertTrue(CartItem.objects.filter(pk=mug_line.pk, quantity=5).exists())
+
+    def test_invalid_operation_rejects_the_whole_list(self):
+        cart = self.fill_cart((self.mug, 1))
+        hidden = make_product('Hidden Thing', is_active=False)
+
+        response = self.ops(
+            {'op': 'clear'},
+            {'op': 'add', 'product_id': self.lamp.pk},
+            {'op': 'add', 'product_id': hidden.pk},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('2', {str(index) for index in response.data['operations']})
+        self.assertEqual(cart_ops.lines(cart), {(self.mug.pk, None): 1})
+
+    def test_clear_then_add(self):
+        cart = self.fill_cart((self.mug, 2), (self.lamp, 1))
+        response = self.ops({'op': 'clear'}, {'op': 'add', 'product_id': self.mug.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cart_ops.lines(cart), {(self.mug.pk, None): 1})
+
+    def test_line_quantity_is_capped(self):
+        cap = settings.CART_MAX_LINE_QUANTITY
+        cart = self.fill_cart((self.mug, cap - 1))
+
+        response = self.ops({'op': 'set', 'product_id': self.lamp.pk, 'quantity': cap + 1})
+        self.assertEqual(response.status_code, 400)
+
+        # Adds accumulating past the cap are caught too.
+        response = self.ops({'op': 'add', 'product_id': self.mug.pk}, {'op': 'add', 'product_id': self.mug.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', {str(index) for index in response.data['operations']})
+        self.assertEqual(cart_ops.lines(cart), {(self.mug.pk, None): cap - 1})
+
+    def test_operation_count_is_capped(self):
+        operations = [{'op': 'add', 'product_id': self.lamp.pk}] * (settings.CART_MAX_OPERATIONS + 1)
+        self.assertEqual(self.ops(*operations).status_code, 400)
+        self.assertEqual(self.ops(*operations[1:]).status_code, 200)
@@ -0,0 +1,56 @@
+from ..models import Category
+from .base import ApiTestCase, make_product
+
+
+class CategoryTreeTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home = Category.objects.create(name='Home', slug='home')
+        self.lighting = Category.objects.create(name='Lighting', slug='lighting', parent=self.home)
+        self.lamps = Category.objects.create(name='Lamps', slug='lamps', parent=self.lighting)
+        self.garden = Category.objects.create(name='Garden', slug='garden')
+
+    def reload(self, category):
+        return Category.objects.get(pk=category.pk)
+
+    def test_paths_record_the_ancestors(self):
+        lamps = self.reload(self.lamps)
+        self.assertEqual(lamps.get_ancestor_ids(), [self.home.pk, self.lighting.pk, self.lamps.pk])
+        self.assertEqual(lamps.depth, 2)
+
+    def test_moving_a_category_moves_its_subtree(self):
+        self.lighting.parent = self.garden
+        self.lighting.save()
+        lamps = self.reload(self.lamps)
+        self.assertEqual(lamps.get_ancestor_ids(), [self.garden.pk, self.lighting.pk, self.lamps.pk])
+        self.assertEqual(lamps.depth, 2)
+
+        self.lighting.parent = None
+        self.lighting.save()
+        self.assertEqual(self.reload(self.lamps).depth, 1)
+
+    def test_saving_in_place_keeps_the_path(self):
+        self.lighting.name = 'Lights'
+        self.lighting.save()
+        self.assertEqual(self.reload(self.lamps).get_ancestor_ids()[:2], [self.home.pk, self.lighting.pk])
+
+    def test_a_category_cannot_move_below_itself(self):
+        self.home.parent = self.lamps
+        with self.assertRaises(ValueError):
+            self.home.save()
+
+    def test_subtree_listing(self):
+        lamp = make_product('Desk Lamp', category=self.lamps)
+        sofa = make_product('Sofa', category=self.home)
+        make_product('Hose', category=self.garden)
+        response = self.client.get(f'/api/categories/{self.home.pk}/products/')
+        self.assertEqual(set(self.ids(response)), {lamp.pk, sofa.pk})
+        response = self.client.get(f'/api/categories/{self.lighting.pk}/products/')
+        self.assertEqual(self.ids(response), [lamp.pk])
+
+    def test_tree_nests_children(self):
+        response = self.client.get('/api/categories/tree/')
+        self.assertEqual([node['slug'] for node in response.data], ['garden', 'home'])
+        home = response.data[1]
+        self.assertEqual(home['children'][0]['slug'], 'lighting')
+        self.assertEqual(home['children'][0]['children'][0]['slug'], 'lamps')
@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Cart, CartItem, Order, OrderItem, ProductVariant, StockReservation
+from .base import ApiTestCase, make_product
+
+
+class CheckoutTests(ApiTestCase):
+    def place_order(self):
+        return self.client.post('/api/orders/', {'shipping_address': '1 Main St'}, format='json')
+
+    def test_order_takes_stock_and_empties_cart(self):
+        lamp = make_product('Desk Lamp', price=Decimal('20.00'), stock=5)
+        mug = make_product('Coffee Mug', price=Decimal('4.50'), stock=3)
+        cart = self.fill_cart((lamp, 2), (mug, 3))
+
+        response = self.place_order()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Decimal(response.data['total_amount']), Decimal('53.50'))
+        self.assertEqual(len(response.data['items']), 2)
+        self.assertEqual((self.stock(lamp), self.stock(mug)), (3, 0))
+        self.assertFalse(CartItem.objects.filter(cart=cart).exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_short_line_rolls_everything_back(self):
+        lamp = make_product('Desk Lamp', stock=5)
+        mug = make_product('Coffee Mug', stock=1)
+        cart = self.fill_cart((lamp, 2), (mug, 3))
+
+        response = self.place_order()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['items']), {str(mug.pk)})
+        self.assertEqual((self.stock(lamp), self.stock(mug)), (5, 1))
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(CartItem.objects.filter(cart=cart).count(), 2)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_empty_cart_is_rejected(self):
+        Cart.objects.create(user=self.user)
+        response = self.place_order()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cart', response.data)
+
+    def test_backorders_stop_at_the_limit(self):
+        lamp = make_product('Desk Lamp', stock=1, allow_backorders=True, backorder_limit=2)
+        self.fill_cart((lamp, 4))
+        self.assertEqual(self.place_order().status_code, 400)
+
+        CartItem.objects.filter(cart__user=self.user).update(quantity=3)
+        self.assertEqual(self.place_order().status_code, 201)
+        lamp.refresh_from_db()
+        self.assertEqual((lamp.stock, lamp.backordered), (0, 2))
+
+    def test_variant_lines_use_variant_price_and_stock(self):
+        shirt = make_product('T Shirt', price=Decimal('15.00'), stock=0)
+        large = ProductVariant.objects.create(
+            product=shirt, sku='T-SHIRT-L', variant_name='Large', price_modifier=Decimal('2.00'), stock=4,
+        )
+        self.fill_cart((shirt, 2, large))
+
+        response = self.place_order()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Decimal(response.data['total_amount']), Decimal('34.00'))
+        large.refresh_from_db()
+        self.assertEqual(large.stock, 2)
+        self.assertEqual(OrderItem.objects.get().variant, large)
+
+
+
+    def order_queries(self, size, reserve=False):
+        self.fill_cart(*((make_product(f'Item {reserve} {size} {number}'), 1) for number in range(size)))
+        if reserve:
+            self.assertEqual(self.client.post('/api/cart/reserve/').status_code, 200)
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.place_order().status_code, 201)
+        return len(captured)
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        self.assertEqual(self.order_queries(2), self.order_queries(8))
+        self.assertEqual(self.order_queries(2, reserve=True), self.order_queries(8, reserve=True))
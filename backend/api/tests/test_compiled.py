@@ -0,0 +1,38 @@
+from decimal import Decimal
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ..compiled import compile_serializer
+from ..models import Brand, Category, Product
+from ..serializers import ProductListSerializer, ProductSerializer
+from .base import ApiTestCase, make_product
+
+
+class CompiledSerializerTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        home = Category.objects.create(name='Home', slug='home')
+        lighting = Category.objects.create(name='Lighting', slug='lighting', parent=home)
+        acme = Brand.objects.create(name='Acme', slug='acme')
+        make_product('Desk Lamp', brand=acme, category=lighting, main_image='products/main/lamp.jpg')
+        make_product('Rug', price=Decimal('40.00'), discount_percentage=25, category=home, stock=0)
+        make_product('Mystery Box', manage_stock=False)
+        self.context = {'request': Request(APIRequestFactory().get('/api/products/'))}
+
+    def test_output_matches_the_serializer(self):
+        serializer = ProductListSerializer(context=self.context)
+        compiled = compile_serializer(serializer)
+        self.assertIsNotNone(compiled)
+        queryset = Product.objects.order_by('id')
+        expected = ProductListSerializer(queryset, many=True, context=self.context).data
+        self.assertEqual(compiled.convert_many(compiled.values(queryset)), expected)
+
+    def test_many_related_serializers_are_not_compiled(self):
+        self.assertIsNone(compile_serializer(ProductSerializer(context=self.context)))
+
+    def test_listing_serves_the_same_data(self):
+        response = self.client.get('/api/products/?sort=name')
+        queryset = Product.objects.order_by('title', 'id')
+        expected = ProductListSerializer(queryset, many=True, context=self.context).data
+        self.assertEqual(response.data['results'], expected)
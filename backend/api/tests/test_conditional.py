@@ -0,0 +1,70 @@
+from ..models import Order, OrderItem, WishList
+from .base import ApiTestCase, make_product
+
+
+class ConditionalGetTests(ApiTestCase):
+    def etag(self, url, **headers):
+        return self.client.get(url, **headers)['ETag']
+
+    def revalidate(self, url, etag, **headers):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+
+    def test_unchanged_order_answers_304(self):
+        order = Order.objects.create(user=self.user, total_amount=1, shipping_address='x')
+        url = f'/api/orders/{order.pk}/'
+        etag = self.etag(url)
+
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Accept', response['Vary'])
+
+        order.status = 'shipped'
+        order.save()
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_order_lists_follow_their_items_and_products(self):
+        lamp = make_product('Desk Lamp')
+        mug = make_product('Coffee Mug')
+        order = Order.objects.create(user=self.user, total_amount=1, shipping_address='x')
+        OrderItem.objects.create(order=order, product=lamp, quantity=1, price=1)
+        item = OrderItem.objects.create(order=order, product=mug, quantity=1, price=1)
+        for url in ('/api/orders/', '/api/user/orders/'):
+            etag = self.etag(url)
+            self.assertEqual(self.revalidate(url, etag).status_code, 304)
+
+            lamp.title = f'{lamp.title}!'
+            lamp.save()
+            self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+        etag = self.etag('/api/user/orders/')
+        item.delete()
+        self.assertEqual(self.revalidate('/api/user/orders/', etag).status_code, 200)
+
+    def test_wishlist_follows_removed_products(self):
+        lamp = make_product('Desk Lamp')
+        wishlist = WishList.objects.create(user=self.user)
+        wishlist.products.add(lamp, make_product('Coffee Mug'))
+        etag = self.etag('/api/user/wishlist/')
+        self.assertEqual(self.revalidate('/api/user/wishlist/', etag).status_code, 304)
+        lamp.delete()
+        self.assertEqual(self.revalidate('/api/user/wishlist/', etag).status_code, 200)
+
+    def test_tags_differ_per_format(self):
+        Order.objects.create(user=self.user, total_amount=1, shipping_address='x')
+        json_tag = self.etag('/api/user/orders/')
+        html_tag = self.etag('/api/user/orders/', HTTP_ACCEPT='text/html')
+        self.assertNotEqual(json_tag, html_tag)
+
+    def test_catalog_revalidation_runs_no_query(self):
+        make_product('Desk Lamp')
+        self.client.force_authenticate(None)
+        etag = self.etag('/api/products/')
+        with self.assertNumQueries(0):
+            response = self.revalidate('/api/products/', etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_malformed_lookup_is_not_found(self):
+        self.assertEqual(self.client.get('/api/orders/abc/').status_code, 404)
+        self.assertEqual(self.client.get('/api/products/abc/').status_code, 404)
@@ -0,0 +1,67 @@
+from django.test import TestCase
+
+from .. import counters
+from ..models import Brand, Category, Product
+from .base import make_product
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Acme', slug='acme')
+        self.other_brand = Brand.objects.create(name='Globex', slug='globex')
+        self.root = Category.objects.create(name='Home', slug='home')
+        self.child = Category.objects.create(name='Lighting', slug='lighting', parent=self.root)
+
+    def counts(self):
+        return {
+            name: model.objects.get(pk=pk).active_product_count
+            for name, model, pk in (
+                ('brand', Brand, self.brand.pk), ('other_brand', Brand, self.other_brand.pk),
+                ('root', Category, self.root.pk), ('child', Category, self.child.pk),
+            )
+        }
+
+    def test_saves_and_deletes_move_counts(self):
+        lamp = make_product('Desk Lamp', brand=self.brand, category=self.child)
+        self.assertEqual(self.counts(), {'brand': 1, 'other_brand': 0, 'root': 1, 'child': 1})
+
+        lamp.brand = self.other_brand
+        lamp.category = self.root
+        lamp.save()
+        self.assertEqual(self.counts(), {'brand': 0, 'other_brand': 1, 'root': 1, 'child': 0})
+
+        lamp.is_active = False
+        lamp.save()
+        self.assertEqual(self.counts(), {'brand': 0, 'other_brand': 0, 'root': 0, 'child': 0})
+
+    def test_stale_instances_do_not_count_twice(self):
+        lamp = make_product('Desk Lamp', brand=self.brand, category=self.child)
+        stale = Product.objects.get(pk=lamp.pk)
+
+        lamp.is_active = False
+        lamp.save()
+        stale.is_active = False
+        stale.save()
+        self.assertEqual(self.counts()['brand'], 0)
+
+        lamp.is_active = True
+        lamp.save()
+        # Deleting goes by the stored state, not the stale inactive copy.
+        stale.delete()
+        self.assertEqual(self.counts(), {'brand': 0, 'other_brand': 0, 'root': 0, 'child': 0})
+
+    def test_moving_a_category_moves_its_counts(self):
+        make_product('Desk Lamp', brand=self.brand, category=self.child)
+        garden = Category.objects.create(name='Garden', slug='garden')
+
+        self.child.parent = garden
+        self.child.save()
+        self.assertEqual(self.counts()['root'], 0)
+        self.assertEqual(Category.objects.get(pk=garden.pk).active_product_count, 1)
+
+    def test_rebuild_matches_incremental_counts(self):
+        make_product('Desk Lamp', brand=self.brand, category=self.child)
+        make_product('Floor Lamp', brand=self.brand, category=self.root, is_active=False)
+        before = self.counts()
+        counters.rebuild_all()
+        self.assertEqual(self.counts(), before)
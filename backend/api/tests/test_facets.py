@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from ..models import Brand, Category
+from .base import ApiTestCase, make_product
+
+
+class FacetTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Brand.objects.create(name='Acme', slug='acme')
+        self.globex = Brand.objects.create(name='Globex', slug='globex')
+        self.home = Category.objects.create(name='Home', slug='home')
+        self.lighting = Category.objects.create(name='Lighting', slug='lighting', parent=self.home)
+        make_product('Desk Lamp', price=Decimal('30.00'), brand=self.acme, category=self.lighting, stock=50)
+        make_product('Floor Lamp', price=Decimal('80.00'), brand=self.acme, category=self.lighting, stock=3)
+        make_product('Sofa', price=Decimal('300.00'), brand=self.globex, category=self.home, stock=0, is_featured=True)
+
+    def facets(self, query=''):
+        response = self.client.get(f'/api/products/facets/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def counts(self, rows):
+        return {row['slug']: row['count'] for row in rows}
+
+    def test_counts_per_facet(self):
+        facets = self.facets()
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual(self.counts(facets['brands']), {'acme': 2, 'globex': 1})
+        # Categories count their descendants' products too.
+        self.assertEqual(self.counts(facets['categories']), {'home': 3, 'lighting': 2})
+        self.assertEqual(
+            {(row['min'], row['max']): row['count'] for row in facets['price_ranges'] if row['count']},
+            {(25, 50): 1, (50, 100): 1, (250, 500): 1},
+        )
+        self.assertEqual(facets['stock_status'], {'in_stock': 1, 'low_stock': 1, 'out_of_stock': 1})
+        self.assertEqual(facets['flags']['is_featured'], 1)
+
+    def test_counts_follow_the_listing_filters(self):
+        facets = self.facets('brand=acme&max_price=50')
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(self.counts(facets['brands']), {'acme': 1})
+        self.assertEqual(self.counts(facets['categories']), {'home': 1, 'lighting': 1})
+        self.assertEqual(self.client.get('/api/products/facets/?stock_status=gone').status_code, 400)
@@ -0,0 +1,40 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Brand, Order, OrderItem, ProductImage
+from .base import ApiTestCase, make_product
+
+
+class SparseFieldsetTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lamp = make_product('Desk Lamp', brand=Brand.objects.create(name='Acme', slug='acme'))
+        ProductImage.objects.create(product=self.lamp, image='products/gallery/lamp.jpg')
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, ' '.join(query['sql'] for query in queries)
+
+    def test_fields_prune_the_output_and_the_query(self):
+        data, sql = self.get(f'/api/products/{self.lamp.pk}/?fields=id,title,brand.name,nonsense')
+        self.assertEqual(set(data), {'id', 'title', 'brand'})
+        self.assertEqual(data['brand'], {'name': 'Acme'})
+        self.assertNotIn('"api_product"."description"', sql)
+        self.assertNotIn('api_productimage', sql)
+
+    def test_naming_a_nested_field_keeps_all_of_it(self):
+        data, _ = self.get(f'/api/products/{self.lamp.pk}/?fields=images')
+        self.assertEqual(set(data), {'images'})
+        self.assertIn('image', data['images'][0])
+
+    def test_exclude_drops_nested_leaves(self):
+        order = Order.objects.create(user=self.user, total_amount=1, shipping_address='x')
+        OrderItem.objects.create(order=order, product=self.lamp, quantity=1, price=1)
+        data, sql = self.get(f'/api/orders/{order.pk}/?exclude=items.product.description,shipping_address')
+        self.assertNotIn('shipping_address', data)
+        product = data['items'][0]['product']
+        self.assertNotIn('description', product)
+        self.assertEqual(product['title'], 'Desk Lamp')
+        self.assertNotIn('"api_product"."description"', sql)
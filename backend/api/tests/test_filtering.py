@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+from ..models import Brand, Category
+from .base import ApiTestCase, make_product
+
+
+class ProductFilterTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Brand.objects.create(name='Acme', slug='acme')
+        self.globex = Brand.objects.create(name='Globex', slug='globex')
+        self.home = Category.objects.create(name='Home', slug='home')
+        self.lighting = Category.objects.create(name='Lighting', slug='lighting', parent=self.home)
+        self.garden = Category.objects.create(name='Garden', slug='garden')
+        self.lamp = make_product('Desk Lamp', price=Decimal('30.00'), brand=self.acme, category=self.lighting)
+        self.sofa = make_product('Sofa', price=Decimal('300.00'), brand=self.globex, category=self.home)
+        self.hose = make_product('Garden Hose', price=Decimal('20.00'), brand=self.acme, category=self.garden, stock=0)
+        self.rug = make_product(
+            'Rug', price=Decimal('40.00'), discount_percentage=50, brand=self.acme, category=self.home,
+            is_featured=True,
+        )
+
+    def list(self, query):
+        return self.client.get(f'/api/products/?sort=price_asc&{query}')
+
+    def test_category_includes_subcategories(self):
+        response = self.list('category=home')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ids(response), [self.rug.pk, self.lamp.pk, self.sofa.pk])
+
+    def test_filters_combine(self):
+        response = self.list(f'brand=acme,{self.globex.pk}&min_price=5&max_price=30&in_stock=true')
+        self.assertEqual(self.ids(response), [self.rug.pk, self.lamp.pk])
+        self.assertEqual(self.ids(self.list('is_featured=true')), [self.rug.pk])
+        self.assertEqual(self.ids(self.list('stock_status=out_of_stock')), [self.hose.pk])
+
+    def test_sort_and_page_in_the_database(self):
+        response = self.client.get('/api/products/?sort=price_desc&page_size=2&page=2')
+        self.assertEqual(response.data['count'], 4)
+        # The rug sorts by its discounted sale price, below the hose.
+        self.assertEqual(self.ids(response), [self.hose.pk, self.rug.pk])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.list('min_price=cheap').status_code, 400)
+        self.assertEqual(self.list('in_stock=maybe').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/?sort=random').status_code, 400)
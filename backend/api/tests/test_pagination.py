@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from ..models import Order, Product
+from .base import ApiTestCase, make_product
+
+
+class KeysetPaginationTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        start = timezone.now() - timedelta(days=1)
+        self.orders = []
+        for minutes in range(5):
+            order = Order.objects.create(user=self.user, total_amount=1, shipping_address='x')
+            # Two orders share a timestamp, so the id has to break the tie.
+            Order.objects.filter(pk=order.pk).update(created_at=start + timedelta(minutes=min(minutes, 3)))
+            self.orders.append(order.pk)
+        self.newest_first = sorted(
+            self.orders, key=lambda pk: (Order.objects.get(pk=pk).created_at, pk), reverse=True,
+        )
+
+    def test_cursors_walk_every_row_once(self):
+        response = self.client.get('/api/user/orders/?page_size=2')
+        seen = self.ids(response)
+        self.assertIsNone(response.data['previous'])
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += self.ids(response)
+        self.assertEqual(seen, self.newest_first)
+
+    def test_previous_returns_the_earlier_page(self):
+        first = self.client.get('/api/user/orders/?page_size=2')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(self.ids(back), self.ids(first))
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/user/orders/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_default_product_listing_is_keyset_paginated(self):
+        for title in ('Desk Lamp', 'Coffee Mug', 'Sofa'):
+            make_product(title)
+        response = self.client.get('/api/products/?page_size=2')
+        self.assertNotIn('count', response.data)
+        seen = self.ids(response) + self.ids(self.client.get(response.data['next']))
+        self.assertEqual(seen, list(Product.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Brand, Category, Product, ProductImage, ProductSpecification, ProductVariant
+from ..prefetch import plan_queryset
+from ..serializers import ProductSerializer
+from .base import ApiTestCase, make_product
+
+
+class PrefetchPlanTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.brand = Brand.objects.create(name='Acme', slug='acme')
+        self.category = Category.objects.create(name='Home', slug='home')
+
+    def add_products(self, count):
+        for _ in range(count):
+            product = make_product(f'Lamp {Product.objects.count()}', brand=self.brand, category=self.category)
+            ProductImage.objects.create(product=product, image=f'products/gallery/{product.pk}.jpg')
+            ProductSpecification.objects.create(product=product, name='Bulb', value='E27')
+            ProductVariant.objects.create(product=product, variant_name='Brass', sku=f'{product.sku}-B')
+
+    def serialize(self, serializer_class):
+        with CaptureQueriesContext(connection) as queries:
+            data = serializer_class(plan_queryset(Product.objects.all(), serializer_class), many=True).data
+        return data, len(queries)
+
+    def test_nested_product_costs_the_same_for_any_number_of_rows(self):
+        self.add_products(2)
+        data, few = self.serialize(ProductSerializer)
+        self.assertEqual(len(data[0]['images']), 1)
+        self.assertEqual(data[0]['brand']['slug'], 'acme')
+        self.add_products(4)
+        data, many = self.serialize(ProductSerializer)
+        self.assertEqual(len(data), 6)
+        self.assertEqual(many, few)
+
+    def test_actions_get_their_own_serializer(self):
+        self.add_products(1)
+        product = Product.objects.get()
+        listed = self.client.get('/api/products/?sort=name').data['results'][0]
+        detail = self.client.get(f'/api/products/{product.pk}/').data
+        self.assertNotIn('images', listed)
+        self.assertEqual(len(detail['variants']), 1)
+        self.assertEqual(len(detail['images']), 1)
+
+    def test_list_queries_do_not_grow_with_the_page(self):
+        self.add_products(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/products/?sort=name')
+        self.add_products(4)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/products/?sort=name')
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(len(many), len(few))
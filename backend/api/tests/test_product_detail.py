@@ -0,0 +1,48 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Category, ProductImage, ProductSpecification
+from .base import ApiTestCase, make_product
+
+
+class ProductDetailTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home = Category.objects.create(name='Home', slug='home')
+        self.lighting = Category.objects.create(name='Lighting', slug='lighting', parent=self.home)
+        self.lamp = make_product('Desk Lamp', category=self.lighting)
+        ProductSpecification.objects.create(product=self.lamp, name='Bulb', value='E27', group='Technical')
+        ProductSpecification.objects.create(product=self.lamp, name='Height', value='40 cm')
+        self.shade = make_product('Lamp Shade', category=self.home)
+        make_product('Retired Lamp', category=self.home, is_active=False)
+
+    def test_everything_the_page_needs(self):
+        response = self.client.get(f'/api/products/{self.lamp.pk}/detail/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['product']['title'], 'Desk Lamp')
+        self.assertEqual([crumb['slug'] for crumb in response.data['breadcrumbs']], ['home', 'lighting'])
+        self.assertEqual(
+            {group['group']: len(group['specifications']) for group in response.data['specification_groups']},
+            {'Technical': 1, 'General': 1},
+        )
+        # No similarity index yet: related products come from the category tree.
+        self.assertEqual([product['id'] for product in response.data['related']], [])
+
+        response = self.client.get(f'/api/products/{self.shade.pk}/detail/')
+        self.assertEqual([product['id'] for product in response.data['related']], [self.lamp.pk])
+
+    def test_slug_lookup(self):
+        by_slug = self.client.get(f'/api/products/{self.lamp.slug}/detail/')
+        self.assertEqual(by_slug.data['product']['id'], self.lamp.pk)
+        self.assertEqual(self.client.get('/api/products/no-such-thing/detail/').status_code, 404)
+
+    def test_queries_are_fixed(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(f'/api/products/{self.lamp.pk}/detail/')
+        for number in range(3):
+            ProductImage.objects.create(product=self.lamp, image=f'products/gallery/{number}.jpg')
+            ProductSpecification.objects.create(product=self.lamp, name=f'Spec {number}', value='x')
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(f'/api/products/{self.lamp.pk}/detail/')
+        self.assertEqual(len(response.data['product']['images']), 3)
+        self.assertEqual(len(many), len(few))
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .. import recently_viewed
+from ..models import Address, Card, RecentlyViewed, UserProfile
+from .base import ApiTestCase, make_product
+
+
+class ProfileTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(recently_viewed, 'buffer', recently_viewed.ViewBuffer(flush_interval=3600))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        UserProfile.objects.create(user=self.user, phone='555-0100')
+        self.lamp = make_product('Lamp')
+
+    def me(self):
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def add_details(self, count):
+        now = timezone.now()
+        start = Address.objects.count()
+        for number in range(start, start + count):
+            Address.objects.create(user=self.user, line1=f'{number} Main St', city='Springfield', country='US')
+            Card.objects.create(user=self.user, cardholder_name='Shopper', last4=f'{number:04}')
+            product = make_product(f'Viewed {number}')
+            RecentlyViewed.objects.create(user=self.user, product=product, viewed_at=now - timedelta(minutes=number))
+
+    def queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            self.me()
+        return len(captured)
+
+    def test_query_count_does_not_grow_with_the_profile(self):
+        self.add_details(1)
+        few = self.queries()
+        self.add_details(5)
+        self.assertEqual(self.queries(), few)
+
+    def test_cached_profile_is_served_without_queries(self):
+        self.me()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.me()['phone'], '555-0100')
+
+    def test_changes_invalidate_after_commit(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            Address.objects.create(user=self.user, line1='1 Main St', city='Springfield', country='US')
+        self.assertEqual(len(self.me()['addresses']), 1)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Card.objects.create(user=self.user, cardholder_name='Shopper')
+        # Not yet committed: the cached copy stands.
+        self.assertEqual(self.me()['cards'], [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(self.me()['cards']), 1)
+
+    def test_product_edit_invalidates_profiles_showing_it(self):
+        RecentlyViewed.objects.create(user=self.user, product=self.lamp, viewed_at=timezone.now())
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.title = 'Desk Lamp'
+            self.lamp.save()
+        self.assertEqual(self.me()['recently_viewed'][0]['title'], 'Desk Lamp')
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from .. import recently_viewed
+from ..models import RecentlyViewed
+from .base import ApiTestCase, make_product
+
+
+class RecentlyViewedTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        # A long interval keeps the flush thread out of the tests.
+        self.buffer = recently_viewed.ViewBuffer(flush_interval=3600)
+        patcher = mock.patch.object(recently_viewed, 'buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.lamp, self.shade, self.bulb = (make_product(title) for title in ('Lamp', 'Shade', 'Bulb'))
+        self.earlier = timezone.now() - timedelta(hours=1)
+
+    def view(self, product):
+        response = self.client.post('/api/recently-viewed/', {'product_id': product.pk}, format='json')
+        self.assertEqual(response.status_code, 202)
+
+    def history(self):
+        return [row['product']['id'] for row in self.client.get('/api/recently-viewed/').data]
+
+    def test_post_buffers_without_writing(self):
+        self.view(self.lamp)
+        self.view(self.lamp)
+        self.assertFalse(RecentlyViewed.objects.exists())
+        self.assertEqual(self.buffer.pending(self.user.pk).keys(), {self.lamp.pk})
+
+    def test_list_merges_buffered_views(self):
+        RecentlyViewed.objects.create(user=self.user, product=self.lamp, viewed_at=self.earlier)
+        RecentlyViewed.objects.create(user=self.user, product=self.shade, viewed_at=self.earlier - timedelta(minutes=1))
+        self.view(self.bulb)
+        self.view(self.shade)
+        self.assertEqual(self.history(), [self.shade.pk, self.bulb.pk, self.lamp.pk])
+
+    def test_profile_merges_buffered_views(self):
+        RecentlyViewed.objects.create(user=self.user, product=self.lamp, viewed_at=self.earlier)
+        self.client.get('/api/users/me/')
+        self.view(self.bulb)
+        recent = [product['id'] for product in self.client.get('/api/users/me/').data['recently_viewed']]
+        self.assertEqual(recent, [self.bulb.pk, self.lamp.pk])
+
+    def test_flush_upserts_latest_view(self):
+        RecentlyViewed.objects.create(user=self.user, product=self.lamp, viewed_at=self.earlier)
+        self.view(self.lamp)
+        self.view(self.shade)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(RecentlyViewed.objects.filter(user=self.user).count(), 2)
+        self.assertGreater(RecentlyViewed.objects.get(product=self.lamp).viewed_at, self.earlier)
+        self.assertEqual(self.history(), [self.shade.pk, self.lamp.pk])
+
+    def test_flush_trims_history(self):
+        products = [make_product(f'Item {number}') for number in range(recently_viewed.HISTORY_LIMIT + 5)]
+        start = timezone.now()
+        for offset, product in enumerate(products):
+            self.buffer.record(self.user.pk, product.pk, start + timedelta(seconds=offset))
+        self.buffer.flush()
+        kept = set(RecentlyViewed.objects.filter(user=self.user).values_list('product_id', flat=True))
+        self.assertEqual(kept, {product.pk for product in products[5:]})
+
+    def test_failed_flush_keeps_views_buffered(self):
+        self.view(self.lamp)
+        with mock.patch.object(recently_viewed, 'write_views', side_effect=RuntimeError), \
+                self.assertLogs(recently_viewed.logger, 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.pending(self.user.pk).keys(), {self.lamp.pk})
@@ -0,0 +1,82 @@
+import unittest
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from .. import recommendations
+from ..models import Order, OrderItem, Product, ProductPairCount
+from .base import ApiTestCase, make_product
+
+
+class BoughtTogetherTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lamp, self.shade, self.bulb, self.mug = (
+            make_product(title) for title in ('Desk Lamp', 'Lamp Shade', 'Bulb', 'Coffee Mug')
+        )
+        self.first = self.order(self.lamp, self.shade)
+        self.order(self.lamp, self.shade, self.bulb)
+        self.order(self.lamp, self.bulb)
+        self.order(self.lamp, self.mug, status='cancelled')
+
+    def order(self, *products, status='pending'):
+        order = Order.objects.create(user=self.user, total_amount=1, shipping_address='x', status=status)
+        for product in products:
+            self.add_item(order, product, timezone.now() - timedelta(hours=1))
+        return order
+
+    def add_item(self, order, product, created_at):
+        item = OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        OrderItem.objects.filter(pk=item.pk).update(created_at=created_at)
+
+    def together(self, product):
+        ranked = recommendations.bought_together(Product.objects.all(), product.pk)
+        return list(ranked.values_list('pk', flat=True))
+
+    def pair(self, product, other):
+        return ProductPairCount.objects.get(product=product, other=other).orders
+
+    def test_neighbours_rank_by_shared_orders(self):
+        self.assertEqual(recommendations.train(), 3)
+        self.assertEqual(self.together(self.lamp), [self.shade.pk, self.bulb.pk])
+        self.assertEqual(self.together(self.shade), [self.lamp.pk, self.bulb.pk])
+        self.assertEqual(self.pair(self.lamp, self.lamp), 3)
+
+    def test_training_counts_new_items_once(self):
+        recommendations.train()
+        self.add_item(self.first, self.mug, timezone.now())
+        # Within ORDER_COMMIT_LAG: left for a later run.
+        self.assertEqual(recommendations.train(), 0)
+        with override_settings(ORDER_COMMIT_LAG=0):
+            self.assertEqual(recommendations.train(), 1)
+        self.assertEqual(self.pair(self.lamp, self.shade), 2)
+        self.assertEqual(self.pair(self.lamp, self.mug), 1)
+
+        # A full retrain arrives at the same counts.
+        with override_settings(ORDER_COMMIT_LAG=0):
+            recommendations.train(full=True)
+        self.assertEqual((self.pair(self.lamp, self.shade), self.pair(self.lamp, self.mug)), (2, 1))
+
+    def test_only_pairs_with_a_new_product_count(self):
+        rows = [(1, 10, False), (1, 11, True), (2, 10, True), (2, 12, True)]
+        counts = recommendations._count_pairs_python(rows)
+        self.assertEqual(counts[10, 11], 1)
+        self.assertEqual(counts[10, 12], 1)
+        self.assertEqual(counts[11, 11], 1)
+        # Product 10 was already counted in order 1.
+        self.assertEqual(counts[10, 10], 1)
+
+    @unittest.skipIf(recommendations.np is None, 'numpy is not installed')
+    def test_numpy_counts_match_python(self):
+        rows = [(1, 10, False), (1, 11, True), (2, 10, True), (2, 12, True), (2, 13, False)]
+        self.assertEqual(recommendations._count_pairs_numpy(rows), recommendations._count_pairs_python(rows))
+
+    def test_endpoints(self):
+        recommendations.train()
+        response = self.client.get(f'/api/products/{self.bulb.pk}/bought-together/')
+        self.assertEqual(self.ids(response), [self.lamp.pk, self.shade.pk])
+
+        self.fill_cart((self.shade, 1))
+        response = self.client.get('/api/cart/complete-your-order/')
+        self.assertEqual(self.ids(response), [self.lamp.pk, self.bulb.pk])
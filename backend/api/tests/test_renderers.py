@@ -0,0 +1,62 @@
+import json
+import unittest
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from .. import renderers
+from ..models import Order
+from .base import ApiTestCase, make_product
+
+
+class FastJSONTests(SimpleTestCase):
+    def test_bytes_match_drf(self):
+        data = {
+            'price': Decimal('19.90'),
+            'at': datetime(2024, 5, 1, 12, 30, 15, 250000, tzinfo=dt_timezone.utc),
+            'title': 'Lamp “brass”',
+            'tags': [1, None, True, 2.5],
+        }
+        self.assertEqual(renderers.dumps(data), JSONRenderer().render(data))
+
+    @unittest.skipIf(renderers.msgpack is None, 'msgpack is not installed')
+    def test_msgpack_round_trips(self):
+        at = datetime(2024, 5, 1, tzinfo=dt_timezone.utc)
+        content = renderers.MessagePackRenderer().render({'at': at, 'ids': [1, 2]})
+        self.assertEqual(renderers.msgpack.unpackb(content), {'at': '2024-05-01T00:00:00Z', 'ids': [1, 2]})
+
+
+class StreamingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for amount in range(3):
+            Order.objects.create(user=self.user, total_amount=amount, shipping_address='x')
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_streams_every_row(self):
+        response = self.client.get('/api/user/orders/', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['total_amount'] for row in rows}, {'0.00', '1.00', '2.00'})
+
+    def test_json_array_stream_is_capped(self):
+        with override_settings(STREAM_MAX_ROWS=2):
+            response = self.client.get('/api/user/orders/?stream=true')
+            rows = json.loads(self.content(response))
+        self.assertEqual(len(rows), 2)
+
+    def test_catalog_streams_are_for_staff(self):
+        make_product('Desk Lamp')
+        response = self.client.get('/api/products/?format=ndjson')
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get('/api/products/?format=ndjson')
+        self.assertEqual(json.loads(self.content(response))['title'], 'Desk Lamp')
@@ -0,0 +1,92 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+
+from ..models import CartItem, ProductVariant, StockReservation
+from .base import ApiTestCase, make_product
+
+
+class ReservationTests(ApiTestCase):
+    def reserve(self):
+        return self.client.post('/api/cart/reserve/')
+
+    def test_reserve_holds_stock_until_the_order_consumes_it(self):
+        lamp = make_product('Desk Lamp', stock=5)
+        self.fill_cart((lamp, 2))
+
+        response = self.reserve()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('expires_at', response.data)
+        self.assertEqual(self.stock(lamp), 3)
+
+        # Renewing an unchanged hold takes nothing more.
+        self.assertEqual(self.reserve().status_code, 200)
+        self.assertEqual(self.stock(lamp), 3)
+
+        response = self.client.post('/api/orders/', {'shipping_address': '1 Main St'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(lamp), 3)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_held_stock_is_not_available_to_others(self):
+        lamp = make_product('Desk Lamp', stock=2)
+        self.fill_cart((lamp, 2))
+        self.assertEqual(self.reserve().status_code, 200)
+
+        other = User.objects.create_user('other')
+        self.fill_cart((lamp, 1), user=other)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.reserve().status_code, 400)
+        self.assertEqual(self.stock(lamp), 0)
+
+    def test_release_gives_stock_back(self):
+        lamp = make_product('Desk Lamp', stock=5)
+        self.fill_cart((lamp, 2))
+        self.reserve()
+
+        self.assertEqual(self.client.delete('/api/cart/reserve/').status_code, 204)
+        self.assertEqual(self.stock(lamp), 5)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_sweeper_releases_only_expired_holds(self):
+        lamp = make_product('Desk Lamp', stock=5)
+        mug = make_product('Coffee Mug', stock=5)
+        self.fill_cart((lamp, 2))
+        self.reserve()
+        other = User.objects.create_user('other')
+        self.fill_cart((mug, 1), user=other)
+        self.client.force_authenticate(other)
+        self.reserve()
+        StockReservation.objects.filter(user=self.user).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        call_command('release_expired_reservations', stdout=StringIO())
+
+        self.assertEqual((self.stock(lamp), self.stock(mug)), (5, 4))
+        self.assertEqual(list(StockReservation.objects.values_list('user', flat=True)), [other.pk])
+
+    def test_reserve_follows_cart_changes(self):
+        lamp = make_product('Desk Lamp', stock=5)
+        mug = make_product('Coffee Mug', stock=5)
+        cart = self.fill_cart((lamp, 2), (mug, 1))
+        self.reserve()
+
+        CartItem.objects.filter(cart=cart, product=lamp).update(quantity=4)
+        CartItem.objects.filter(cart=cart, product=mug).delete()
+        self.assertEqual(self.reserve().status_code, 200)
+        self.assertEqual((self.stock(lamp), self.stock(mug)), (1, 5))
+
+    def test_variant_holds_take_variant_stock(self):
+        shirt = make_product('T Shirt', stock=3)
+        large = ProductVariant.objects.create(product=shirt, sku='T-SHIRT-L', variant_name='Large', stock=4)
+        self.fill_cart((shirt, 1), (shirt, 3, large))
+
+        self.assertEqual(self.reserve().status_code, 200)
+        large.refresh_from_db()
+        self.assertEqual((self.stock(shirt), large.stock), (2, 1))
+
+        self.client.delete('/api/cart/reserve/')
+        large.refresh_from_db()
+        self.assertEqual((self.stock(shirt), large.stock), (3, 4))
@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from ..models import Product
+from .base import make_product
+
+
+class SalePriceTests(TestCase):
+    def sale_price(self, product):
+        return Product.objects.values_list('sale_price', flat=True).get(pk=product.pk)
+
+    def test_kept_current_by_the_database(self):
+        lamp = make_product('Desk Lamp', price=Decimal('19.99'))
+        self.assertEqual(lamp.sale_price, Decimal('19.99'))
+
+        # update() sends no signals and runs no save(): the column still follows.
+        Product.objects.filter(pk=lamp.pk).update(discount_percentage=15)
+        self.assertEqual(self.sale_price(lamp), Decimal('16.99'))
+
+        Product.objects.bulk_create([
+            Product(title='Mug', slug='mug', sku='MUG', price=Decimal('8.00'), discount_percentage=50),
+        ])
+        self.assertEqual(Product.objects.get(sku='MUG').sale_price, Decimal('4.00'))
+
+    def test_reloaded_after_save(self):
+        lamp = make_product('Desk Lamp', price=Decimal('20.00'))
+        self.assertEqual(lamp.sale_price, Decimal('20.00'))
+        lamp.price = Decimal('30.00')
+        lamp.save()
+        self.assertEqual(lamp.sale_price, Decimal('30.00'))
+        self.assertEqual(lamp.discount_amount, Decimal('0.00'))
+
+    def test_filters_and_sorts_use_it(self):
+        cheap = make_product('Desk Lamp', price=Decimal('20.00'))
+        discounted = Product.objects.create(title='Sofa', sku='SOFA', price=Decimal('100.00'))
+        Product.objects.filter(pk=discounted.pk).update(discount_percentage=90)
+        ordered = Product.objects.order_by('sale_price', 'id').values_list('pk', flat=True)
+        self.assertEqual(list(ordered), [discounted.pk, cheap.pk])
+        self.assertEqual(list(Product.objects.filter(sale_price__lte=15).values_list('pk', flat=True)), [discounted.pk])
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .. import sales
+from ..models import Order, OrderItem, Product, ProductSalesStats
+from .base import ApiTestCase, make_product
+
+
+class SalesRollupTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.lamp = make_product('Desk Lamp')
+        self.mug = make_product('Coffee Mug')
+        self.sofa = make_product('Sofa')
+        self.sell(self.lamp, 5, hours=2)
+        self.sell(self.mug, 10, hours=3 * 24)
+        self.sell(self.sofa, 20, hours=10 * 24)
+        self.sell(self.sofa, 50, hours=2, status='cancelled')
+
+    def sell(self, product, quantity, hours, status='pending'):
+        order = Order.objects.create(user=self.user, total_amount=1, shipping_address='x', status=status)
+        item = OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+        OrderItem.objects.filter(pk=item.pk).update(created_at=self.now - timedelta(hours=hours))
+
+    def ranked(self, ranking, *args):
+        return list(ranking(Product.objects.all(), *args).values_list('pk', flat=True))
+
+    def test_rankings_per_window(self):
+        sales.rollup(self.now)
+        self.assertEqual(self.ranked(sales.bestsellers, '24h'), [self.lamp.pk])
+        self.assertEqual(self.ranked(sales.bestsellers, '7d'), [self.mug.pk, self.lamp.pk])
+        self.assertEqual(self.ranked(sales.bestsellers, '30d'), [self.sofa.pk, self.mug.pk, self.lamp.pk])
+        self.assertEqual(self.ranked(sales.trending), [self.lamp.pk])
+
+    def test_runs_fold_each_item_once(self):
+        sales.rollup(self.now)
+        sales.rollup(self.now + timedelta(minutes=1))
+        self.assertEqual(ProductSalesStats.objects.get(pk=self.mug.pk).quantity_7d, 10)
+
+        # Too recent to be surely committed: left for a later run.
+        self.sell(self.mug, 1, hours=0)
+        sales.rollup(self.now + timedelta(minutes=2))
+        self.assertEqual(ProductSalesStats.objects.get(pk=self.mug.pk).quantity_7d, 10)
+        sales.rollup(self.now + timedelta(seconds=settings.ORDER_COMMIT_LAG + 60))
+        self.assertEqual(ProductSalesStats.objects.get(pk=self.mug.pk).quantity_7d, 11)
+
+    def test_endpoints(self):
+        sales.rollup(self.now)
+        response = self.client.get('/api/products/bestsellers/?window=7d&limit=1')
+        self.assertEqual(self.ids(response), [self.mug.pk])
+        self.assertEqual(self.ids(self.client.get('/api/products/trending/')), [self.lamp.pk])
+        self.assertEqual(self.client.get('/api/products/bestsellers/?window=1y').status_code, 400)
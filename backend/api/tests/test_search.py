@@ -0,0 +1,48 @@
+from ..models import Brand
+from ..search import search_product_ids
+from .base import ApiTestCase, make_product
+
+
+class SearchTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Brand.objects.create(name='Acme', slug='acme')
+        self.lamp = make_product('Brass Desk Lamp', description='A lamp for the study.')
+        self.shade = make_product('Lamp Shade', brand=self.acme)
+        self.mug = make_product('Coffee Mug', description='Goes well with a desk lamp.')
+
+    def test_title_matches_rank_first(self):
+        ranked = search_product_ids('desk lamp')
+        self.assertEqual(ranked[0], self.lamp.pk)
+        self.assertEqual(set(ranked), {self.lamp.pk, self.mug.pk})
+
+    def test_last_term_matches_as_a_prefix(self):
+        self.assertEqual(search_product_ids('coff'), [self.mug.pk])
+        self.assertEqual(search_product_ids('coffee m'), [self.mug.pk])
+        self.assertEqual(search_product_ids('coff mug'), [])
+
+    def test_index_follows_saves_and_brand_renames(self):
+        self.mug.title = 'Tea Cup'
+        self.mug.save()
+        self.assertEqual(search_product_ids('tea'), [self.mug.pk])
+        self.assertEqual(search_product_ids('coffee'), [])
+
+        self.assertEqual(search_product_ids('globex'), [])
+        self.acme.name = 'Globex'
+        self.acme.save()
+        self.assertEqual(search_product_ids('globex'), [self.shade.pk])
+
+        self.shade.is_active = False
+        self.shade.save()
+        self.assertEqual(search_product_ids('globex'), [])
+
+    def test_search_endpoint_pages_ranked_hits(self):
+        response = self.client.get('/api/products/search/?q=lamp&page_size=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 1)
+
+        response = self.client.get(f'/api/products/search/?q=lamp&brand={self.acme.pk}')
+        self.assertEqual(self.ids(response), [self.shade.pk])
+
+        self.assertEqual(self.client.get('/api/products/search/?q=').status_code, 400)
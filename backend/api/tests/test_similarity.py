@@ -0,0 +1,65 @@
+import unittest
+
+from .. import similarity
+from ..models import Product, SimilarProduct
+from .base import ApiTestCase, make_product
+
+
+class SimilarProductsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.oak_desk = make_product('Oak Writing Desk', short_description='Solid oak desk with drawers')
+        self.pine_desk = make_product('Pine Writing Desk', short_description='Pine desk with drawers')
+        self.oak_shelf = make_product('Oak Shelf', short_description='Solid oak shelf')
+        self.kettle = make_product('Steel Kettle', short_description='Electric kettle')
+        self.teapot = make_product('Steel Teapot', short_description='Electric teapot')
+
+    def similar(self, product):
+        return list(similarity.similar_products(Product.objects.all(), product.pk).values_list('pk', flat=True))
+
+    def test_neighbours_rank_by_shared_content(self):
+        self.assertEqual(similarity.rebuild(), Product.objects.count())
+        self.assertEqual(self.similar(self.oak_desk)[:2], [self.pine_desk.pk, self.oak_shelf.pk])
+        self.assertEqual(self.similar(self.kettle), [self.teapot.pk])
+        self.assertNotIn(self.oak_desk.pk, self.similar(self.oak_desk))
+
+    def test_rebuild_only_rescores_what_changed(self):
+        duck = make_product('Rubber Duck', short_description='Yellow rubber toy')
+        make_product('Rubber Ball', short_description='Bouncy rubber toy')
+        similarity.rebuild()
+        self.assertEqual(similarity.rebuild(), 0)
+        untouched = list(SimilarProduct.objects.filter(product=duck).values_list('pk', flat=True))
+
+        self.teapot.title = 'Oak Writing Desk Organizer'
+        self.teapot.short_description = 'Solid oak organizer with drawers'
+        self.teapot.save()
+        rewritten = similarity.rebuild()
+        # The rubber toys share nothing with the edited product.
+        self.assertEqual(rewritten, 5)
+        self.assertEqual(list(SimilarProduct.objects.filter(product=duck).values_list('pk', flat=True)), untouched)
+        self.assertIn(self.teapot.pk, self.similar(self.oak_desk))
+        self.assertNotIn(self.teapot.pk, self.similar(self.kettle))
+
+    def test_full_rebuild_matches_incremental(self):
+        similarity.rebuild()
+        self.kettle.title = 'Steel Oak Kettle'
+        self.kettle.save()
+        similarity.rebuild()
+        incremental = set(SimilarProduct.objects.values_list('product_id', 'similar_id', 'rank'))
+        similarity.rebuild(full=True)
+        self.assertEqual(set(SimilarProduct.objects.values_list('product_id', 'similar_id', 'rank')), incremental)
+
+    @unittest.skipIf(similarity.np is None, 'numpy is not installed')
+    def test_numpy_scores_match_python(self):
+        _, vectors = similarity.build_vectors()
+        rows = range(len(vectors))
+        python = {row: dict(scored) for row, scored in similarity._scored_rows_python(vectors, rows)}
+        for row, scored in similarity._scored_rows_numpy(vectors, rows):
+            self.assertEqual(dict(scored).keys(), python[row].keys())
+            for column, score in scored:
+                self.assertAlmostEqual(score, python[row][column])
+
+    def test_endpoint(self):
+        similarity.rebuild()
+        response = self.client.get(f'/api/products/{self.teapot.pk}/similar/')
+        self.assertEqual(self.ids(response), [self.kettle.pk])
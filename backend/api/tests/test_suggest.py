@@ -0,0 +1,55 @@
+from unittest import mock
+
+from .. import suggest
+from ..models import Brand, Category
+from .base import ApiTestCase, make_product
+
+
+class SuggestTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        # A fresh index per test: the module one outlives the test rollbacks.
+        patcher = mock.patch.object(suggest, 'index', suggest.SuggestIndex())
+        self.index = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.lamp = make_product('Desk Lamp')
+        self.shade = make_product('Lamp Shade')
+        self.lighting = Category.objects.create(name='Lamps', slug='lamps')
+        self.acme = Brand.objects.create(name='Acme', slug='acme')
+
+    def titles(self, results, kind='products'):
+        return [row.get('title') or row.get('name') for row in results[kind]]
+
+    def test_prefixes_match_word_starts(self):
+        results = self.index.suggest('lam')
+        # Names starting with the query come before mid-name matches.
+        self.assertEqual(self.titles(results), ['Lamp Shade', 'Desk Lamp'])
+        self.assertEqual(self.titles(results, 'categories'), ['Lamps'])
+        self.assertEqual(self.titles(self.index.suggest('ACM')), [])
+        self.assertEqual(self.titles(self.index.suggest('ACM'), 'brands'), ['Acme'])
+
+    def test_typos_are_tolerated_for_longer_queries(self):
+        self.assertEqual(self.titles(self.index.suggest('deck')), ['Desk Lamp'])
+        self.assertEqual(self.titles(self.index.suggest('dek')), [])
+
+    def test_patched_once_committed(self):
+        self.index.ensure_built()
+        with self.captureOnCommitCallbacks() as callbacks:
+            make_product('Desk Fan')
+        self.assertEqual(self.titles(self.index.suggest('fan')), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.titles(self.index.suggest('fan')), ['Desk Fan'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.is_active = False
+            self.lamp.save()
+            self.shade.delete()
+        self.assertEqual(self.titles(self.index.suggest('lam')), [])
+
+    def test_endpoint_reads_no_database(self):
+        self.client.get('/api/products/suggest/?q=lam')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/suggest/?q=lam&limit=1')
+        self.assertEqual(self.titles(response.data), ['Lamp Shade'])
+        self.assertEqual(self.client.get('/api/products/suggest/?q=lam&limit=x').status_code, 400)
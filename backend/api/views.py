@@ -2,12 +2,15 @@ from rest_framework import viewsets, permissions, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth.models import User
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from .serializers import (
@@ -15,13 +18,26 @@ from .serializers import (
     CartSerializer, CartItemSerializer, WishListSerializer, OrderSerializer, 
     OrderItemSerializer, BannerSerializer, AddressSerializer, CardSerializer,
     RecentlyViewedSerializer, BrandSerializer, ProductImageSerializer,
-    ProductSpecificationSerializer, ProductVariantSerializer, ProductListSerializer
+    ProductSpecificationSerializer, ProductVariantSerializer, ProductListSerializer,
+    CategoryTreeSerializer, CartOperationsSerializer
 )
 from .models import (
     UserProfile, Category, Product, Cart, CartItem, WishList, Order, 
     OrderItem, Banner, Address, Card, RecentlyViewed, Brand, 
-    ProductImage, ProductSpecification, ProductVariant
+    ProductImage, ProductSpecification, ProductVariant, ProductSalesStats,
+    BoughtTogether, SimilarProduct
 )
+from .filters import ProductFilter, DEFAULT_SORT
+from .pagination import ProductPageNumberPagination, KeysetPagination
+from .search import search_product_ids
+from .facets import product_facets
+from .prefetch import EagerLoadingMixin, plan_queryset
+from .caching import CatalogCacheMixin, cache_response, model_versions
+from .conditional import ConditionalGetMixin
+from .compiled import CompiledListMixin
+from .streaming import StreamingListMixin
+from . import cart_ops, checkout, inventory, profile, recently_viewed, recommendations, sales, similarity, suggest
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
@@ -52,17 +68,10 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
         """Return current logged-in user's data at /users/me/"""
-        # Return the richer UserProfile representation so frontend gets phone,
-        # addresses, cards and recently_viewed in one call.
-        try:
-            profile = request.user.userprofile
-        except UserProfile.DoesNotExist:
-            profile = UserProfile.objects.create(user=request.user)
-
-        from .serializers import UserProfileSerializer
-
-        serializer = UserProfileSerializer(profile, context={'request': request})
-        return Response(serializer.data)
+        # The UserProfile representation, so the frontend gets phone,
+        # addresses, cards and recently_viewed in one call; built in a fixed
+        # number of queries and cached per user (api/profile.py).
+        return Response(profile.profile_data(request.user, context={'request': request}))
 
 
 class LogoutView(APIView):
@@ -83,27 +92,315 @@ class LogoutView(APIView):
             return Response({'detail': 'Invalid token.'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CatalogCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
 
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def tree(self, request):
+        """All active categories as a nested tree, from a single query."""
+        # Path order lists every parent before its children.
+        categories = Category.objects.filter(is_active=True).order_by('path')
+        nodes = CategoryTreeSerializer(categories, many=True, context={'request': request}).data
+
+        roots = []
+        by_id = {}
+        for node in nodes:
+            node['children'] = []
+            by_id[node['id']] = node
+            parent = by_id.get(node['parent'])
+            # Children of an inactive category are left out with it.
+            if parent is not None:
+                parent['children'].append(node)
+            elif node['parent'] is None:
+                roots.append(node)
+
+        for node in [*by_id.values(), {'children': roots}]:
+            node['children'].sort(key=lambda child: child['name'].lower())
+        return Response(roots)
+
+
+# Upper bound on ids per /products/batch/ request.
+MAX_BATCH_IDS = 100
+
+# Related products in the aggregated product detail.
+RELATED_PRODUCTS_LIMIT = 8
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.select_related('category').all()
+# Products per ranking or recommendation list: default and upper bound.
+RANKING_LIMIT = 12
+MAX_RANKING_LIMIT = 50
+
+
+def parse_limit(request, default=RANKING_LIMIT, maximum=MAX_RANKING_LIMIT):
+    try:
+        return min(max(int(request.query_params.get('limit', default)), 1), maximum)
+    except ValueError:
+        raise ValidationError({'limit': 'Expected an integer.'})
+
+
+class ProductViewSet(StreamingListMixin, ConditionalGetMixin, CatalogCacheMixin, CompiledListMixin, EagerLoadingMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
+    # Whole-catalog exports only; everyone else pages through the list.
+    stream_permission_classes = [permissions.IsAdminUser]
+    pagination_class = ProductPageNumberPagination
+    cache_models = [Category, Brand]
+    # Image, specification and variant changes also bump their product's
+    # object version, so a detail only depends on the models nested by
+    # reference.
+    cache_detail_models = [Category, Brand]
+    etag_models = [Category, Brand]
+
+    def get_serializer_class(self):
+        # Listings only need the card fields; the full nested representation
+        # is reserved for a single product.
+        if self.action in ('list', 'search', 'bestsellers', 'trending', 'bought_together', 'similar'):
+            return ProductListSerializer
+        return super().get_serializer_class()
+
+    # Precomputed tables behind some actions, bumped by the jobs that
+    # refresh them (manage.py rollup_sales, train_bought_together,
+    # rebuild_similar_products).
+    action_cache_models = {
+        'bestsellers': [ProductSalesStats],
+        'trending': [ProductSalesStats],
+        'bought_together': [BoughtTogether],
+        'similar': [SimilarProduct],
+        'full_detail': [SimilarProduct],
+    }
+
+    def get_cache_versions(self):
+        versions = super().get_cache_versions()
+        return versions + model_versions(self.action_cache_models.get(self.action, []))
+
+    @property
+    def paginator(self):
+        # The default newest-first listing is keyset paginated over
+        # (created_at, id) so deep pages stay cheap; the other sort orders
+        # fall back to page numbers.
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if (self.action == 'list' and 'page' not in params
+                    and ProductFilter(params).get_sort() == DEFAULT_SORT):
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # Filtering, sorting and pagination all run in the database;
+            # see api/filters.py for the supported query parameters.
+            queryset = ProductFilter(self.request.query_params).apply(queryset)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def search(self, request):
+        """Full-text search at /products/search/?q=, best matches first.
+
+        Accepts the same filters as the product listing to narrow the hits.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This query parameter is required.'})
+
+        ids = search_product_ids(query)
+        product_filter = ProductFilter(request.query_params)
+        narrowed = product_filter.build_q()
+        if ids and narrowed:
+            allowed = set(Product.objects.filter(narrowed, id__in=ids).values_list('id', flat=True))
+            ids = [pk for pk in ids if pk in allowed]
+
+        page_ids = self.paginate_queryset(ids)
+        products = self.plan_queryset(Product.objects.all()).in_bulk(page_ids)
+        results = [products[pk] for pk in page_ids if pk in products]
+        serializer = self.get_serializer(results, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def facets(self, request):
+        """Facet counts at /products/facets/ for the listing's filter set.
+
+        Takes the same query parameters as the product listing and returns
+        counts per brand, category (including descendants), price range,
+        stock status and flag, computed in a single grouped query.
+        """
+        queryset = ProductFilter(request.query_params).filter_queryset(Product.objects.all())
+        return Response(product_facets(queryset))
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Search-as-you-type suggestions at /products/suggest/?q=.
+
+        Served from the in-memory index in api/suggest.py, so no database
+        query runs per keystroke. Returns up to `limit` (default 8, max 20)
+        products, brands and categories.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer.'})
+        return Response(suggest.index.suggest(request.query_params.get('q', ''), limit=limit))
+
+    def ranked_response(self, request, ranked):
+        products = self.plan_queryset(ranked)[:parse_limit(request)]
+        return Response({'results': self.get_serializer(products, many=True).data})
+
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def bestsellers(self, request):
+        """Best-selling products at /products/bestsellers/, most units first.
+
+        Ranked from the sales rollups (api/sales.py) over `window`: 24h, 7d
+        or 30d (the default). The listing filters, e.g. `category`, narrow
+        the ranking; `limit` defaults to 12, at most 50.
+        """
+        window = request.query_params.get('window', sales.DEFAULT_WINDOW)
+        if window not in sales.WINDOWS:
+            raise ValidationError({'window': f'Expected one of {", ".join(sales.WINDOWS)}.'})
+        queryset = ProductFilter(request.query_params).filter_queryset(Product.objects.filter(is_active=True))
+        return self.ranked_response(request, sales.bestsellers(queryset, window))
+
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def trending(self, request):
+        """Products selling above their weekly pace at /products/trending/.
+
+        Ranked from the sales rollups; takes the same filters and `limit` as
+        /products/bestsellers/.
+        """
+        queryset = ProductFilter(request.query_params).filter_queryset(Product.objects.filter(is_active=True))
+        return self.ranked_response(request, sales.trending(queryset))
+
+    @action(detail=True, methods=['get'], url_path='bought-together')
+    @cache_response
+    def bought_together(self, request, pk=None):
+        """Products often ordered with this one at /products/<id>/bought-together/.
+
+        Read from the precomputed neighbours (api/recommendations.py), most
+        frequent first; `limit` as for /products/bestsellers/.
+        """
+        if not pk.isdigit():
+            raise NotFound()
+        queryset = Product.objects.filter(is_active=True)
+        return self.ranked_response(request, recommendations.bought_together(queryset, pk))
+
+    @action(detail=True, methods=['get'])
+    @cache_response
+    def similar(self, request, pk=None):
+        """Products most like this one by content at /products/<id>/similar/.
+
+        Read from the precomputed neighbours (api/similarity.py), closest
+        first; `limit` as for /products/bestsellers/.
+        """
+        if not pk.isdigit():
+            raise NotFound()
+        queryset = Product.objects.filter(is_active=True)
+        return self.ranked_response(request, similarity.similar_products(queryset, pk))
+
+    @action(detail=False, methods=['get', 'post'])
+    def batch(self, request):
+        """Many products by id in one request: /products/batch/?ids=1,2,3.
+
+        POST {"ids": [...]} for lists too long for a URL. Results follow the
+        order of the ids asked for; ids with no product are listed in
+        `missing`.
+        """
+        if request.method == 'POST':
+            raw = request.data.get('ids', [])
+        else:
+            raw = request.query_params.get('ids', '')
+        if isinstance(raw, str):
+            raw = raw.split(',')
+        try:
+            ids = list(dict.fromkeys(int(str(value).strip()) for value in raw if str(value).strip()))
+        except (TypeError, ValueError):
+            raise ValidationError({'ids': 'Expected a comma separated list of integers.'})
+        if not ids:
+            raise ValidationError({'ids': 'At least one id is required.'})
+        if len(ids) > MAX_BATCH_IDS:
+            raise ValidationError({'ids': f'At most {MAX_BATCH_IDS} ids per request.'})
+
+        products = self.plan_queryset(Product.objects.all()).in_bulk(ids)
+        serializer = self.get_serializer([products[pk] for pk in ids if pk in products], many=True)
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in products],
+        })
+
+    @action(detail=True, methods=['get'], url_path='detail')
+    def full_detail(self, request, pk=None):
+        """Everything the product page needs at /products/<id or slug>/detail/.
+
+        The product with images, specifications and variants, its
+        specifications grouped, the category breadcrumb trail and related
+        products (the most similar ones, see api/similarity.py, or else
+        others from its category), from a fixed number of queries. Cached
+        under the product's version whichever way it is looked up; related
+        products may lag by up to CATALOG_CACHE_TIMEOUT.
+        """
+        lookup = Q(pk=pk) if pk.isdigit() else Q(slug=pk)
+        product_id = Product.objects.filter(lookup).values_list('pk', flat=True).first()
+        if product_id is None:
+            raise NotFound()
+        self.kwargs[self.lookup_url_kwarg or self.lookup_field] = product_id
+        return self.cached_response(request, ProductViewSet.build_full_detail, product_id)
+
+    def build_full_detail(self, request, product_id):
+        product = self.plan_queryset(Product.objects.filter(pk=product_id)).get()
+        data = self.get_serializer(product).data
+
+        groups = {}
+        for specification in data.get('specifications', []):
+            groups.setdefault(specification['group'] or 'General', []).append(specification)
+
+        active = Product.objects.filter(is_active=True)
+        related = list(
+            plan_queryset(similarity.similar_products(active, product.pk), ProductListSerializer)
+            [:RELATED_PRODUCTS_LIMIT]
+        )
+        breadcrumbs = []
+        if product.category_id is not None:
+            category = Category.objects.only('path').get(pk=product.category_id)
+            breadcrumbs = list(
+                Category.objects.filter(pk__in=category.get_ancestor_ids())
+                .order_by('depth').values('id', 'name', 'slug')
+            )
+            if not related:
+                # Not indexed yet: fall back to the category's products.
+                related = plan_queryset(
+                    active.filter(category.subtree_q('category__path'))
+                    .exclude(pk=product.pk)
+                    .order_by('-is_bestseller', '-created_at', '-id'),
+                    ProductListSerializer,
+                )[:RELATED_PRODUCTS_LIMIT]
+
+        return Response({
+            'product': data,
+            'specification_groups': [
+                {'group': group, 'specifications': specifications}
+                for group, specifications in groups.items()
+            ],
+            'breadcrumbs': breadcrumbs,
+            'related': ProductListSerializer(related, many=True, context=self.get_serializer_context()).data,
+        })
 
     def perform_create(self, serializer):
         serializer.save()
 
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return UserProfile.objects.filter(user=self.request.user)
+        return profile.profile_queryset().filter(user=self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -136,11 +433,14 @@ class CardViewSet(viewsets.ModelViewSet):
             Card.objects.filter(user=self.request.user).exclude(id=card.id).update(is_default=False)
 
 
-class RecentlyViewedViewSet(viewsets.ModelViewSet):
+class RecentlyViewedViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """Allow users to list and create their recently viewed entries.
 
     Frontend should POST {"product_id": <id>} when a user views a product.
     GET will return the user's recent products ordered by viewed_at.
+    Views are buffered and written in batches (api/recently_viewed.py), so
+    a POST answers 202 without writing, and GET merges the views this
+    process still holds into the stored history.
     """
     serializer_class = RecentlyViewedSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -148,20 +448,27 @@ class RecentlyViewedViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return RecentlyViewed.objects.filter(user=self.request.user).select_related('product')
 
-    def perform_create(self, serializer):
-        # If an entry exists for this user/product, update its viewed_at timestamp.
-        product = serializer.validated_data.get('product')
-        rv, created = RecentlyViewed.objects.get_or_create(user=self.request.user, product=product)
-        if not created:
-            # touch the timestamp
-            rv.save()
-        # Return the object so the serializer can use it
-        return rv
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product = serializer.validated_data['product']
+        viewed_at = recently_viewed.buffer.record(request.user.id, product.id)
+        return Response({'product_id': product.id, 'viewed_at': viewed_at}, status=status.HTTP_202_ACCEPTED)
+
+    def list(self, request, *args, **kwargs):
+        views = self.filter_queryset(self.get_queryset())
+        pending = recently_viewed.buffer.pending(request.user.id)
+        if pending:
+            products = plan_queryset(Product.objects.filter(pk__in=pending), ProductSerializer)
+            views = recently_viewed.merge(views, pending, {product.pk: product for product in products})
+        serializer = self.get_serializer(views, many=True)
+        return Response(serializer.data)
 
 
-class CartViewSet(viewsets.ModelViewSet):
+class CartViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_fields = ('updated_at', 'items__product__updated_at')
 
     def get_queryset(self):
         return Cart.objects.filter(user=self.request.user)
@@ -169,8 +476,60 @@ class CartViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['post'])
+    def ops(self, request):
+        """Apply a list of add/set/remove/clear operations atomically.
+
+        Body: {"operations": [{"op": "add", "product_id": 3, "quantity": 2},
+        ...]}, see api/cart_ops.py. Either every operation is applied or, on
+        the first invalid one, none; the response is the resulting cart.
+        """
+        serializer = CartOperationsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart, _ = Cart.objects.get_or_create(user=request.user)
+        cart_ops.apply(cart, serializer.validated_data['operations'])
+        cart = plan_queryset(Cart.objects.filter(pk=cart.pk), CartSerializer).get()
+        return Response(CartSerializer(cart, context=self.get_serializer_context()).data)
+
+    @action(detail=False, methods=['post', 'delete'])
+    def reserve(self, request):
+        """Hold the cart's stock while its owner checks out.
+
+        POST takes every line off stock (api/inventory.py) for
+        STOCK_RESERVATION_TTL seconds, renewing what is already held and
+        giving back what left the cart; the order then consumes the holds.
+        It answers {"expires_at"} or, changing nothing, 400 naming the
+        lines short of stock. DELETE gives everything back.
+        """
+        if request.method == 'DELETE':
+            inventory.release(request.user)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        cart = Cart.objects.filter(user=request.user).first()
+        lines = cart_ops.lines(cart) if cart is not None else {}
+        if not lines:
+            raise ValidationError({'cart': 'The cart is empty.'})
+        products, _ = inventory.load(lines)
+        expires_at = inventory.hold(request.user, lines, products)
+        return Response({'expires_at': expires_at})
+
+    @action(detail=False, methods=['get'], url_path='complete-your-order')
+    def complete_your_order(self, request):
+        """Products often bought with what is in the user's cart.
+
+        Neighbours of every cart product from the precomputed
+        frequently-bought-together table, scored together and leaving out
+        what is already in the cart; `limit` defaults to 12, at most 50.
+        """
+        product_ids = list(
+            CartItem.objects.filter(cart__user=request.user).values_list('product_id', flat=True)
+        )
+        ranked = recommendations.complete_order(Product.objects.filter(is_active=True), product_ids)
+        products = plan_queryset(ranked, ProductListSerializer)[:parse_limit(request)]
+        serializer = ProductListSerializer(products, many=True, context=self.get_serializer_context())
+        return Response({'results': serializer.data})
+
 
-class CartItemViewSet(viewsets.ModelViewSet):
+class CartItemViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     serializer_class = CartItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -180,11 +539,23 @@ class CartItemViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         cart, _ = Cart.objects.get_or_create(user=self.request.user)
         serializer.save(cart=cart)
+        self.reload(serializer)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self.reload(serializer)
 
+    def reload(self, serializer):
+        # The planned subtotal annotation was read before the write.
+        serializer.instance = self.plan_queryset(CartItem.objects.filter(pk=serializer.instance.pk)).get()
 
-class WishListViewSet(viewsets.ModelViewSet):
+
+class WishListViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     serializer_class = WishListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_fields = ('updated_at', 'products__updated_at')
+    # Wishlisted products nest their brand and category.
+    etag_models = [Category, Brand]
 
     def get_queryset(self):
         return WishList.objects.filter(user=self.request.user)
@@ -240,40 +611,25 @@ class WishListViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(StreamingListMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Items nest their product as it is now, brand and category included.
+    etag_fields = ('updated_at', 'items__product__updated_at')
+    etag_models = [Category, Brand]
 
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user)
 
     def perform_create(self, serializer):
-        # Ensure a cart exists for the user; if none, create an empty one.
-        cart, _ = Cart.objects.get_or_create(user=self.request.user)
-        # Use 0.00 if cart has no items
-        total_amount = cart.total if hasattr(cart, 'items') else 0
+        # Locks the cart, snapshots prices, adds the items, takes them off
+        # stock and empties the cart in one transaction (api/checkout.py).
+        order = checkout.place_order(self.request.user, serializer)
+        # The response nests every item's product: read them eagerly.
+        serializer.instance = self.plan_queryset(Order.objects.filter(pk=order.pk)).get()
 
-        order = serializer.save(
-            user=self.request.user,
-            total_amount=total_amount
-        )
-
-        # Create order items from cart items (if any)
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-
-        # Clear the cart
-        cart.items.all().delete()
-
-        return order
 
-
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     serializer_class = OrderItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -281,34 +637,34 @@ class OrderItemViewSet(viewsets.ModelViewSet):
         return OrderItem.objects.filter(order__user=self.request.user)
 
 
-class BannerViewSet(viewsets.ModelViewSet):
+class BannerViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Banner.objects.filter(is_active=True)
     serializer_class = BannerSerializer
     permission_classes = [permissions.AllowAny]
 
 # Add the missing viewset classes
-class BrandViewSet(viewsets.ModelViewSet):
+class BrandViewSet(CatalogCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
     permission_classes = [permissions.AllowAny]
 
-class ProductImageViewSet(viewsets.ModelViewSet):
+class ProductImageViewSet(CatalogCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = ProductImage.objects.all()
     serializer_class = ProductImageSerializer
     permission_classes = [permissions.AllowAny]
 
-class ProductSpecificationViewSet(viewsets.ModelViewSet):
+class ProductSpecificationViewSet(CatalogCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = ProductSpecification.objects.all()
     serializer_class = ProductSpecificationSerializer
     permission_classes = [permissions.AllowAny]
 
-class ProductVariantViewSet(viewsets.ModelViewSet):
+class ProductVariantViewSet(CatalogCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = ProductVariant.objects.all()
     serializer_class = ProductVariantSerializer
     permission_classes = [permissions.AllowAny]
 
 # Add the missing generic views
-class ProductImageListView(generics.ListAPIView):
+class ProductImageListView(CatalogCacheMixin, EagerLoadingMixin, generics.ListAPIView):
     serializer_class = ProductImageSerializer
     permission_classes = [permissions.AllowAny]
     
@@ -316,7 +672,7 @@ class ProductImageListView(generics.ListAPIView):
         product_id = self.kwargs['pk']
         return ProductImage.objects.filter(product_id=product_id)
 
-class ProductSpecificationListView(generics.ListAPIView):
+class ProductSpecificationListView(CatalogCacheMixin, EagerLoadingMixin, generics.ListAPIView):
     serializer_class = ProductSpecificationSerializer
     permission_classes = [permissions.AllowAny]
     
@@ -324,7 +680,7 @@ class ProductSpecificationListView(generics.ListAPIView):
         product_id = self.kwargs['pk']
         return ProductSpecification.objects.filter(product_id=product_id)
 
-class ProductVariantListView(generics.ListAPIView):
+class ProductVariantListView(CatalogCacheMixin, EagerLoadingMixin, generics.ListAPIView):
     serializer_class = ProductVariantSerializer
     permission_classes = [permissions.AllowAny]
     
@@ -332,39 +688,62 @@ class ProductVariantListView(generics.ListAPIView):
         product_id = self.kwargs['pk']
         return ProductVariant.objects.filter(product_id=product_id)
 
-class CategoryProductListView(generics.ListAPIView):
+class CategoryProductListView(StreamingListMixin, ConditionalGetMixin, CatalogCacheMixin, CompiledListMixin, EagerLoadingMixin, generics.ListAPIView):
     serializer_class = ProductListSerializer
     permission_classes = [permissions.AllowAny]
+    stream_permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
+    cache_models = [Category, Brand]
+    etag_models = [Category, Brand]
     
     def get_queryset(self):
-        category_id = self.kwargs['pk']
-        return Product.objects.filter(category_id=category_id, is_active=True)
+        # The category and everything below it, as one range on the
+        # indexed category path.
+        category = get_object_or_404(Category.objects.only('path'), pk=self.kwargs['pk'])
+        return Product.objects.filter(category.subtree_q('category__path'), is_active=True)
 
-class BrandProductListView(generics.ListAPIView):
+class BrandProductListView(StreamingListMixin, ConditionalGetMixin, CatalogCacheMixin, CompiledListMixin, EagerLoadingMixin, generics.ListAPIView):
     serializer_class = ProductListSerializer
     permission_classes = [permissions.AllowAny]
+    stream_permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
+    cache_models = [Category, Brand]
+    etag_models = [Category, Brand]
     
     def get_queryset(self):
         brand_id = self.kwargs['pk']
         return Product.objects.filter(brand_id=brand_id, is_active=True)
 
-class UserOrderListView(generics.ListAPIView):
+class UserOrderListView(StreamingListMixin, ConditionalGetMixin, EagerLoadingMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
+    etag_fields = ('updated_at', 'items__product__updated_at')
+    etag_models = [Category, Brand]
     
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user)
 
-class UserWishListView(generics.RetrieveAPIView):
+class UserWishListView(ConditionalGetMixin, generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = WishListSerializer
+    etag_fields = ('updated_at', 'products__updated_at')
+    etag_models = [Category, Brand]
     
     def get_object(self):
         return WishList.objects.get_or_create(user=self.request.user)[0]
 
-class UserCartView(generics.RetrieveAPIView):
+    def get_etag_queryset(self, detail):
+        return WishList.objects.filter(user=self.request.user)
+
+class UserCartView(ConditionalGetMixin, generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CartSerializer
+    etag_fields = ('updated_at', 'items__product__updated_at')
     
     def get_object(self):
-        return Cart.objects.get_or_create(user=self.request.user)[0]
\ No newline at end of file
+        Cart.objects.get_or_create(user=self.request.user)
+        return plan_queryset(Cart.objects.filter(user=self.request.user), CartSerializer).get()
+
+    def get_etag_queryset(self, detail):
+        return Cart.objects.filter(user=self.request.user)
\ No newline at end of file
@@ -3,10 +3,13 @@ Django settings for backend project.
 
 Generated by 'django-admin startproject' using Django 5.2.8.
 """
+import importlib.util
 import os
 from pathlib import Path
 import json
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -92,9 +95,57 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
-    ]
+    ],
+    # api/renderers.py: orjson-backed JSON (falls back to the stock encoder
+    # without orjson) and NDJSON for streamed lists (api/streaming.py).
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'api.renderers.NDJSONRenderer',
+    ],
+}
+
+# MessagePack responses are offered only when the optional msgpack package
+# is installed.
+if importlib.util.find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('api.renderers.MessagePackRenderer')
+
+# Seconds before the in-process autocomplete index (api/suggest.py) is
+# rebuilt to pick up catalog changes made by other workers.
+SUGGEST_INDEX_MAX_AGE = 300
+
+# Cache backend for the anonymous catalog response cache (api/caching.py).
+# Local memory is per process; use a shared backend such as Redis or
+# Memcached when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shopease',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
 }
 
+# Upper bound in seconds on how long a cached catalog response is served.
+CATALOG_CACHE_TIMEOUT = 300
+# Same for a user's cached /users/me payload, see api/profile.py.
+PROFILE_CACHE_TIMEOUT = 300
+
+# Seconds a cart's stock stays reserved after entering checkout, see
+# api/inventory.py.
+STOCK_RESERVATION_TTL = 15 * 60
+
+# Seconds order items are left to commit before the sales rollup and the
+# bought-together training read them, see api/sales.py.
+ORDER_COMMIT_LAG = 5 * 60
+
+# Most rows a streamed list response carries, see api/streaming.py.
+STREAM_MAX_ROWS = 10000
+
+# Most operations one POST /cart/ops/ request carries, and most units one
+# cart line holds through them, see api/cart_ops.py.
+CART_MAX_OPERATIONS = 50
+CART_MAX_LINE_QUANTITY = 99
+
 # CORS settings for production
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
@@ -114,6 +165,11 @@ else:
 # Allow credentials
 CORS_ALLOW_CREDENTIALS = True
 
+# Conditional GETs (api/conditional.py): let the frontend read ETags and
+# send them back.
+CORS_EXPOSE_HEADERS = ['ETag']
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match')
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 